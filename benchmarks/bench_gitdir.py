@@ -0,0 +1,39 @@
+"""
+Benchmark reading the local commit info directly vs. by running ``git``.
+
+Run from the repo root::
+
+    python -m benchmarks.bench_gitdir
+"""
+import statistics
+import time
+from typing import Callable
+
+import click
+
+from src import main
+
+
+def _time(fn: Callable, iterations: int) -> float:
+    """Return the median time, in ms, of ``iterations`` calls to ``fn``."""
+    times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+@click.command()
+@click.option("--iterations", default=50, show_default=True)
+def bench(iterations):
+    git = _time(main._get_current_local_commit_info_from_git, iterations)
+    direct = _time(main._get_current_local_commit_info, iterations)
+
+    click.echo(f"git subprocess:  {git:8.3f} ms")
+    click.echo(f"read .git:       {direct:8.3f} ms")
+    click.echo(f"speedup:         {git / direct:8.1f}x")
+
+
+if __name__ == "__main__":
+    bench()
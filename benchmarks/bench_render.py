@@ -0,0 +1,95 @@
+"""
+Benchmark rendering a project on a slow filesystem, with and without threads.
+
+Run from the repo root::
+
+    python -m benchmarks.bench_render
+
+There's no NFS mount here, so the latency is simulated: every directory
+and file that is written sleeps for ``--latency`` seconds first, like a
+round trip to the file server. Sleeping releases the GIL just like a
+blocking syscall does.
+"""
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict
+from typing import List
+
+import click
+
+from src import benchmark
+from src import render
+from src.generate import prepare_template
+from src.generate import resolve_context
+
+
+def _slow_sink(latency: float):
+    class SlowSink(render.DirectorySink):
+        def add_dir(self, dest):
+            time.sleep(latency)
+            super().add_dir(dest)
+
+        def add_file(self, dest, data, mode):
+            time.sleep(latency)
+            super().add_file(dest, data, mode)
+
+        def add_stream(self, dest, chunks, mode):
+            time.sleep(latency)
+            return super().add_stream(dest, chunks, mode)
+
+        def add_copy(self, dest, src):
+            time.sleep(latency)
+            return super().add_copy(dest, src)
+
+    return SlowSink
+
+
+def _run(context: dict, tmp: Path, threads: int, iterations: int) -> List[float]:
+    times = []
+    for i in range(iterations):
+        outdir = tmp / f"{threads}-{i}"
+        start = time.perf_counter()
+        render.render_project(context, str(outdir), threads=threads)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+@click.command()
+@click.option("--iterations", default=10, show_default=True)
+@click.option(
+    "--latency",
+    default=0.005,
+    show_default=True,
+    help="Seconds added to every directory and file that's written.",
+)
+@click.option(
+    "--threads",
+    "thread_counts",
+    multiple=True,
+    type=int,
+    default=[1, 2, 4, 8, 16],
+    show_default=True,
+)
+def bench(iterations, latency, thread_counts):
+    results: Dict[int, List[float]] = {}
+    with tempfile.TemporaryDirectory() as tmp, benchmark.patched(
+        render, "DirectorySink", _slow_sink(latency)
+    ):
+        context = resolve_context(prepare_template(), benchmark.BENCH_CONTEXT, tmp)
+        # Warm up the template caches.
+        _run(context, Path(tmp) / "warmup", 1, 1)
+        for threads in thread_counts:
+            results[threads] = _run(context, Path(tmp), threads, iterations)
+
+    click.echo(f"{'threads':<10}{'median ms':>10}{'min ms':>10}")
+    for threads, times in results.items():
+        times = sorted(times)
+        click.echo(
+            f"{threads:<10}{times[len(times) // 2] * 1000:>10.1f}"
+            f"{times[0] * 1000:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    bench()
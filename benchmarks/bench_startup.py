@@ -0,0 +1,37 @@
+"""
+Benchmark the startup (import) time of the CLI entry point.
+
+Run from the repo root::
+
+    python -m benchmarks.bench_startup
+
+Exits with status 1 if the import time of ``src.main`` exceeds
+``--budget-ms``.
+"""
+import click
+
+from src import importtime
+
+
+@click.command()
+@click.option("--repeat", default=5, show_default=True)
+@click.option("--top", default=15, show_default=True, help="Slowest imports to show.")
+@click.option("--budget-ms", default=None, type=float)
+def bench(repeat, top, budget_ms):
+    runs = [importtime.import_times("import src.main") for _ in range(repeat)]
+    best = min(runs, key=lambda times: times["src.main"])
+    total_ms = best["src.main"] / 1000
+
+    click.echo(f"import src.main: {total_ms:.1f} ms (best of {repeat})")
+    click.echo(f"Slowest {top} imports (cumulative ms):")
+    slowest = sorted(best.items(), key=lambda kv: kv[1], reverse=True)
+    for name, us in slowest[:top]:
+        click.echo(f"  {us / 1000:8.1f}  {name}")
+
+    if budget_ms is not None and total_ms > budget_ms:
+        click.secho(f"Over budget of {budget_ms} ms!", fg="red")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    bench()
@@ -0,0 +1,88 @@
+"""
+Benchmark the version check's HTTP requests against a local mock API.
+
+Run from the repo root::
+
+    python -m benchmarks.bench_webapi
+
+The mock server adds ``--latency`` seconds to every request and
+``--connect-latency`` seconds to every new connection (to stand in for the
+TCP+TLS handshake with api.github.com).
+"""
+import statistics
+import tempfile
+import time
+from typing import Callable
+
+import click
+
+from src import benchmark
+from src import main
+from src import webapi
+from src.mockapi import MockGitHubApi
+
+
+def _before(api_url: str) -> None:
+    """The version check as it was: sequential, one connection per request."""
+    local_hash, _ = main._get_current_local_commit_info()
+    remote_hash, _ = webapi.cached_get(
+        api_url + "/commits/master",
+        lambda json: (json["sha"], json["commit"]["author"]["date"]),
+    )
+    webapi.cached_get(
+        api_url + f"/compare/{local_hash}...{remote_hash}",
+        lambda json: json["total_commits"],
+    )
+
+
+def _run(api: MockGitHubApi, fn: Callable[[], None], iterations: int) -> dict:
+    api.requests.clear()
+    api.connections.clear()
+    times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    return {
+        "median_ms": statistics.median(times) * 1000,
+        "mean_ms": statistics.mean(times) * 1000,
+        "requests_per_run": api.request_count / iterations,
+        "connections_per_run": len(api.connections) / iterations,
+    }
+
+
+@click.command()
+@click.option("--iterations", default=20, show_default=True)
+@click.option("--latency", default=0.05, show_default=True)
+@click.option("--connect-latency", default=0.05, show_default=True)
+def bench(iterations, latency, connect_latency):
+    # Use a throwaway cache dir so that we don't touch the user's.
+    with tempfile.TemporaryDirectory() as tmp, benchmark.patched_env(
+        "XDG_CACHE_HOME", tmp
+    ):
+        with MockGitHubApi(
+            sha="f" * 40, latency=latency, connect_latency=connect_latency
+        ) as api, benchmark.patched(main, "REMOTE_API_URL", api.url):
+            results = {
+                "before": _run(api, lambda: _before(api.url), iterations),
+                # TTL of 0 means every run revalidates.
+                "after (revalidate)": _run(
+                    api, lambda: main._get_version_warning(cache_ttl=0), iterations
+                ),
+                "after (fresh cache)": _run(
+                    api, lambda: main._get_version_warning(cache_ttl=600), iterations
+                ),
+            }
+
+    header = f"{'':<22}{'median ms':>10}{'mean ms':>10}{'requests':>10}{'conns':>8}"
+    click.echo(header)
+    for name, r in results.items():
+        click.echo(
+            f"{name:<22}{r['median_ms']:>10.1f}{r['mean_ms']:>10.1f}"
+            f"{r['requests_per_run']:>10.1f}{r['connections_per_run']:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    bench()
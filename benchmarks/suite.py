@@ -0,0 +1,302 @@
+"""
+End-to-end benchmark suite for project generation.
+
+Run from the repo root::
+
+    python -m benchmarks.suite run --output baseline.json
+    # ... make changes ...
+    python -m benchmarks.suite run --baseline baseline.json
+
+or compare two saved runs::
+
+    python -m benchmarks.suite compare baseline.json current.json
+
+Both exit with status 1 if any case's median time or peak memory regressed
+by more than ``--threshold`` (default 10%). See :mod:`src.benchmark` for the
+results format.
+
+Cases:
+
++ ``single_project``: ``main.main --no-version-check`` for one project.
++ ``batch_w1`` / ``batch_wN``: throughput of ``batch.run_batch`` for
+  ``--projects`` projects with one worker and with one per CPU. The result
+  is also reported as projects/s.
++ ``pre_gen_hook`` / ``pre_gen_hook_subprocess``: the pre-gen hook
+  in-process vs. run the way stock cookiecutter does. The post-gen hook's
+  work is part of the render plan and so is included in ``single_project``.
++ ``fix_timestamp`` / ``parse_extra_context``: microbenchmarks.
++ ``server_archive``: one ``POST /generate`` for a tar.gz to a warm
+  ``serve`` server, over HTTP on localhost.
++ ``version_check`` / ``version_check_cached``: ``_get_version_warning``
+  against a local mock API, revalidating and with a fresh cache.
+"""
+import contextlib
+import copy
+import io
+import json
+import os
+import tempfile
+import urllib.request
+from pathlib import Path
+from typing import Callable
+from typing import Dict
+
+import click
+from click.testing import CliRunner
+
+from src import batch
+from src import benchmark
+from src import hook_runner
+from src import main
+from src.generate import prepare_template
+from src.generate import resolve_context
+from src.mockapi import MockGitHubApi
+from src.server import ScaffoldServer
+
+
+Case = Callable[["Options"], Dict[str, float]]
+CASES: Dict[str, Case] = {}
+
+
+class Options:
+    def __init__(self, workdir: Path, samples: int, projects: int, latency: float):
+        self.workdir = workdir
+        self.samples = samples
+        self.projects = projects
+        self.latency = latency
+
+    def fresh_dir(self) -> Path:
+        return Path(tempfile.mkdtemp(dir=self.workdir))
+
+
+def case(fn: Case) -> Case:
+    CASES[fn.__name__] = fn
+    return fn
+
+
+@contextlib.contextmanager
+def _quiet():
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+@case
+def single_project(opts: Options) -> Dict[str, float]:
+    runner = CliRunner()
+    args = ["--no-version-check", "--extra-context", str(benchmark.BENCH_CONTEXT)]
+
+    def run(outdir):
+        result = runner.invoke(main.main, [str(outdir), *args])
+        assert result.exit_code == 0, result.output
+
+    return benchmark.measure(run, lambda: (opts.fresh_dir(),), opts.samples)
+
+
+def _batch_case(workers: int) -> Case:
+    def batch_case(opts: Options) -> Dict[str, float]:
+        base_context = prepare_template()
+        entries = [
+            dict(benchmark.BENCH_CONTEXT, project_slug=f"bench-proj-{i}")
+            for i in range(opts.projects)
+        ]
+
+        def run(outdir):
+            with _quiet():
+                results = batch.run_batch(entries, str(outdir), workers, base_context)
+                assert all(r.ok for r in results)
+
+        result = benchmark.measure(run, lambda: (opts.fresh_dir(),), opts.samples)
+        result["projects_per_s"] = opts.projects / result["median"]
+        return result
+
+    return batch_case
+
+
+@case
+def batch_w1(opts: Options) -> Dict[str, float]:
+    return _batch_case(1)(opts)
+
+
+@case
+def batch_wN(opts: Options) -> Dict[str, float]:
+    return _batch_case(os.cpu_count() or 1)(opts)
+
+
+def _context(outdir: Path) -> dict:
+    return resolve_context(prepare_template(), benchmark.BENCH_CONTEXT, str(outdir))
+
+
+@case
+def pre_gen_hook(opts: Options) -> Dict[str, float]:
+    context = _context(opts.workdir)
+
+    def run():
+        with _quiet():
+            hook_runner.run_pre_gen_project(context)
+
+    return benchmark.measure(run, samples=opts.samples, calls=20)
+
+
+@case
+def pre_gen_hook_subprocess(opts: Options) -> Dict[str, float]:
+    from cookiecutter.hooks import run_script_with_context
+
+    context = _context(opts.workdir)
+    script = str(hook_runner.HOOKS_DIR / "pre_gen_project.py")
+
+    def run(outdir):
+        # Cookiecutter renders the script into a temp file and runs it with a
+        # new interpreter.
+        run_script_with_context(script, str(outdir), copy.deepcopy(context))
+
+    return benchmark.measure(run, lambda: (opts.fresh_dir(),), opts.samples)
+
+
+@case
+def fix_timestamp(opts: Options) -> Dict[str, float]:
+    def run():
+        main._fix_timestamp("2021-09-05 11:43:40 -0700")
+        main._fix_timestamp("2021-07-30T20:57:11Z")
+
+    return benchmark.measure(run, samples=opts.samples, calls=2000)
+
+
+@case
+def parse_extra_context(opts: Options) -> Dict[str, float]:
+    ctx = click.Context(main.main)
+    value = str(benchmark.BENCH_CONTEXT)
+
+    def run():
+        main._parse_extra_context(ctx, None, value)
+
+    return benchmark.measure(run, samples=opts.samples, calls=2000)
+
+
+@case
+def server_archive(opts: Options) -> Dict[str, float]:
+    body = json.dumps(
+        {"context": benchmark.BENCH_CONTEXT, "archive": "tar.gz"}
+    ).encode()
+
+    def run():
+        request = urllib.request.Request(f"{url}/generate", data=body, method="POST")
+        with urllib.request.urlopen(request) as response:
+            response.read()
+
+    with _quiet(), ScaffoldServer(port=0, reload_interval=0) as server:
+        url = server.url
+        # Warm up, like a server that has been running for a while.
+        run()
+        return benchmark.measure(run, samples=opts.samples, calls=20)
+
+
+def _version_check_case(cache_ttl: float) -> Case:
+    def version_check_case(opts: Options) -> Dict[str, float]:
+        with MockGitHubApi(
+            sha="f" * 40, latency=opts.latency, connect_latency=opts.latency
+        ) as api, benchmark.patched(main, "REMOTE_API_URL", api.url):
+            return benchmark.measure(
+                lambda: main._get_version_warning(cache_ttl=cache_ttl),
+                samples=opts.samples,
+            )
+
+    return version_check_case
+
+
+@case
+def version_check(opts: Options) -> Dict[str, float]:
+    # TTL of 0 means every run revalidates.
+    return _version_check_case(0)(opts)
+
+
+@case
+def version_check_cached(opts: Options) -> Dict[str, float]:
+    return _version_check_case(600)(opts)
+
+
+def _report(comparisons) -> bool:
+    """Print ``comparisons`` and return True if none of them regressed."""
+    ok = True
+    for c in comparisons:
+        line = (
+            f"{c.case:<26}{c.metric:<13}{c.baseline:>14.6g}{c.current:>14.6g}"
+            f"{c.change:>+9.1%}"
+        )
+        if c.regressed:
+            ok = False
+            click.secho(line + "  REGRESSED", fg="red")
+        else:
+            click.echo(line)
+    return ok
+
+
+@click.group()
+def cli():
+    pass
+
+
+@cli.command()
+@click.option("--output", type=click.Path(dir_okay=False), help="Save results here.")
+@click.option(
+    "--baseline",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Compare the results against this saved run.",
+)
+@click.option("--threshold", default=benchmark.DEFAULT_THRESHOLD, show_default=True)
+@click.option("--samples", default=5, show_default=True)
+@click.option("--projects", default=20, show_default=True, help="For batch cases.")
+@click.option(
+    "--latency",
+    default=0.02,
+    show_default=True,
+    help="Mock API latency, per request and per connection.",
+)
+@click.option("-k", "only", multiple=True, help="Only run cases with this name.")
+def run(output, baseline, threshold, samples, projects, latency, only):
+    """Run the benchmark cases."""
+    unknown = set(only) - CASES.keys()
+    if unknown:
+        raise click.BadParameter(f"Unknown cases: {sorted(unknown)}", param_hint="-k")
+
+    results = {}
+    # Use a throwaway cache dir so that we don't touch the user's.
+    with tempfile.TemporaryDirectory() as tmp, benchmark.patched_env(
+        "XDG_CACHE_HOME", tmp
+    ):
+        opts = Options(Path(tmp), samples, projects, latency)
+        for name, fn in CASES.items():
+            if only and name not in only:
+                continue
+            results[name] = fn(opts)
+            r = results[name]
+            click.echo(
+                f"{name:<26}{r['median'] * 1000:>10.3f} ms"
+                f"{r['peak_memory'] / 1024:>10.0f} KiB peak"
+            )
+
+    if output:
+        benchmark.save_results(results, output)
+
+    if baseline:
+        comparisons = benchmark.compare(
+            benchmark.load_results(baseline), results, threshold
+        )
+        if not _report(comparisons):
+            raise SystemExit(1)
+
+
+@cli.command(name="compare")
+@click.argument("baseline", type=click.Path(exists=True, dir_okay=False))
+@click.argument("current", type=click.Path(exists=True, dir_okay=False))
+@click.option("--threshold", default=benchmark.DEFAULT_THRESHOLD, show_default=True)
+def compare_cmd(baseline, current, threshold):
+    """Compare two saved runs."""
+    comparisons = benchmark.compare(
+        benchmark.load_results(baseline), benchmark.load_results(current), threshold
+    )
+    if not _report(comparisons):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    cli()
@@ -1,8 +1,18 @@
 """
 Various checks that are run after generating the project.
+
+This file is run as a script by cookiecutter, after being rendered, and is
+also imported by src/hook_runner.py so that the actions can be run in-process.
+Because of that, only the ``__main__`` block may contain template variables.
+
+All actions take two arguments: the cookiecutter context dict and the path
+to the generated project.
 """
-import inspect
+import calendar
+import datetime
+import os
 import shutil
+import subprocess
 import sys
 from pathlib import Path
 
@@ -15,55 +25,53 @@ from colorama import Style
 # (that I'm aware of) to make the hooks into a package so that we can use
 # a shared module. Adding hooks/__init__.py doesn't work :-(
 
-colorama.init()
-
 PASS = Fore.WHITE + Back.GREEN + "Passed" + Style.RESET_ALL
 FAIL = Fore.WHITE + Back.RED + "Failed" + Style.RESET_ALL
 
 
 def _print_hook_name():
-    name = inspect.stack()[1][3]
+    # sys._getframe is much cheaper than inspect.stack(), which builds frame
+    # records (with source context!) for the entire stack.
+    name = sys._getframe(1).f_code.co_name
     print("{:.<50s}".format(name), end="")
 
 
 # End duplication
 
 
-PROJECT_DIR = Path.cwd()
-
 CI_FILES = {"GitHub": ".github", "GitLab": ".gitlab-ci.yml"}
 
 
-def remove_file_or_dir(filepath: str):
-    path = PROJECT_DIR / filepath
+def remove_file_or_dir(project_dir: Path, filepath: str):
+    path = project_dir / filepath
 
     if path.is_file():
         path.unlink()
     elif path.is_dir():
-        shutil.rmtree(PROJECT_DIR / filepath)
+        shutil.rmtree(path)
     else:
         raise ValueError(f"The path `{path}` is not a file nor a directory. HOW??")
 
 
-def remove_cli_file():
+def remove_cli_file(context, project_dir: Path):
     _print_hook_name()
 
-    fp = "src/{{ cookiecutter.package_name }}/cli.py"
+    fp = f"src/{context['package_name']}/cli.py"
 
-    if "{{ cookiecutter.has_cli }}" == "n":
-        remove_file_or_dir(fp)
+    if context["has_cli"] == "n":
+        remove_file_or_dir(project_dir, fp)
     print("Done")
 
 
-def remove_ci_files():
+def remove_ci_files(context, project_dir: Path):
     _print_hook_name()
 
-    host = "{{ cookiecutter.project_host }}"
+    host = context["project_host"]
 
     # User does not want any CI files. Remove them all.
-    if "{{ cookiecutter.create_ci_file }}" == "n":
+    if context["create_ci_file"] == "n":
         for file_or_dir in CI_FILES.values():
-            remove_file_or_dir(file_or_dir)
+            remove_file_or_dir(project_dir, file_or_dir)
         print("Done")
         return
 
@@ -72,40 +80,166 @@ def remove_ci_files():
     remove_items = dict(CI_FILES)
 
     # Delete the item that we want to keep from the dict so that we don't
-    # end up removing the file.
-    del remove_items[host]
+    # end up removing the file. Hosts without a CI file ("Other", "None")
+    # don't keep anything.
+    remove_items.pop(host, None)
 
     # Remove all the ones we're **not** using.
     for file_or_dir in remove_items.values():
-        remove_file_or_dir(file_or_dir)
+        remove_file_or_dir(project_dir, file_or_dir)
     print("Done")
 
 
-def rename_pyproject_template():
+def rename_pyproject_template(context, project_dir: Path):
     _print_hook_name()
 
     # Rename the pyproject.toml.j2 file to just .toml
     # We needed to add the .j2 extension so that `black` would not try to read
     # it as a config file during pre-commit (it fails to parse because of the
     # jinja2 templating code).
-    pyproject_file = PROJECT_DIR / "pyproject.toml.j2"
-    pyproject_file.rename(PROJECT_DIR / "pyproject.toml")
+    pyproject_file = project_dir / "pyproject.toml.j2"
+    pyproject_file.rename(project_dir / "pyproject.toml")
     print("Done")
 
 
-def main():
+def _git_files(project_dir: Path):
+    """Yield ``(path relative to project_dir, git mode)`` for every file."""
+    for root, dirs, files in os.walk(project_dir):
+        if root == str(project_dir):
+            dirs.remove(".git")
+        dirs.sort()
+        for name in sorted(files):
+            path = Path(root, name)
+            rel = path.relative_to(project_dir).as_posix()
+            if path.is_symlink():
+                yield rel, "120000"
+            elif os.access(path, os.X_OK):
+                yield rel, "100755"
+            else:
+                yield rel, "100644"
+        # Symlinks to directories are listed in dirs but not walked into.
+        for name in [d for d in dirs if Path(root, d).is_symlink()]:
+            dirs.remove(name)
+            rel = Path(root, name).relative_to(project_dir).as_posix()
+            yield rel, "120000"
+
+
+def _write_data(stream, data: bytes):
+    stream.write(b"data %d\n" % len(data))
+    stream.write(data)
+    stream.write(b"\n")
+
+
+def _commit_date(context) -> int:
+    """
+    Midnight UTC of ``create_date`` as a Unix timestamp.
+
+    An empty ``create_date`` (the cookiecutter.json default) means today.
+    Anything else that isn't a YYYY-MM-DD date raises :class:`ValueError`.
+    """
+    create_date = context.get("create_date", "")
+    if not create_date:
+        return calendar.timegm(datetime.date.today().timetuple())
+    try:
+        date = datetime.date.fromisoformat(create_date)
+    except ValueError:
+        raise ValueError(f"`create_date` must be YYYY-MM-DD, not `{create_date}`.")
+    return calendar.timegm(date.timetuple())
+
+
+def _git_ident(context) -> str:
+    """
+    Return the ``Name <email> time tz`` of the initial commit.
+
+    fast-import has no escaping, so an author or email with ``<``, ``>`` or
+    a line break would corrupt the stream. Those raise :class:`ValueError`.
+    """
+    for key in ("author", "author_email"):
+        value = context[key]
+        if any(c in value for c in "<>\n\r\0"):
+            raise ValueError(f"`{key}` can't contain '<', '>' or line breaks.")
+    return "{} <{}> {} +0000".format(
+        context["author"], context["author_email"], _commit_date(context)
+    )
+
+
+def init_git_repo(context, project_dir: Path):
+    """
+    Create a git repo with every file of the project in the initial commit.
+
+    Only runs if ``_git_init`` is "y". All the files are streamed through a
+    single ``git fast-import`` instead of being added to the index one by
+    one. The author, committer and date come from the context, so the same
+    project always gets the same commit.
+    """
+    _print_hook_name()
+
+    if context.get("_git_init", "n") != "y":
+        print("Skipped")
+        return
+
+    # Before `git init`, so that a bad context doesn't leave an empty repo.
+    author = _git_ident(context)
+
+    subprocess.run(["git", "init", "-q", str(project_dir)], check=True)
+    head = (project_dir / ".git" / "HEAD").read_text(encoding="utf-8")
+    ref = head.strip().partition("ref: ")[2]
+    proc = subprocess.Popen(
+        ["git", "fast-import", "--quiet", "--done"],
+        cwd=project_dir,
+        stdin=subprocess.PIPE,
+    )
+    with proc.stdin as stream:
+        stream.write(f"commit {ref}\n".encode("utf-8"))
+        stream.write(f"author {author}\n".encode("utf-8"))
+        stream.write(f"committer {author}\n".encode("utf-8"))
+        _write_data(stream, b"Initial commit\n")
+        for rel, mode in _git_files(project_dir):
+            path = project_dir / rel
+            stream.write(f"M {mode} inline {rel}\n".encode("utf-8"))
+            if mode == "120000":
+                _write_data(stream, os.fsencode(os.readlink(path)))
+                continue
+            stream.write(b"data %d\n" % path.stat().st_size)
+            with open(path, "rb") as f:
+                shutil.copyfileobj(f, stream)
+            stream.write(b"\n")
+        stream.write(b"done\n")
+    if proc.wait() != 0:
+        raise subprocess.CalledProcessError(proc.returncode, proc.args)
+
+    # fast-import only writes objects and refs. Fill in the index so that the
+    # files don't show up as deleted and untracked.
+    subprocess.run(["git", "read-tree", "HEAD"], cwd=project_dir, check=True)
+    print("Done")
+
+
+ACTIONS = [remove_ci_files, remove_cli_file, rename_pyproject_template, init_git_repo]
+
+
+def main(context, project_dir: Path):
     print("Running post-generate hooks:")
     results = []
-    actions = [remove_ci_files, remove_cli_file, rename_pyproject_template]
-    for action in actions:
-        result = action()
+    for action in ACTIONS:
+        result = action(context, project_dir)
         results.append(result)
 
     return True
 
 
 if __name__ == "__main__":
-    okay = main()
+    colorama.init()
+    context = {
+        "package_name": "{{ cookiecutter.package_name }}",
+        "has_cli": "{{ cookiecutter.has_cli }}",
+        "project_host": "{{ cookiecutter.project_host }}",
+        "create_ci_file": "{{ cookiecutter.create_ci_file }}",
+        "author": "{{ cookiecutter.author }}",
+        "author_email": "{{ cookiecutter.author_email }}",
+        "create_date": "{{ cookiecutter.create_date }}",
+        "_git_init": "{{ cookiecutter._git_init }}",
+    }
+    okay = main(context, Path.cwd())
     if not okay:
         # exits with status 1 to indicate failure
         sys.exit(1)
@@ -4,16 +4,20 @@ user has entered values).
 
 Creating new checks:
 
-+ All checks MUST be functions that take no arguments.
++ All checks MUST be functions that take a single argument: the cookiecutter
+  context dict (eg: ``context["project_name"]``).
 + These functions SHOULD be prefixed with "check_" (similar to how all unit
   tests are "test_foo").
 + The functions MUST return either `True` or `False`.
 + The functions MUST start with _print_hook_name()
 + The functions MUST run `print(PASS)` on success and `print(FAIL)` on failure.
 
-Add any new checks to the `checks` list in `main()`.
+Add any new checks to the `CHECKS` list.
+
+This file is run as a script by cookiecutter, after being rendered, and is
+also imported by src/hook_runner.py so that the checks can be run in-process.
+Because of that, only the ``__main__`` block may contain template variables.
 """
-import inspect
 import re
 import sys
 
@@ -22,21 +26,23 @@ from colorama import Back
 from colorama import Fore
 from colorama import Style
 
-colorama.init()
-
 PASS = Fore.WHITE + Back.GREEN + "Passed" + Style.RESET_ALL
 FAIL = Fore.WHITE + Back.RED + "Failed" + Style.RESET_ALL
 
+PACKAGE_NAME_PATTERN = re.compile(r"^[a-zA-Z][_a-zA-Z0-9]+$")
+
 
 def _print_hook_name():
-    name = inspect.stack()[1][3]
+    # sys._getframe is much cheaper than inspect.stack(), which builds frame
+    # records (with source context!) for the entire stack.
+    name = sys._getframe(1).f_code.co_name
     print("{:.<50s}".format(name), end="")
 
 
-def check_project_name():
+def check_project_name(context):
     _print_hook_name()
 
-    project_name = "{{ cookiecutter.project_name }}"
+    project_name = context["project_name"]
 
     if project_name == "":
         print(FAIL)
@@ -47,12 +53,11 @@ def check_project_name():
         return True
 
 
-def check_package_name():
+def check_package_name(context):
     _print_hook_name()
 
-    name = "{{ cookiecutter.package_name }}"
-    pattern = r"^[a-zA-Z][_a-zA-Z0-9]+$"
-    if not re.match(pattern, name):
+    name = context["package_name"]
+    if not PACKAGE_NAME_PATTERN.match(name):
         print(FAIL)
         print(f"  '{name}' is not a valid Python package name.")
         return False
@@ -61,19 +66,26 @@ def check_package_name():
         return True
 
 
-def main():
+CHECKS = [check_project_name, check_package_name]
+
+
+def main(context):
     print("Running pre-generate hooks:")
     results = []
-    checks = [check_project_name, check_package_name]
-    for check in checks:
-        result = check()
+    for check in CHECKS:
+        result = check(context)
         results.append(result)
 
     return all(results)
 
 
 if __name__ == "__main__":
-    okay = main()
+    colorama.init()
+    context = {
+        "project_name": "{{ cookiecutter.project_name }}",
+        "package_name": "{{ cookiecutter.package_name }}",
+    }
+    okay = main(context)
     if not okay:
         # exits with status 1 to indicate failure
         sys.exit(1)
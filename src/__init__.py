@@ -1,3 +1,21 @@
 from pathlib import Path
 
 DATA_DIR = Path(__file__).resolve().parent / "data"
+TEMPLATE_DIR = Path(__file__).resolve().parent.parent
+
+# The extra context that the reference project in DATA_DIR was made with.
+REFERENCE_CONTEXT = {
+    "author": "pytest",
+    "author_email": "pytest@foo.bar",
+    "create_date": "2020-07-10",
+    "license": "MIT",
+    "package_name": "reference_proj",
+    "project_name": "Reference Project",
+    "project_short_description": (
+        "A reference project used for testing my CookieCutter template."
+    ),
+    "project_slug": "reference-proj",
+    "project_url": "https://foo.bar",
+    "project_host": "GitHub",
+    "create_ci_file": "n",
+}
@@ -0,0 +1,177 @@
+"""
+Render a project straight into a tar.gz or zip archive.
+
+The archive sinks (see :class:`.render.DirectorySink` for what a sink is)
+write each entry to the output stream as soon as it's rendered, so memory use
+doesn't grow with the size of the project and the output can be a pipe (eg:
+stdout). Static files are streamed from the template in chunks.
+
+Archives are deterministic: entries are in render plan order and every
+timestamp, owner and header field is fixed, so the same template and context
+always give the same bytes. The timestamp is ``SOURCE_DATE_EPOCH`` if that's
+set, otherwise the zip epoch (1980-01-01).
+"""
+import gzip
+import io
+import os
+import shutil
+import stat
+import tarfile
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+from typing import BinaryIO
+from typing import Dict
+from typing import Iterable
+from typing import Type
+
+# The earliest time that a zip file can store.
+DEFAULT_EPOCH = 315532800  # 1980-01-01T00:00:00Z
+
+DIR_MODE = 0o755
+
+# Streamed files bigger than this are buffered on disk for tar archives.
+SPOOL_SIZE = 1024 * 1024  # bytes
+
+
+def source_date_epoch() -> int:
+    """Return the timestamp for archive entries."""
+    return int(os.environ.get("SOURCE_DATE_EPOCH", DEFAULT_EPOCH))
+
+
+def _file_mode(path: Path) -> int:
+    return stat.S_IMODE(path.stat().st_mode)
+
+
+class TarGzSink:
+    """
+    Parameters
+    ----------
+    fileobj : binary file object
+        Where the archive is written. It doesn't need to be seekable.
+    prefix : str
+        The directory that every entry is put in (the project name).
+    """
+
+    extension = ".tar.gz"
+
+    def __init__(self, fileobj: BinaryIO, prefix: str):
+        self.prefix = prefix
+        self.mtime = source_date_epoch()
+        # tarfile's own gzip stream writes the current time into the gzip
+        # header, so do the compression ourselves.
+        self._gz = gzip.GzipFile(
+            filename="", mode="wb", fileobj=fileobj, mtime=self.mtime
+        )
+        self._tar = tarfile.open(fileobj=self._gz, mode="w|", format=tarfile.PAX_FORMAT)
+        self._add(tarfile.TarInfo(prefix), DIR_MODE, tarfile.DIRTYPE)
+
+    def _add(
+        self, info: tarfile.TarInfo, mode: int, type_: bytes, fileobj=None
+    ) -> None:
+        info.type = type_
+        info.mode = mode
+        info.mtime = self.mtime
+        info.uid = info.gid = 0
+        info.uname = info.gname = ""
+        self._tar.addfile(info, fileobj)
+
+    def _info(self, dest: str) -> tarfile.TarInfo:
+        return tarfile.TarInfo(f"{self.prefix}/{dest.replace(os.sep, '/')}")
+
+    def add_dir(self, dest: str) -> None:
+        self._add(self._info(dest), DIR_MODE, tarfile.DIRTYPE)
+
+    def add_file(self, dest: str, data: bytes, mode: int) -> None:
+        info = self._info(dest)
+        info.size = len(data)
+        self._add(info, mode, tarfile.REGTYPE, io.BytesIO(data))
+
+    def add_stream(self, dest: str, chunks: Iterable[bytes], mode: int) -> int:
+        # Tar headers come before the data and include its size, so the file
+        # has to be buffered. Big files are spooled to disk.
+        info = self._info(dest)
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as f:
+            for chunk in chunks:
+                f.write(chunk)
+            info.size = f.tell()
+            f.seek(0)
+            self._add(info, mode, tarfile.REGTYPE, f)
+        return info.size
+
+    def add_copy(self, dest: str, src: Path) -> int:
+        info = self._info(dest)
+        with open(src, "rb") as f:
+            info.size = os.fstat(f.fileno()).st_size
+            self._add(info, _file_mode(src), tarfile.REGTYPE, f)
+        return info.size
+
+    def close(self) -> None:
+        self._tar.close()
+        self._gz.close()
+
+
+class ZipSink:
+    """
+    Parameters
+    ----------
+    fileobj : binary file object
+        Where the archive is written. It doesn't need to be seekable.
+    prefix : str
+        The directory that every entry is put in (the project name).
+    """
+
+    extension = ".zip"
+
+    def __init__(self, fileobj: BinaryIO, prefix: str):
+        self.prefix = prefix
+        self.date_time = time.gmtime(source_date_epoch())[:6]
+        self._zip = zipfile.ZipFile(fileobj, mode="w")
+        self.add_dir("")
+
+    def _info(self, dest: str, mode: int, is_dir: bool) -> zipfile.ZipInfo:
+        name = f"{self.prefix}/{dest.replace(os.sep, '/')}".rstrip("/")
+        if is_dir:
+            name += "/"
+        info = zipfile.ZipInfo(name, date_time=self.date_time)
+        # Unix mode and file type go in the high 16 bits.
+        file_type = stat.S_IFDIR if is_dir else stat.S_IFREG
+        info.external_attr = (file_type | mode) << 16
+        info.create_system = 3  # Unix, regardless of where this runs.
+        if not is_dir:
+            info.compress_type = zipfile.ZIP_DEFLATED
+        return info
+
+    def add_dir(self, dest: str) -> None:
+        self._zip.writestr(self._info(dest, DIR_MODE, True), b"")
+
+    def add_file(self, dest: str, data: bytes, mode: int) -> None:
+        self._zip.writestr(self._info(dest, mode, False), data)
+
+    def add_stream(self, dest: str, chunks: Iterable[bytes], mode: int) -> int:
+        info = self._info(dest, mode, False)
+        # The size isn't known up front, so allow for a big file.
+        with self._zip.open(info, "w", force_zip64=True) as f:
+            for chunk in chunks:
+                f.write(chunk)
+        return info.file_size
+
+    def add_copy(self, dest: str, src: Path) -> int:
+        info = self._info(dest, _file_mode(src), False)
+        with open(src, "rb") as fsrc, self._zip.open(info, "w") as fdst:
+            shutil.copyfileobj(fsrc, fdst)
+        return info.file_size
+
+    def close(self) -> None:
+        self._zip.close()
+
+
+FORMATS: Dict[str, Type] = {"tar.gz": TarGzSink, "zip": ZipSink}
+
+
+def archive_sink(fmt: str, fileobj: BinaryIO, prefix: str):
+    """Return a new archive sink for ``fmt`` (one of :data:`FORMATS`)."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown archive format `{fmt}`.")
+    return FORMATS[fmt](fileobj, prefix)
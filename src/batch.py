@@ -0,0 +1,201 @@
+"""
+Generate many projects from a single manifest.
+
+A manifest is either a JSON Lines file (one dict per line) or a CSV file
+(one project per row, with a header row). Each entry is an extra-context dict,
+exactly like what's passed to ``--extra-context`` for a single project.
+
+The template's ``cookiecutter.json`` is parsed once in the parent process and
+then handed to every worker, so each project only pays for rendering.
+"""
+import csv
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import TYPE_CHECKING
+from typing import Union
+
+from .generate import generate_project
+from .generate import prepare_template
+from .generate import resolve_context
+from .render import RenderStats
+from .timings import Timings
+
+if TYPE_CHECKING:
+    from .dedup import BlobStore
+    from .output_cache import OutputCache
+
+# Set in each worker process by _init_worker.
+_BASE_CONTEXT: Optional[dict] = None
+
+
+@dataclass
+class BatchResult:
+    index: int
+    project: str
+    ok: bool
+    elapsed: float
+    error: Optional[str] = None
+    stats: Optional[RenderStats] = None
+    timings: Optional[dict] = None
+
+
+def load_manifest(path: Path) -> List[Dict[str, str]]:
+    """
+    Load a JSONL or CSV manifest into a list of extra-context dicts.
+
+    The format is determined by the file extension. Blank lines in JSONL
+    files are ignored.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+
+    if suffix in (".jsonl", ".ndjson"):
+        entries = []
+        with open(path, encoding="utf-8") as f:
+            for lineno, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if not isinstance(entry, dict):
+                    raise ValueError(f"{path}:{lineno}: entry is not a JSON object.")
+                entries.append(entry)
+        return entries
+    elif suffix == ".csv":
+        with open(path, encoding="utf-8", newline="") as f:
+            return [dict(row) for row in csv.DictReader(f)]
+    else:
+        raise ValueError(
+            f"Unknown manifest format `{suffix}`. Expected .jsonl or .csv."
+        )
+
+
+def _init_worker(base_context: dict) -> None:
+    global _BASE_CONTEXT
+    _BASE_CONTEXT = base_context
+
+
+def _generate_one(
+    index: int,
+    extra_context: dict,
+    output_dir: str,
+    cache: Optional["OutputCache"] = None,
+    link_static: bool = False,
+    timings: bool = False,
+    record: bool = False,
+    dedup: Optional["BlobStore"] = None,
+    threads: int = 1,
+) -> BatchResult:
+    start = time.perf_counter()
+    stats = RenderStats()
+    project_timings = Timings({"index": index}) if timings else None
+    project = str(extra_context.get("project_slug", extra_context.get("project_name")))
+    try:
+        context = resolve_context(_BASE_CONTEXT, extra_context, output_dir)
+        project = context["cookiecutter"]["project_slug"]
+        generate_project(
+            context,
+            output_dir,
+            cache,
+            stats,
+            link_static,
+            project_timings,
+            record,
+            dedup,
+            threads,
+        )
+    except Exception as err:
+        # Exceptions are not always picklable, so send back a string.
+        error = f"{type(err).__name__}: {err}"
+        return BatchResult(index, project, False, time.perf_counter() - start, error)
+
+    elapsed = time.perf_counter() - start
+    report = None
+    if project_timings is not None:
+        project_timings.meta["project"] = project
+        report = project_timings.report()
+    return BatchResult(index, project, True, elapsed, stats=stats, timings=report)
+
+
+def run_batch(
+    entries: List[dict],
+    output_dir: Union[str, Sequence[str]],
+    workers: int = 1,
+    base_context: Optional[dict] = None,
+    cache: Optional["OutputCache"] = None,
+    link_static: bool = False,
+    timings: bool = False,
+    record: bool = False,
+    dedup: Optional["BlobStore"] = None,
+    threads: int = 1,
+) -> Iterator[BatchResult]:
+    """
+    Generate one project per entry, yielding results in manifest order.
+
+    Failures are reported in the yielded :class:`BatchResult` and never abort
+    the rest of the batch. With ``workers=1`` everything runs in-process.
+
+    ``output_dir`` is where every project is made, or a list with a separate
+    output dir for each entry.
+
+    See :func:`.generate.generate_project` for ``cache``, ``link_static``,
+    ``record``, ``dedup`` and ``threads``. The :class:`.dedup.BlobStore` is
+    shared by all workers, so identical files are stored once across the
+    whole batch.
+    If ``timings`` is True then each successful result has a timings report
+    (see :class:`.timings.Timings`).
+    """
+    if base_context is None:
+        base_context = prepare_template()
+    if isinstance(output_dir, str):
+        output_dirs: Sequence[str] = [output_dir] * len(entries)
+    else:
+        output_dirs = output_dir
+        if len(output_dirs) != len(entries):
+            raise ValueError("Expected one output dir per entry.")
+
+    if workers <= 1:
+        _init_worker(base_context)
+        for i, entry in enumerate(entries):
+            yield _generate_one(
+                i,
+                entry,
+                output_dirs[i],
+                cache,
+                link_static,
+                timings,
+                record,
+                dedup,
+                threads,
+            )
+        return
+
+    # Each worker gets the parsed template once via the initializer rather
+    # than once per submitted project.
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(base_context,)
+    ) as pool:
+        futures = [
+            pool.submit(
+                _generate_one,
+                i,
+                entry,
+                output_dirs[i],
+                cache,
+                link_static,
+                timings,
+                record,
+                dedup,
+                threads,
+            )
+            for i, entry in enumerate(entries)
+        ]
+        for future in futures:
+            yield future.result()
@@ -0,0 +1,211 @@
+"""
+Measure benchmark cases and compare the results against a saved baseline.
+
+This is the machinery behind ``python -m benchmarks.suite``; the cases
+themselves live in ``benchmarks/suite.py``. Cases that have to change global
+state (module attributes, environment variables) use :func:`patched` and
+:func:`patched_env`, so that it's restored for the cases after them.
+
+A results file is JSON::
+
+    {
+        "version": 1,
+        "python": "3.10.12",
+        "platform": "Linux-...",
+        "results": {
+            "<case>": {
+                "median": <seconds per call>,
+                "min": ...,
+                "max": ...,
+                "calls": <calls per sample>,
+                "samples": <number of samples>,
+                "peak_memory": <bytes allocated at peak, one call>
+            },
+            ...
+        }
+    }
+"""
+import contextlib
+import gc
+import json
+import os
+import platform
+import statistics
+import time
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+
+RESULTS_VERSION = 1
+
+# Fail a comparison if a case got this much slower (or bigger) than baseline.
+DEFAULT_THRESHOLD = 0.10
+
+# The extra context that every benchmark generates its projects with.
+BENCH_CONTEXT = {
+    "author": "bench",
+    "author_email": "bench@foo.bar",
+    "create_date": "2020-07-10",
+    "license": "MIT",
+    "package_name": "bench_proj",
+    "project_name": "Bench Project",
+    "project_short_description": "A project used for benchmarks.",
+    "project_slug": "bench-proj",
+    "project_url": "https://foo.bar",
+    "project_host": "GitHub",
+    "create_ci_file": "y",
+    "has_cli": "y",
+}
+
+
+@contextlib.contextmanager
+def patched(obj: Any, name: str, value: Any) -> Iterator[None]:
+    """Set the attribute ``name`` of ``obj`` to ``value`` until the block ends."""
+    old = getattr(obj, name)
+    setattr(obj, name, value)
+    try:
+        yield
+    finally:
+        setattr(obj, name, old)
+
+
+@contextlib.contextmanager
+def patched_env(name: str, value: str) -> Iterator[None]:
+    """Set the environment variable ``name`` to ``value`` until the block ends."""
+    old = os.environ.get(name)
+    os.environ[name] = value
+    try:
+        yield
+    finally:
+        if old is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = old
+
+
+def measure(
+    fn: Callable[..., Any],
+    setup: Optional[Callable[[], tuple]] = None,
+    samples: int = 5,
+    calls: int = 1,
+) -> Dict[str, float]:
+    """
+    Time ``fn`` and measure its peak memory use.
+
+    ``fn`` is called ``calls`` times per sample and the per-call time of each
+    sample is recorded. If ``setup`` is given, it's called (untimed) before
+    each sample and its return value is passed to ``fn`` as positional args.
+
+    Peak memory is measured in a separate, untimed call because tracing
+    allocations slows everything down.
+    """
+    setup = setup or tuple
+
+    args = setup()
+    tracemalloc.start()
+    try:
+        fn(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    times = []
+    for _ in range(samples):
+        args = setup()
+        # Don't let a collection triggered by setup land in the timing.
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn(*args)
+        times.append((time.perf_counter() - start) / calls)
+
+    return {
+        "median": statistics.median(times),
+        "min": min(times),
+        "max": max(times),
+        "calls": calls,
+        "samples": samples,
+        "peak_memory": peak,
+    }
+
+
+def results_document(results: Dict[str, Dict[str, float]]) -> dict:
+    """Wrap ``results`` with enough context to tell where they came from."""
+    return {
+        "version": RESULTS_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def save_results(results: Dict[str, Dict[str, float]], path: Path) -> None:
+    data = json.dumps(results_document(results), indent=2, sort_keys=True)
+    Path(path).write_text(data + "\n", encoding="utf-8")
+
+
+def load_results(path: Path) -> Dict[str, Dict[str, float]]:
+    """
+    Load the results saved by :func:`save_results`.
+
+    Raises :class:`ValueError` if the file isn't a results file that this
+    version understands.
+    """
+    doc = json.loads(Path(path).read_text(encoding="utf-8"))
+    if not isinstance(doc, dict) or doc.get("version") != RESULTS_VERSION:
+        raise ValueError(f"{path} is not a version {RESULTS_VERSION} results file.")
+    return doc["results"]
+
+
+@dataclass
+class Comparison:
+    case: str
+    metric: str
+    baseline: float
+    current: float
+    threshold: float
+
+    @property
+    def change(self) -> float:
+        """Relative change from the baseline. Positive is worse."""
+        if self.baseline == 0:
+            return 0.0 if self.current == 0 else float("inf")
+        return (self.current - self.baseline) / self.baseline
+
+    @property
+    def regressed(self) -> bool:
+        return self.change > self.threshold
+
+
+def compare(
+    baseline: Dict[str, Dict[str, float]],
+    current: Dict[str, Dict[str, float]],
+    threshold: float = DEFAULT_THRESHOLD,
+    metrics: tuple = ("median", "peak_memory"),
+) -> List[Comparison]:
+    """
+    Compare every case that's in both ``baseline`` and ``current``.
+
+    Cases that are only in one of them are skipped, so adding or removing a
+    case doesn't need a new baseline.
+    """
+    comparisons = []
+    for case in sorted(baseline.keys() & current.keys()):
+        for metric in metrics:
+            if metric in baseline[case] and metric in current[case]:
+                comparisons.append(
+                    Comparison(
+                        case,
+                        metric,
+                        baseline[case][metric],
+                        current[case][metric],
+                        threshold,
+                    )
+                )
+    return comparisons
@@ -0,0 +1,32 @@
+"""
+"""
+import pytest
+
+from . import REFERENCE_CONTEXT
+from .matrix import render_matrix
+
+
+def _reference_extra_context():
+    # Until cookiecutter #1433 gets addressed, we need to send in ALL
+    # values present in cookiecutter.json to --extra-context and also pass
+    # --no-input.
+    # https://github.com/cookiecutter/cookiecutter/issues/1433
+    # --no-input is automatically added by main.main if --extra-context is
+    # given.
+    return dict(REFERENCE_CONTEXT)
+
+
+@pytest.fixture
+def extra_context():
+    yield _reference_extra_context()
+
+
+@pytest.fixture(scope="session")
+def matrix(tmp_path_factory):
+    """
+    Every combination of template options, rendered once for the session.
+
+    See :class:`.matrix.RenderMatrix`. Don't modify the rendered projects;
+    they're shared by all tests.
+    """
+    return render_matrix(_reference_extra_context(), tmp_path_factory.mktemp("matrix"))
@@ -0,0 +1,129 @@
+"""
+Store identical files once across many generated projects.
+
+Most of a project's files come out byte-identical in every project of a batch
+(``.gitattributes``, ``setup.py``, ...). With a :class:`BlobStore`, each file
+that the render writes is hashed first. The first file with a given content is
+written as usual and also linked into the store; every later one is linked
+to that blob instead of being written.
+
+The store is just a directory, so it works across the worker processes of a
+batch, and it must be on the same filesystem as the output (see
+:func:`temporary_store`). Once the batch is done the store can be deleted:
+the projects' links keep the data alive.
+
+Hardlinked files share an inode, which saves both disk space and inodes, but
+editing one in place edits all of them. Reflinks (copy-on-write clones, on
+filesystems that support them) only share the data, so they're safe to edit.
+"""
+import contextlib
+import hashlib
+import os
+import shutil
+import stat
+import tempfile
+from pathlib import Path
+from typing import Callable
+from typing import Iterator
+from typing import Tuple
+
+from . import fileops
+from .dircmp import file_hash
+
+LINK_MODES = ("hardlink", "reflink")
+
+
+class BlobStore:
+    """
+    Parameters
+    ----------
+    path : :class:`pathlib.Path`
+        The store directory. It must be on the same filesystem as the output.
+    link : str
+        How duplicates are made: "hardlink" or "reflink".
+    """
+
+    def __init__(self, path: Path, link: str = "hardlink"):
+        if link not in LINK_MODES:
+            raise ValueError(f"Unknown link mode `{link}`.")
+        self.path = Path(path)
+        self.link = link
+
+    def _blob(self, digest: str, mode: int) -> Path:
+        # Hardlinks share the mode too, so it's part of the key.
+        return self.path / digest[:2] / f"{digest}-{mode:o}"
+
+    def _add(
+        self, blob: Path, dst: Path, write: Callable[[Path], None]
+    ) -> Tuple[int, int]:
+        """
+        Make ``dst`` a link to ``blob`` if it exists, otherwise ``write`` it.
+
+        Returns ``(bytes saved, inodes saved)``.
+        """
+        if blob.exists():
+            if self.link == "hardlink":
+                fileops.hardlink(blob, dst)
+                # hardlink falls back to copying, eg: when a file has too
+                # many links.
+                if os.stat(dst).st_ino == os.stat(blob).st_ino:
+                    return blob.stat().st_size, 1
+            elif fileops.reflink(blob, dst):
+                return blob.stat().st_size, 0
+            return 0, 0
+
+        write(dst)
+        blob.parent.mkdir(exist_ok=True)
+        try:
+            os.link(dst, blob)
+        except FileExistsError:
+            # Another worker stored the same content first. This copy just
+            # doesn't get shared.
+            pass
+        return 0, 0
+
+    def add_bytes(self, dst: Path, data: bytes, mode: int) -> Tuple[int, int]:
+        """Write ``data`` to ``dst``, or link it if it's already stored."""
+
+        def write(path):
+            path.write_bytes(data)
+            os.chmod(path, mode)
+
+        digest = hashlib.blake2b(data).hexdigest()
+        return self._add(self._blob(digest, mode), dst, write)
+
+    def add_copy(
+        self, dst: Path, src: Path, copy: Callable[[Path, Path], object]
+    ) -> Tuple[int, int]:
+        """Copy ``src`` to ``dst`` with ``copy``, or link it if it's stored."""
+        mode = stat.S_IMODE(os.stat(src).st_mode)
+        blob = self._blob(file_hash(src).hex(), mode)
+        return self._add(blob, dst, lambda path: copy(src, path))
+
+    def adopt(self, path: Path) -> Tuple[int, int]:
+        """Replace the existing file ``path`` with a link, if it's stored."""
+        h = hashlib.blake2b()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+        blob = self._blob(h.hexdigest(), stat.S_IMODE(os.stat(path).st_mode))
+        if not blob.exists():
+            return self._add(blob, path, lambda _: None)
+
+        # Link next to the file and then swap it in, so that ``path`` is
+        # never missing.
+        tmp = path.with_name(f".{path.name}.dedup")
+        saved = self._add(blob, tmp, lambda _: None)
+        os.replace(tmp, path)
+        return saved
+
+
+@contextlib.contextmanager
+def temporary_store(output_dir: Path, link: str = "hardlink") -> Iterator[BlobStore]:
+    """A :class:`BlobStore` in ``output_dir`` that's deleted afterwards."""
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    path = tempfile.mkdtemp(prefix=".dedup-", dir=output_dir)
+    try:
+        yield BlobStore(Path(path), link)
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,212 @@
+"""
+Compare two directory trees, quickly.
+
+Only the files that could be equal are read:
+
+1. Both trees are walked and the relative paths are compared, which finds
+   missing and extra files.
+2. Files that are in both trees are ``stat``-ed. Files with different sizes
+   differ, no reading needed.
+3. The remaining candidates are hashed, streaming, on a thread pool.
+4. Diffs are only made (by :func:`format_diff`) for files that differ.
+
+Hashes are memoized by (path, inode, mtime, ctime, size), so comparing many
+trees against the same golden tree only hashes the golden files once. The
+memo only keeps the most recently used :data:`HASH_MEMO_SIZE` hashes, and
+callers that compare files which are being edited (like ``watch``) can skip
+it with ``memo=False``: an edit that keeps the size within the filesystem's
+timestamp resolution isn't visible in the stat.
+
+Binary files are supported. They're compared the same way and are reported
+as "Binary files ... differ" instead of with a diff.
+"""
+import difflib
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from dataclasses import field
+from pathlib import Path
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+CHUNK_SIZE = 1024 * 1024
+
+# Editor swap files, so that having a golden file open doesn't fail tests.
+DEFAULT_IGNORE_SUFFIXES = (".swp",)
+
+# How many file hashes are memoized.
+HASH_MEMO_SIZE = 4096
+
+# (path, inode, mtime_ns, ctime_ns, size) -> digest, least recently used first.
+_hash_memo: "OrderedDict[Tuple[str, int, int, int, int], bytes]" = OrderedDict()
+_hash_memo_lock = threading.Lock()
+
+
+@dataclass
+class TreeDiff:
+    """
+    The differences between two trees. All paths are relative, with ``/``.
+
+    ``missing`` are in ``expected`` but not ``actual``, ``extra`` are the
+    opposite, and ``differing`` are in both but have different contents.
+    """
+
+    actual: Path
+    expected: Path
+    missing: List[str] = field(default_factory=list)
+    extra: List[str] = field(default_factory=list)
+    differing: List[str] = field(default_factory=list)
+    compared: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return not (self.missing or self.extra or self.differing)
+
+
+def list_files(
+    root: Path, ignore_suffixes: Iterable[str] = DEFAULT_IGNORE_SUFFIXES
+) -> Set[str]:
+    """Return the relative (``/``-separated) path of every file under ``root``."""
+    ignore_suffixes = tuple(ignore_suffixes)
+    files = set()
+    for dirpath, _, filenames in os.walk(root):
+        rel_dir = os.path.relpath(dirpath, root)
+        for name in filenames:
+            if ignore_suffixes and name.endswith(ignore_suffixes):
+                continue
+            rel = name if rel_dir == "." else os.path.join(rel_dir, name)
+            files.add(rel.replace(os.sep, "/"))
+    return files
+
+
+def file_hash(
+    path: Path, st: Optional[os.stat_result] = None, memo: bool = True
+) -> bytes:
+    """
+    Hash the contents of ``path``, reading it in chunks.
+
+    If ``memo`` is False then the file is always read, and the hash isn't
+    memoized either.
+    """
+    if memo:
+        st = st or os.stat(path)
+        key = (str(path), st.st_ino, st.st_mtime_ns, st.st_ctime_ns, st.st_size)
+        with _hash_memo_lock:
+            digest = _hash_memo.get(key)
+            if digest is not None:
+                _hash_memo.move_to_end(key)
+                return digest
+
+    h = hashlib.blake2b()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    digest = h.digest()
+
+    if memo:
+        with _hash_memo_lock:
+            _hash_memo[key] = digest
+            while len(_hash_memo) > HASH_MEMO_SIZE:
+                _hash_memo.popitem(last=False)
+    return digest
+
+
+def compare_trees(
+    actual: Path,
+    expected: Path,
+    workers: Optional[int] = None,
+    ignore_suffixes: Iterable[str] = DEFAULT_IGNORE_SUFFIXES,
+    paths: Optional[Iterable[str]] = None,
+    memo: bool = True,
+) -> TreeDiff:
+    """
+    Compare the files in ``actual`` against the ones in ``expected``.
+
+    Only file contents are compared, not modes or empty directories.
+    ``workers`` is the number of threads used for hashing. If ``paths``
+    (relative, with ``/``) are given then only those are compared and the
+    trees aren't walked. ``memo`` is passed on to :func:`file_hash`.
+    """
+    actual = Path(actual)
+    expected = Path(expected)
+    if paths is None:
+        actual_files = list_files(actual, ignore_suffixes)
+        expected_files = list_files(expected, ignore_suffixes)
+    else:
+        paths = set(paths)
+        actual_files = {rel for rel in paths if (actual / rel).is_file()}
+        expected_files = {rel for rel in paths if (expected / rel).is_file()}
+
+    diff = TreeDiff(actual, expected)
+    diff.missing = sorted(expected_files - actual_files)
+    diff.extra = sorted(actual_files - expected_files)
+
+    common = sorted(actual_files & expected_files)
+    diff.compared = len(common)
+
+    candidates = []
+    differing = set()
+    for rel in common:
+        a_stat = os.stat(actual / rel)
+        e_stat = os.stat(expected / rel)
+        if a_stat.st_size != e_stat.st_size:
+            differing.add(rel)
+        else:
+            candidates.append((rel, a_stat, e_stat))
+
+    def _same(candidate) -> bool:
+        rel, a_stat, e_stat = candidate
+        return file_hash(actual / rel, a_stat, memo) == file_hash(
+            expected / rel, e_stat, memo
+        )
+
+    if candidates:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for (rel, _, _), same in zip(candidates, pool.map(_same, candidates)):
+                if not same:
+                    differing.add(rel)
+
+    diff.differing = sorted(differing)
+    return diff
+
+
+def _read_lines(path: Path) -> Optional[List[str]]:
+    """Return the lines of a text file, or None if it's binary."""
+    data = path.read_bytes()
+    if b"\0" in data:
+        return None
+    try:
+        return data.decode("utf-8").splitlines(keepends=True)
+    except UnicodeDecodeError:
+        return None
+
+
+def format_diff(diff: TreeDiff, context_lines: int = 2) -> str:
+    """Return a human-readable report of ``diff``, with unified diffs."""
+    parts = []
+    parts.extend(f"Missing: {rel}" for rel in diff.missing)
+    parts.extend(f"Extra: {rel}" for rel in diff.extra)
+
+    for rel in diff.differing:
+        a_path = diff.actual / rel
+        e_path = diff.expected / rel
+        a_lines = _read_lines(a_path)
+        e_lines = _read_lines(e_path)
+        if a_lines is None or e_lines is None:
+            parts.append(f"Binary files {a_path} and {e_path} differ")
+            continue
+        lines = difflib.unified_diff(
+            a_lines, e_lines, fromfile=str(a_path), tofile=str(e_path), n=context_lines
+        )
+        # Make sure the last line of each file doesn't run into the next.
+        parts.append(
+            "".join(line if line.endswith("\n") else line + "\n" for line in lines)
+        )
+
+    return "\n".join(parts)
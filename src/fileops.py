@@ -0,0 +1,89 @@
+"""
+Fast file copying primitives.
+
++ :func:`copy_file` copies in the kernel with ``copy_file_range`` (or
+  ``sendfile``) so that the data never passes through Python.
++ :func:`reflink` makes a copy-on-write clone where the filesystem supports
+  it (btrfs, XFS, ...).
++ :func:`hardlink` links the file, which copies nothing at all.
+
+Each one falls back to the next-best option when the fast path isn't
+available, and all of them copy the file mode.
+"""
+import errno
+import os
+import shutil
+from pathlib import Path
+
+# From linux/fs.h
+_FICLONE = 0x40049409
+
+
+def _copy_range(fd_in: int, fd_out: int, size: int) -> None:
+    """Copy ``size`` bytes between file descriptors without leaving the kernel."""
+    copy = getattr(os, "copy_file_range", None)
+    offset = 0
+    while offset < size:
+        if copy is not None:
+            try:
+                n = copy(fd_in, fd_out, size - offset)
+            except OSError as err:
+                # Eg: EXDEV on older kernels. sendfile can still do it.
+                if err.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL):
+                    raise
+                copy = None
+                continue
+        else:
+            n = os.sendfile(fd_out, fd_in, offset, size - offset)
+        if n == 0:
+            break
+        offset += n
+
+
+def copy_file(src: Path, dst: Path) -> int:
+    """
+    Copy ``src`` to ``dst`` with zero-copy syscalls where available.
+
+    Returns the number of bytes copied.
+    """
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        try:
+            _copy_range(fsrc.fileno(), fdst.fileno(), size)
+        except (AttributeError, OSError):
+            # No sendfile (eg: Windows) or it failed. Start over in userspace.
+            fsrc.seek(0)
+            fdst.seek(0)
+            fdst.truncate()
+            shutil.copyfileobj(fsrc, fdst)
+    shutil.copymode(src, dst)
+    return size
+
+
+def reflink(src: Path, dst: Path) -> bool:
+    """
+    Copy ``src`` to ``dst`` as a reflink (copy-on-write clone) if possible.
+
+    Falls back to :func:`copy_file` on filesystems (or platforms) that don't
+    support reflinks. Returns True if it was a reflink.
+    """
+    try:
+        import fcntl
+
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+    except (ImportError, OSError):
+        copy_file(src, dst)
+        return False
+    shutil.copymode(src, dst)
+    return True
+
+
+def hardlink(src: Path, dst: Path) -> None:
+    """Hardlink ``src`` to ``dst``, copying if they're on different devices."""
+    try:
+        os.link(src, dst)
+    except OSError as err:
+        if err.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+            raise
+        reflink(src, dst)
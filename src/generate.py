@@ -0,0 +1,271 @@
+"""
+Generate a project from the template.
+
+This uses cookiecutter's own building blocks for the context so that the
+template only needs to be parsed once (see :func:`prepare_template`). Hooks
+are run in-process (see :mod:`.hook_runner`) and files are rendered following
+a render plan (see :mod:`.render`).
+"""
+import copy
+import functools
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import BinaryIO
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+from typing import TYPE_CHECKING
+
+from cookiecutter.config import get_user_config
+from cookiecutter.environment import StrictEnvironment
+from cookiecutter.exceptions import UndefinedVariableInTemplate
+from cookiecutter.generate import apply_overwrites_to_context
+from cookiecutter.generate import generate_context
+from cookiecutter.prompt import prompt_for_config
+from jinja2.exceptions import UndefinedError
+
+from . import hook_runner
+from . import render
+from . import TEMPLATE_DIR
+from .timings import NULL_TIMINGS
+from .timings import Timings
+
+if TYPE_CHECKING:
+    from .dedup import BlobStore
+    from .output_cache import OutputCache
+
+
+def prepare_template(template_dir: Path = TEMPLATE_DIR) -> dict:
+    """
+    Parse ``cookiecutter.json`` and the user config once.
+
+    Returns the base context that each project's extra context is applied to.
+    """
+    config_dict = get_user_config()
+    context = generate_context(
+        context_file=os.path.join(template_dir, "cookiecutter.json"),
+        default_context=config_dict["default_context"],
+    )
+    context["cookiecutter"]["_template"] = str(template_dir)
+    context["cookiecutter"]["_repo_dir"] = str(template_dir)
+    return context
+
+
+def resolve_context(
+    base_context: dict,
+    extra_context: Optional[dict],
+    output_dir: str,
+    no_input: bool = True,
+) -> dict:
+    """
+    Apply ``extra_context`` to a copy of the base context and render it.
+
+    The user is prompted for any values if ``no_input`` is False.
+    """
+    context = copy.deepcopy(base_context)
+    if extra_context:
+        apply_overwrites_to_context(context["cookiecutter"], extra_context)
+    context["_cookiecutter"] = {
+        k: v for k, v in context["cookiecutter"].items() if not k.startswith("_")
+    }
+    # Private ("_foo") variables are passed through untouched.
+    if no_input:
+        context["cookiecutter"].update(_render_variables(context))
+    else:
+        context["cookiecutter"].update(prompt_for_config(context, no_input=False))
+    context["cookiecutter"]["_output_dir"] = os.path.abspath(output_dir)
+    return context
+
+
+@functools.lru_cache(maxsize=None)
+def _variable_environment(extensions: Tuple[str, ...]) -> StrictEnvironment:
+    context = {"cookiecutter": {"_extensions": list(extensions)}}
+    return StrictEnvironment(context=context)
+
+
+@functools.lru_cache(maxsize=4096)
+def _variable_template(env: StrictEnvironment, raw: str):
+    return env.from_string(raw)
+
+
+def _render_variable(env: StrictEnvironment, raw, cookiecutter_dict: dict):
+    """:func:`cookiecutter.prompt.render_variable`, with compiled templates reused."""
+    if raw is None or isinstance(raw, bool):
+        return raw
+    elif isinstance(raw, dict):
+        return {
+            _render_variable(env, k, cookiecutter_dict): _render_variable(
+                env, v, cookiecutter_dict
+            )
+            for k, v in raw.items()
+        }
+    elif isinstance(raw, list):
+        return [_render_variable(env, v, cookiecutter_dict) for v in raw]
+    elif not isinstance(raw, str):
+        raw = str(raw)
+    return _variable_template(env, raw).render(cookiecutter=cookiecutter_dict)
+
+
+def _render_variables(context: dict) -> dict:
+    """
+    Do what ``prompt_for_config(context, no_input=True)`` does, but faster.
+
+    Cookiecutter makes a new Jinja environment and compiles every variable
+    for every project, which is most of the time it takes to resolve a
+    context. Here the environment and the compiled variables are reused. The
+    tests check that the results are the same.
+    """
+    cookiecutter_dict: Dict = OrderedDict()
+    extensions = context["cookiecutter"].get("_extensions", [])
+    env = _variable_environment(tuple(str(ext) for ext in extensions))
+    # Not needed without prompts, but cookiecutter removes it.
+    context["cookiecutter"].pop("__prompts__", None)
+
+    # First pass: everything but dicts, which might refer to other variables.
+    for key, raw in context["cookiecutter"].items():
+        try:
+            if key.startswith("_") and not key.startswith("__"):
+                cookiecutter_dict[key] = raw
+            elif key.startswith("__"):
+                cookiecutter_dict[key] = _render_variable(env, raw, cookiecutter_dict)
+            elif isinstance(raw, list):
+                # A choice variable; the first option is the default.
+                options = _render_variable(env, raw, cookiecutter_dict)
+                cookiecutter_dict[key] = options[0]
+            elif not isinstance(raw, dict):
+                cookiecutter_dict[key] = _render_variable(env, raw, cookiecutter_dict)
+        except UndefinedError as err:
+            msg = f"Unable to render variable '{key}'"
+            raise UndefinedVariableInTemplate(msg, err, context) from err
+
+    # Second pass: dicts.
+    for key, raw in context["cookiecutter"].items():
+        if key.startswith("_") and not key.startswith("__"):
+            continue
+        try:
+            if isinstance(raw, dict):
+                cookiecutter_dict[key] = _render_variable(env, raw, cookiecutter_dict)
+        except UndefinedError as err:
+            msg = f"Unable to render variable '{key}'"
+            raise UndefinedVariableInTemplate(msg, err, context) from err
+
+    return cookiecutter_dict
+
+
+def generate_project(
+    context: dict,
+    output_dir: str,
+    cache: Optional["OutputCache"] = None,
+    stats: Optional[render.RenderStats] = None,
+    link_static: bool = False,
+    timings: Optional[Timings] = None,
+    record: bool = False,
+    dedup: Optional["BlobStore"] = None,
+    threads: int = 1,
+) -> Path:
+    """
+    Render the project described by ``context`` into ``output_dir``.
+
+    The pre-gen hook is run in-process. The post-gen hook's actions are
+    handled by the render plan so it isn't run at all. Returns the path to
+    the new project.
+
+    If ``cache`` is given then the project is materialized from it when
+    possible, and added to it otherwise.
+
+    ``stats``, ``link_static``, ``dedup`` and ``threads`` are passed on to
+    :func:`.render.render_project`. Nothing is counted (or deduplicated) on
+    a cache hit.
+
+    If ``timings`` is given then each phase is timed.
+
+    If ``record`` is True then a manifest is written to the project so that
+    it can be updated later (see :mod:`.update`).
+
+    If the context's ``_git_init`` is "y" then the project is made into a git
+    repo with everything in the initial commit (see
+    :func:`.hook_runner.init_git_repo`).
+    """
+    timings = timings if timings is not None else NULL_TIMINGS
+
+    with timings.phase("pre_gen_hook"):
+        hook_runner.run_pre_gen_project(context)
+
+    key = None
+    project_dir = None
+    if cache is not None:
+        with timings.phase("cache_lookup"):
+            key = cache.key(context)
+            project_dir = cache.materialize(key, output_dir)
+
+    if project_dir is None:
+        with timings.phase("render"):
+            project_dir = render.render_project(
+                context, output_dir, stats, link_static, timings, dedup, threads
+            )
+
+        if cache is not None:
+            with timings.phase("cache_store"):
+                cache.store(key, project_dir)
+
+    if record:
+        from .update import record_manifest
+
+        with timings.phase("record"):
+            record_manifest(context, project_dir)
+
+    if context["cookiecutter"].get("_git_init") == "y":
+        with timings.phase("git_init"):
+            hook_runner.init_git_repo(context, project_dir)
+    return project_dir
+
+
+def generate_in_memory(
+    context: dict,
+    stats: Optional[render.RenderStats] = None,
+    timings: Optional[Timings] = None,
+) -> render.MemoryTree:
+    """
+    Render the project described by ``context`` into memory.
+
+    This is :func:`generate_project` without the filesystem: the pre-gen
+    hook is run in-process and the post-gen hook's actions are part of the
+    render plan, so the returned tree is exactly what would've been written.
+    """
+    timings = timings if timings is not None else NULL_TIMINGS
+
+    with timings.phase("pre_gen_hook"):
+        hook_runner.run_pre_gen_project(context)
+
+    with timings.phase("render"):
+        return render.render_to_memory(context, stats, timings)
+
+
+def generate_archive(
+    context: dict,
+    fileobj: BinaryIO,
+    fmt: str,
+    stats: Optional[render.RenderStats] = None,
+    timings: Optional[Timings] = None,
+) -> None:
+    """
+    Render the project described by ``context`` into an archive.
+
+    The archive (``fmt`` is one of :data:`.archive.FORMATS`) is streamed to
+    ``fileobj``, which doesn't need to be seekable. Every entry is inside a
+    directory named after the project. Hooks are handled the same way as in
+    :func:`generate_project`.
+    """
+    from . import archive
+
+    timings = timings if timings is not None else NULL_TIMINGS
+
+    with timings.phase("pre_gen_hook"):
+        hook_runner.run_pre_gen_project(context)
+
+    with timings.phase("render"):
+        template_dir, env, project_name = render.prepare(context)
+        sink = archive.archive_sink(fmt, fileobj, project_name)
+        render.render_into(sink, context, template_dir, env, stats, timings)
+        sink.close()
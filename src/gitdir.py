@@ -0,0 +1,125 @@
+"""
+Read the HEAD commit of a git repository without running ``git``.
+
+This only handles the common layouts: a regular ``.git`` directory, loose or
+packed refs, and a loose commit object. Anything else (worktrees, alternates,
+packed objects, ...) raises :class:`GitReadError` so that the caller can fall
+back to running ``git`` itself.
+"""
+import datetime
+import zlib
+from pathlib import Path
+from typing import Optional
+from typing import Tuple
+
+# Symbolic refs can point at other symbolic refs. Git itself gives up at 5.
+_MAX_REF_DEPTH = 5
+
+
+class GitReadError(Exception):
+    pass
+
+
+def find_git_dir(path: Path) -> Path:
+    """
+    Find the ``.git`` directory for the repository containing ``path``.
+
+    Raises :class:`GitReadError` if there isn't one or if it's a layout
+    that we don't handle.
+    """
+    path = Path(path).resolve()
+    for directory in (path, *path.parents):
+        git = directory / ".git"
+        if git.is_dir():
+            break
+        if git.exists():
+            # A ".git" *file* means a worktree or submodule.
+            raise GitReadError(f"{git} is a gitdir link, not a directory.")
+    else:
+        raise GitReadError(f"{path} is not in a git repository.")
+
+    for unsupported in ("commondir", "objects/info/alternates"):
+        if (git / unsupported).exists():
+            raise GitReadError(f"{git / unsupported} is not supported.")
+
+    return git
+
+
+def _read_packed_ref(git_dir: Path, ref: str) -> Optional[str]:
+    try:
+        with open(git_dir / "packed-refs", encoding="utf-8") as f:
+            for line in f:
+                # Skip the header comment and peeled tags ("^<sha>").
+                if line.startswith(("#", "^")):
+                    continue
+                sha, _, name = line.rstrip("\n").partition(" ")
+                if name == ref:
+                    return sha
+    except FileNotFoundError:
+        pass
+    return None
+
+
+def resolve_head(git_dir: Path) -> str:
+    """Return the commit hash that HEAD points to."""
+    value = (git_dir / "HEAD").read_text(encoding="utf-8").strip()
+
+    for _ in range(_MAX_REF_DEPTH):
+        if not value.startswith("ref: "):
+            return value
+
+        ref = value[len("ref: ") :]
+        try:
+            value = (git_dir / ref).read_text(encoding="utf-8").strip()
+        except FileNotFoundError:
+            value = _read_packed_ref(git_dir, ref)
+            if value is None:
+                raise GitReadError(f"Unable to resolve ref `{ref}`.")
+
+    raise GitReadError("Too many levels of symbolic refs.")
+
+
+def _format_git_date(timestamp: str, offset: str) -> str:
+    """Format an author date the same way as ``git log --format=%ai``."""
+    sign = -1 if offset.startswith("-") else 1
+    delta = datetime.timedelta(hours=int(offset[1:3]), minutes=int(offset[3:5]))
+    tz = datetime.timezone(sign * delta)
+    dt = datetime.datetime.fromtimestamp(int(timestamp), tz=tz)
+    return dt.strftime("%Y-%m-%d %H:%M:%S ") + offset
+
+
+def read_commit_author_date(git_dir: Path, commit_hash: str) -> str:
+    """Return the author date of a *loose* commit object, like ``%ai``."""
+    obj = git_dir / "objects" / commit_hash[:2] / commit_hash[2:]
+    try:
+        raw = zlib.decompress(obj.read_bytes())
+    except FileNotFoundError:
+        raise GitReadError(f"Commit {commit_hash} is not a loose object.")
+    except zlib.error as err:
+        raise GitReadError(f"Unable to inflate {obj}: {err}")
+
+    header, _, body = raw.partition(b"\0")
+    if not header.startswith(b"commit "):
+        raise GitReadError(f"{commit_hash} is not a commit.")
+
+    for line in body.split(b"\n"):
+        if line == b"":
+            # End of the headers; the commit message follows.
+            break
+        if line.startswith(b"author "):
+            # author Name <email> 1630867420 -0700
+            timestamp, offset = line.rsplit(b" ", 2)[1:]
+            return _format_git_date(timestamp.decode(), offset.decode())
+
+    raise GitReadError(f"Commit {commit_hash} has no author.")
+
+
+def head_commit_info(path: Path) -> Tuple[str, str]:
+    """
+    Return a two-tuple of (hash, author date) for HEAD of the repo at ``path``.
+
+    Raises :class:`GitReadError` if the repository can't be read directly.
+    """
+    git_dir = find_git_dir(path)
+    commit_hash = resolve_head(git_dir)
+    return commit_hash, read_commit_author_date(git_dir, commit_hash)
@@ -0,0 +1,52 @@
+"""
+Measure import times with ``python -X importtime``.
+
+Every measurement runs in a fresh interpreter so that nothing is already
+imported (and cached in ``sys.modules``) by the caller.
+"""
+import subprocess
+import sys
+from typing import Dict
+from typing import Optional
+
+from . import TEMPLATE_DIR
+
+
+def import_times(code: str = "import src.main") -> Dict[str, int]:
+    """
+    Run ``code`` in a fresh interpreter and return its import times.
+
+    Returns a dict of ``{module_name: cumulative_microseconds}`` for every
+    module that was imported, including the ones imported by ``site``.
+    """
+    cmd = [sys.executable, "-X", "importtime", "-c", code]
+    proc = subprocess.run(
+        cmd,
+        cwd=TEMPLATE_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        check=True,
+    )
+
+    times = {}
+    for line in proc.stderr.decode("utf-8").splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            # The header line.
+            continue
+        times[name.strip()] = int(cumulative)
+
+    return times
+
+
+def best_import_time(module: str, code: Optional[str] = None, repeat: int = 3) -> int:
+    """
+    Return the best-of-``repeat`` cumulative import time of ``module``, in us.
+
+    ``code`` defaults to ``import <module>``.
+    """
+    code = code or f"import {module}"
+    return min(import_times(code)[module] for _ in range(repeat))
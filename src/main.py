@@ -1,20 +1,42 @@
 """
+Note: cookiecutter (and through it jinja2, rich, requests, ...) is slow to
+import, so it's only imported on the code paths that use it. The same goes
+for requests in .webapi. This keeps things like `--help` fast; the startup
+budget is enforced by test_startup.py.
 """
 import ast
+import contextlib
 import datetime
-import subprocess
+import os
+import sys
+import threading
+import time
 from functools import partial
+from pathlib import Path
+from typing import BinaryIO
+from typing import List
+from typing import Optional
 from typing import Tuple
 
 import click
-import requests
-from cookiecutter.main import cookiecutter
 
-echo = partial(click.secho, fg="yellow", bold=True)
+from . import DATA_DIR
+from . import gitdir
+from . import TEMPLATE_DIR
+from .timings import NULL_TIMINGS
+from .timings import Timings
+from .timings import write_report
+from .webapi import ApiClient
+from .webapi import cached_get
+from .webapi import DEFAULT_CACHE_TTL
+from .webapi import DEFAULT_TIMEOUT
+from .webapi import NotFoundError
+from .webapi import ResponseCache
+from .webapi import WebApiError
 
+echo = partial(click.secho, fg="yellow", bold=True)
 
-class WebApiError(Exception):
-    pass
+REMOTE_API_URL = "https://api.github.com/repos/dougthor42/_template_python"
 
 
 def _get_current_local_commit_info() -> Tuple[str, str]:
@@ -22,57 +44,87 @@ def _get_current_local_commit_info() -> Tuple[str, str]:
     Get the current local commit information.
 
     Returns a two-tuple of (hash, datetime).
+
+    The ``.git`` directory is read directly when possible, which saves
+    spawning ``git`` twice. Layouts that we can't read ourselves fall back to
+    asking ``git``.
     """
+    try:
+        return gitdir.head_commit_info(TEMPLATE_DIR)
+    except (gitdir.GitReadError, OSError, ValueError):
+        return _get_current_local_commit_info_from_git()
+
+
+def _get_current_local_commit_info_from_git() -> Tuple[str, str]:
+    """
+    Get the current local commit information by running ``git``.
+
+    Returns a two-tuple of (hash, datetime).
+    """
+    import subprocess
+
     cmd = ["git", "rev-parse", "HEAD"]
     # reminder: catpure_output was added in 3.7   :-(
-    proc = subprocess.run(cmd, stdout=subprocess.PIPE)
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, cwd=TEMPLATE_DIR)
     commit_hash = proc.stdout.strip().decode("utf-8")
 
     # From https://stackoverflow.com/a/51403241/1354930
     cmd = ["git", "--no-pager", "log", "-1", "--format='%ai'"]
-    proc = subprocess.run(cmd, stdout=subprocess.PIPE)
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, cwd=TEMPLATE_DIR)
     commit_date = proc.stdout.strip().decode("utf-8").strip("'")
 
     return commit_hash, commit_date
 
 
-def _get_current_remote_commit_info(api_base_url: str) -> Tuple[str, str]:
+def _get_current_remote_commit_info(
+    api_base_url: str, client: Optional[ApiClient] = None
+) -> Tuple[str, str]:
     """
     Get the current remote repositiory's latest commit information.
 
     Returns a 2-tuple of (commit_hash, commit_date)..
+
+    If ``client`` isn't given then a one-off, uncached request is made.
     """
     # Note: We intentionally do not use `git fetch` because I don't want
     # to make any changes whatsoever to the user's local repo. So instead
     # use the github api.
 
-    resp = requests.get(api_base_url + "/commits/master")
-    json = resp.json()
+    def extract(json):
+        return [json["sha"], json["commit"]["author"]["date"]]
 
-    commit_hash = json["sha"]
-    commit_date = json["commit"]["author"]["date"]
+    url = api_base_url + "/commits/master"
+    if client is None:
+        commit_hash, commit_date = cached_get(url, extract)
+    else:
+        commit_hash, commit_date = client.get(url, extract)
 
     return commit_hash, commit_date
 
 
 def _get_diff_total_commits(
-    api_base_url: str, local_hash: str, remote_hash: str
+    api_base_url: str,
+    local_hash: str,
+    remote_hash: str,
+    client: Optional[ApiClient] = None,
 ) -> int:
     compare = f"/compare/{local_hash}...{remote_hash}"
 
-    resp = requests.get(api_base_url + compare)
+    def extract(json):
+        return json["total_commits"]
 
-    if resp.status_code == 404:
+    try:
+        if client is None:
+            commits_ahead = cached_get(api_base_url + compare, extract)
+        else:
+            commits_ahead = client.get(api_base_url + compare, extract)
+    except NotFoundError:
         raise WebApiError(
             f"Got 404 for {api_base_url}{compare}. Likely cause"
             f"is that {local_hash} does not exist in the remote (eg: the"
             "user has local commits present)."
         )
 
-    json = resp.json()
-
-    commits_ahead = json["total_commits"]
-
     return commits_ahead
 
 
@@ -120,47 +172,134 @@ def _fix_timestamp(ts: str) -> str:
     return dt.isoformat(sep=" ")
 
 
-def _check_repo() -> None:
+def _get_version_warning(
+    cache_ttl: float = DEFAULT_CACHE_TTL, timeout: Optional[float] = DEFAULT_TIMEOUT
+) -> List[str]:
     """
-    Check what version the user has against remote and warn if an update is
-    available.
+    Check what version the user has against remote and return the lines of a
+    warning if an update is available.
 
     This is a fairly simple and naive version check. If the user has local
     commits, then we don't display the the behind/ahead commit count.
+
+    API responses are cached on disk for ``cache_ttl`` seconds and then
+    revalidated with a conditional request. ``timeout`` applies to each
+    request.
     """
-    remote_url = "https://api.github.com/repos/dougthor42/_template_python"
+    remote_url = REMOTE_API_URL
+    cache = ResponseCache(ttl=cache_ttl)
 
-    local_hash, local_date = _get_current_local_commit_info()
-    remote_hash, remote_date = _get_current_remote_commit_info(remote_url)
+    with ApiClient(cache=cache, timeout=timeout) as client:
+        # The remote lookup doesn't depend on the local one, so run it while
+        # we're waiting on git.
+        remote_future = client.submit(
+            _get_current_remote_commit_info, remote_url, client
+        )
+        local_hash, local_date = _get_current_local_commit_info()
+        remote_hash, remote_date = remote_future.result()
 
-    if local_hash == remote_hash:
-        return
+        if local_hash == remote_hash:
+            return []
 
-    local_date = _fix_timestamp(local_date)
-    remote_date = _fix_timestamp(remote_date)
+        # Fire the compare request as soon as both hashes are known and do
+        # the rest of the work while it's in flight.
+        compare_future = client.submit(
+            _get_diff_total_commits, remote_url, local_hash, remote_hash, client
+        )
 
-    # Figure out how many commits we are behind.
-    remote_msg = f"  Remote: {remote_hash:<10} / {remote_date}"
-    try:
-        commit_qty = _get_diff_total_commits(remote_url, local_hash, remote_hash)
-        commits_ahead = str(commit_qty) + " " + pluralize("commit", commit_qty)
+        local_date = _fix_timestamp(local_date)
+        remote_date = _fix_timestamp(remote_date)
 
-        remote_msg += f" / {commits_ahead} ahead"
-    except WebApiError:
-        # We can't figure out how many commits we are ahead, likely because
-        # the user has local commits that don't exist in the remote.
-        pass
+        # Figure out how many commits we are behind.
+        remote_msg = f"  Remote: {remote_hash:<10} / {remote_date}"
+        try:
+            commit_qty = compare_future.result()
+            commits_ahead = str(commit_qty) + " " + pluralize("commit", commit_qty)
+
+            remote_msg += f" / {commits_ahead} ahead"
+        except WebApiError:
+            # We can't figure out how many commits we are ahead, likely because
+            # the user has local commits that don't exist in the remote.
+            pass
+
+    return [
+        "A new version of this template is available.",
+        f"  Local:  {local_hash:<10} / {local_date}",
+        remote_msg,
+    ]
+
+
+class _BackgroundVersionCheck:
+    """
+    Run the version check in a background thread with a hard deadline.
+
+    The check starts as soon as this is created. :meth:`report` waits, at
+    most, until ``timeout`` seconds after the start and then prints the
+    warning if the check finished. A check that is still running (eg: because
+    api.github.com is slow) or that failed is silently dropped, so the version
+    check never extends a generation past ``timeout`` seconds.
+    """
+
+    def __init__(self, cache_ttl: float, timeout: float):
+        self.deadline = time.monotonic() + timeout
+        self._lines: List[str] = []
+        self._done = threading.Event()
+
+        # Daemon so that a hung request can't stop the interpreter exiting.
+        thread = threading.Thread(
+            target=self._run, args=(cache_ttl, timeout), daemon=True
+        )
+        thread.start()
 
-    # print the warning
-    echo("A new version of this template is available.")
-    echo(f"  Local:  {local_hash:<10} / {local_date}")
-    echo(remote_msg)
-    echo("It's recommended that you abort (CTRL-C) and then run `git pull`.")
+    def _run(self, cache_ttl: float, timeout: float) -> None:
+        try:
+            self._lines = _get_version_warning(cache_ttl, timeout)
+        except Exception:
+            # The version check is a nicety. Never let it break anything.
+            pass
+        finally:
+            self._done.set()
+
+    def report(self) -> None:
+        remaining = max(0.0, self.deadline - time.monotonic())
+        if not self._done.wait(remaining) or not self._lines:
+            return
+
+        for line in self._lines:
+            echo(line)
+        echo("It's recommended that you run `git pull` and recreate the project.")
+
+
+def _get_timings(ctx: Optional[click.Context] = None) -> Timings:
+    """Return the run's :class:`Timings`, or a no-op one if not enabled."""
+    ctx = ctx or click.get_current_context()
+    return ctx.meta.get("timings", NULL_TIMINGS)
+
+
+def _start_timings(ctx, param, value):
+    # This is an eager option so that timing starts before any other option
+    # (eg: --extra-context) is processed.
+    if value is not None:
+        ctx.meta["timings"] = Timings()
+    return value
+
+
+def _report_version_check(
+    version_checker: Optional[_BackgroundVersionCheck], timings: Timings
+) -> None:
+    if version_checker is not None:
+        with timings.phase("version_check"):
+            version_checker.report()
 
 
 def _parse_extra_context(ctx, param, value):
     if value is None:
         return value
+    with _get_timings(ctx).phase("parse_extra_context"):
+        return _literal_eval_dict(value)
+
+
+def _literal_eval_dict(value: str) -> dict:
     try:
         d = ast.literal_eval(value)
         if isinstance(d, dict):
@@ -174,7 +313,169 @@ def _parse_extra_context(ctx, param, value):
         raise click.BadParameter("Can't parse value into a dict of literals.")
 
 
-@click.command()
+def _run_batch(
+    outdir: str,
+    manifest: str,
+    extra_context: dict,
+    workers: int,
+    cache=None,
+    link_static: bool = False,
+    timings: Optional[Timings] = None,
+    record: bool = False,
+    dedup: Optional[str] = None,
+    threads: int = 1,
+) -> bool:
+    """
+    Create one project per manifest entry and report how each one went.
+
+    Returns ``True`` if every project was created successfully. If
+    ``timings`` is given then each project's own timings report is added to
+    it as ``meta["projects"]``. If ``dedup`` ("hardlink" or "reflink") is
+    given then identical files are stored once across all the projects.
+    """
+    from . import batch
+
+    try:
+        entries = batch.load_manifest(manifest)
+    except ValueError as err:
+        raise click.BadParameter(str(err), param_hint="--manifest")
+
+    project_timings = []
+    if timings is not None:
+        timings.meta["projects"] = project_timings
+
+    entries = [{**extra_context, **entry} for entry in entries]
+
+    from .render import RenderStats
+
+    start = time.perf_counter()
+    failed = 0
+    totals = RenderStats()
+    with contextlib.ExitStack() as stack:
+        blobs = None
+        if dedup is not None:
+            from .dedup import temporary_store
+
+            blobs = stack.enter_context(temporary_store(outdir, dedup))
+        results = batch.run_batch(
+            entries,
+            outdir,
+            workers=workers,
+            cache=cache,
+            link_static=link_static,
+            timings=timings is not None,
+            record=record,
+            dedup=blobs,
+            threads=threads,
+        )
+        for result in results:
+            if result.timings is not None:
+                project_timings.append(result.timings)
+            if result.stats is not None:
+                totals.files_rendered += result.stats.files_rendered
+                totals.bytes_rendered += result.stats.bytes_rendered
+                totals.files_copied += result.stats.files_copied
+                totals.bytes_copied += result.stats.bytes_copied
+                totals.files_deduped += result.stats.files_deduped
+                totals.bytes_deduped += result.stats.bytes_deduped
+                totals.inodes_deduped += result.stats.inodes_deduped
+            if result.ok:
+                click.echo(
+                    f"[{result.index}] {result.project}: ok ({result.elapsed:.2f}s)"
+                )
+            else:
+                failed += 1
+                click.secho(
+                    f"[{result.index}] {result.project}: FAILED - {result.error}",
+                    fg="red",
+                )
+    elapsed = time.perf_counter() - start
+
+    total = len(entries)
+    rate = total / elapsed if elapsed > 0 else float("inf")
+    echo(
+        f"Created {total - failed} of {total} {pluralize('project', total)}"
+        f" in {elapsed:.2f}s ({rate:.1f} projects/s)."
+    )
+    echo(totals.summary())
+    return failed == 0
+
+
+def _print_dry_run(tree, outdir: str) -> None:
+    """List the files of an in-memory :class:`.render.MemoryTree`."""
+    project_dir = Path(outdir).resolve() / tree.name
+    echo(f"Dry run: would create {project_dir}")
+    if project_dir.exists():
+        click.secho("... but it already exists, so that would fail.", fg="red")
+    for path, file in sorted(tree.files.items()):
+        click.echo(f"  {file.mode:04o} {len(file.data):>8} {path}")
+
+
+def _write_archive(
+    context: dict,
+    outdir: str,
+    fmt: str,
+    stream: Optional[BinaryIO],
+    stats,
+    timings: Timings,
+) -> None:
+    """Write the project as an archive to ``stream``, or a file in ``outdir``."""
+    from .archive import FORMATS
+    from .generate import generate_archive
+    from .render import project_name
+
+    if stream is not None:
+        generate_archive(context, stream, fmt, stats, timings)
+        stream.flush()
+        return
+
+    path = Path(outdir) / (project_name(context) + FORMATS[fmt].extension)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        f = open(path, "xb")
+    except FileExistsError:
+        raise click.ClickException(f'"{path}" already exists')
+
+    try:
+        with f:
+            generate_archive(context, f, fmt, stats, timings)
+    except BaseException:
+        # Don't leave a half-written archive around.
+        path.unlink()
+        raise
+    echo(f"Wrote {path}")
+
+
+class _DefaultCommandGroup(click.Group):
+    """
+    A group that runs ``default_command`` if no command is given.
+
+    This keeps ``create_project.py OUTDIR [OPTIONS]`` working now that there
+    are other commands.
+    """
+
+    def __init__(self, *args, default_command: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.default_command = default_command
+
+    def parse_args(self, ctx, args):
+        if not args or (args[0] not in self.commands and args[0] != "--help"):
+            args = [self.default_command, *args]
+        return super().parse_args(ctx, args)
+
+
+@click.group(cls=_DefaultCommandGroup, default_command="create")
+def main():
+    """
+    Create and check projects made from this template.
+
+    If no command is given then `create` is run, so `create_project.py
+    OUTDIR [OPTIONS]` is the same as `create_project.py create OUTDIR
+    [OPTIONS]`.
+    """
+
+
+@main.command()
 @click.argument("outdir", type=click.Path(exists=False, file_okay=False))
 @click.option(
     "--extra-context",
@@ -192,17 +493,226 @@ def _parse_extra_context(ctx, param, value):
     default=True,
     help="Run a version check against the remote repository.",
 )
-def main(outdir, extra_context, version_check):
+@click.option(
+    "--version-check-ttl",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_CACHE_TTL,
+    show_default=True,
+    help=(
+        "Seconds to trust cached version check responses before revalidating"
+        " them with the remote."
+    ),
+)
+@click.option(
+    "--version-check-timeout",
+    type=click.FloatRange(min=0),
+    default=2.0,
+    show_default=True,
+    help=(
+        "The version check runs in the background. Its result is dropped if it"
+        " takes longer than this many seconds."
+    ),
+)
+@click.option(
+    "--manifest",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help=(
+        "A JSONL or CSV file with one extra-context dict per project. Every"
+        " project is created in OUTDIR. --extra-context, if given, is applied"
+        " to every entry and entries override it."
+    ),
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=os.cpu_count(),
+    show_default="number of CPUs",
+    help="Number of worker processes to use with --manifest.",
+)
+@click.option(
+    "--cache/--no-cache",
+    default=False,
+    envvar="TEMPLATE_PYTHON_CACHE",
+    show_envvar=True,
+    help=(
+        "Reuse previously generated projects from the output cache when the"
+        " template and context are unchanged."
+    ),
+)
+@click.option(
+    "--cache-max-size",
+    type=click.IntRange(min=0),
+    default=512,
+    show_default=True,
+    help="Maximum size of the output cache, in MB.",
+)
+@click.option(
+    "--cache-link",
+    type=click.Choice(["reflink", "hardlink"]),
+    default="reflink",
+    show_default=True,
+    help=(
+        "How files are copied out of the output cache. Hardlinked files must"
+        " not be edited in place because that also changes the cache."
+    ),
+)
+@click.option(
+    "--link-static",
+    is_flag=True,
+    help=(
+        "Hardlink files that aren't templated instead of copying them. They"
+        " must not be edited in place because that also changes the template."
+    ),
+)
+@click.option(
+    "--dedup",
+    type=click.Choice(["hardlink", "reflink"]),
+    help=(
+        "With --manifest, store files that are identical across the projects"
+        " only once, as hardlinks or reflinks. Hardlinked files must not be"
+        " edited in place because that also changes the other projects."
+    ),
+)
+@click.option(
+    "--threads",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help=(
+        "Number of threads that render and write each project's files. More"
+        " threads help most on network filesystems. With --manifest, each of"
+        " the --workers processes uses this many threads."
+    ),
+)
+@click.option(
+    "--timings",
+    "timings_path",
+    type=click.Path(dir_okay=False, allow_dash=True),
+    is_eager=True,
+    callback=_start_timings,
+    help=(
+        "Write a JSON report of the wall and CPU time of each phase and each"
+        " rendered file to this path. Use `-` for stdout."
+    ),
+)
+@click.option(
+    "--archive",
+    type=click.Choice(["tar.gz", "zip"]),
+    help=(
+        "Write the project as an archive, OUTDIR/<project>.tar.gz or .zip,"
+        " instead of a directory. If OUTDIR is `-` then the archive is"
+        " written to stdout. The output cache isn't used."
+    ),
+)
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    help="Render the project in memory and list its files without writing them.",
+)
+@click.option(
+    "--record",
+    is_flag=True,
+    help=(
+        "Record the template commit, context and file hashes in the project so"
+        " that it can be brought up to date later with `update`."
+    ),
+)
+@click.option(
+    "--git-init",
+    is_flag=True,
+    help=(
+        "Make the project a git repo with everything in the initial commit."
+        " The commit's author and date are the `author`, `author_email` and"
+        " `create_date` of the project."
+    ),
+)
+def create(
+    outdir,
+    extra_context,
+    version_check,
+    version_check_ttl,
+    version_check_timeout,
+    manifest,
+    workers,
+    cache,
+    cache_max_size,
+    cache_link,
+    link_static,
+    dedup,
+    threads,
+    timings_path,
+    archive,
+    dry_run,
+    record,
+    git_init,
+):
     """
     Create a new project in OUTDIR.
 
     Note that OUTDIR should *not* contain the project name - CookieCutter
     will create the project directory automatically.
     """
+    timings = _get_timings()
+    # A report on stdout has to be parseable, so everything else that would
+    # normally be printed there (hook output, the summary, ...) goes to stderr.
+    report_stdout = sys.stdout
+    if timings_path == "-":
+        click.get_current_context().with_resource(
+            contextlib.redirect_stdout(sys.stderr)
+        )
+
+    version_checker = None
     if version_check:
-        _check_repo()
+        version_checker = _BackgroundVersionCheck(
+            version_check_ttl, version_check_timeout
+        )
 
     _default_extra_context = {"create_date": datetime.date.today().isoformat()}
+    if git_init:
+        _default_extra_context["_git_init"] = "y"
+
+    output_cache = None
+    if cache:
+        from .output_cache import OutputCache
+
+        output_cache = OutputCache(max_size=cache_max_size * 1024**2, link=cache_link)
+
+    if dry_run and archive is not None:
+        raise click.UsageError("--dry-run can't be used with --archive.")
+    if record and (dry_run or archive is not None):
+        raise click.UsageError("--record can't be used with --dry-run or --archive.")
+    if git_init and (dry_run or archive is not None):
+        raise click.UsageError("--git-init can't be used with --dry-run or --archive.")
+    if dedup is not None and manifest is None:
+        raise click.UsageError("--dedup can only be used with --manifest.")
+
+    if manifest is not None:
+        if dry_run:
+            raise click.UsageError("--dry-run can't be used with --manifest.")
+        if archive is not None:
+            raise click.UsageError("--archive can't be used with --manifest.")
+        shared_extra_context = {**_default_extra_context, **(extra_context or {})}
+        with timings.phase("batch"):
+            ok = _run_batch(
+                outdir,
+                manifest,
+                shared_extra_context,
+                workers,
+                output_cache,
+                link_static,
+                timings if timings_path is not None else None,
+                record,
+                dedup,
+                threads,
+            )
+        _report_version_check(version_checker, timings)
+        if timings_path is not None:
+            write_report(timings.report(), timings_path, report_stdout)
+        if not ok:
+            raise click.exceptions.Exit(1)
+        return
+
     passed_extra_context = _default_extra_context
     no_input = False
 
@@ -213,12 +723,406 @@ def main(outdir, extra_context, version_check):
         passed_extra_context = {**_default_extra_context, **extra_context}
         no_input = True
 
-    cookiecutter(
-        template=".",
-        extra_context=passed_extra_context,
-        output_dir=outdir,
-        no_input=no_input,
+    # When the archive goes to stdout, everything else that would normally be
+    # printed there (hook output, prompts, the summary, ...) goes to stderr.
+    archive_stream = None
+    if archive is not None and outdir == "-":
+        if timings_path == "-":
+            raise click.UsageError("--timings and the archive can't both be `-`.")
+        archive_stream = sys.stdout.buffer
+
+    with contextlib.ExitStack() as stack:
+        if archive_stream is not None:
+            stack.enter_context(contextlib.redirect_stdout(sys.stderr))
+
+        with timings.phase("import"):
+            from .generate import generate_in_memory
+            from .generate import generate_project
+            from .generate import prepare_template
+            from .generate import resolve_context
+            from .render import RenderStats
+
+        with timings.phase("prepare_template"):
+            base_context = prepare_template()
+        with timings.phase("resolve_context"):
+            context = resolve_context(
+                base_context, passed_extra_context, outdir, no_input=no_input
+            )
+        stats = RenderStats()
+        if dry_run:
+            tree = generate_in_memory(context, stats, timings)
+            _print_dry_run(tree, outdir)
+        elif archive is not None:
+            _write_archive(context, outdir, archive, archive_stream, stats, timings)
+        else:
+            generate_project(
+                context,
+                outdir,
+                output_cache,
+                stats,
+                link_static,
+                timings,
+                record,
+                threads=threads,
+            )
+        if stats.files_rendered or stats.files_copied:
+            echo(stats.summary())
+
+        _report_version_check(version_checker, timings)
+        if timings_path is not None:
+            write_report(timings.report(), timings_path, report_stdout)
+
+
+@main.command()
+@click.argument("project_dir", type=click.Path(exists=True, file_okay=False))
+@click.option(
+    "--expected",
+    type=click.Path(exists=True, file_okay=False),
+    default=str(DATA_DIR / "reference-proj"),
+    show_default=True,
+    help="The project that PROJECT_DIR should match.",
+)
+@click.option("--diff/--no-diff", default=True, help="Show a diff of each file.")
+@click.option("--workers", type=click.IntRange(min=1), help="Threads for hashing.")
+def verify(project_dir, expected, diff, workers):
+    """
+    Check that PROJECT_DIR matches a reference project.
+
+    Exits with status 1 and lists the missing, extra and differing files if
+    it doesn't.
+    """
+    from . import dircmp
+
+    result = dircmp.compare_trees(Path(project_dir), Path(expected), workers)
+    if result.ok:
+        click.echo(f"OK: {result.compared} files match {expected}.")
+        return
+
+    if diff:
+        click.echo(dircmp.format_diff(result))
+    else:
+        for rel in result.missing:
+            click.echo(f"Missing: {rel}")
+        for rel in result.extra:
+            click.echo(f"Extra: {rel}")
+        for rel in result.differing:
+            click.echo(f"Differs: {rel}")
+
+    n = len(result.missing) + len(result.extra) + len(result.differing)
+    click.secho(
+        f"{n} {pluralize('difference', n)} from {expected}.", fg="red", bold=True
+    )
+    raise click.exceptions.Exit(1)
+
+
+@main.command()
+@click.argument("project_dir", type=click.Path(exists=True, file_okay=False))
+@click.option(
+    "--extra-context",
+    default=None,
+    help="Change these template variables, like `create --extra-context`.",
+    callback=_parse_extra_context,
+)
+@click.option(
+    "--force",
+    is_flag=True,
+    help="Overwrite files that were changed in the project instead of skipping.",
+)
+@click.option("--dry-run", is_flag=True, help="Only report what would change.")
+def update(project_dir, extra_context, force, dry_run):
+    """
+    Bring PROJECT_DIR up to date with the current template.
+
+    The project must have been created with `--record`. Only the files whose
+    template changed are re-rendered. Files that were changed in the project
+    since are skipped and reported as conflicts, and the exit status is 1.
+    """
+    from .update import update_project
+    from .update import UpdateError
+
+    try:
+        result = update_project(Path(project_dir), extra_context, force, dry_run)
+    except UpdateError as err:
+        raise click.ClickException(str(err))
+
+    for label, paths in [
+        ("Updated", result.updated),
+        ("Added", result.added),
+        ("Removed", result.removed),
+    ]:
+        for path in paths:
+            click.echo(f"{label}: {path}")
+    for path, reason in result.conflicts.items():
+        click.secho(f"Conflict: {path} ({reason})", fg="red")
+
+    old = (result.old_commit or "unknown")[:12]
+    new = (result.new_commit or "unknown")[:12]
+    changed = len(result.updated) + len(result.added) + len(result.removed)
+    verb = "Would change" if dry_run else "Changed"
+    click.echo(
+        f"{verb} {changed} {pluralize('file', changed)} ({old} -> {new}),"
+        f" {result.unchanged} unchanged."
+    )
+    if not result.ok:
+        n = len(result.conflicts)
+        click.secho(f"{n} {pluralize('conflict', n)}.", fg="red", bold=True)
+        raise click.exceptions.Exit(1)
+
+
+@main.command()
+@click.argument("root", type=click.Path(exists=True, file_okay=False))
+@click.option("--workers", type=click.IntRange(min=1), help="Threads for scanning.")
+@click.option("--json", "as_json", is_flag=True, help="Print the results as JSON.")
+def scan(root, workers, as_json):
+    """
+    Report which template commit each project under ROOT is on.
+
+    Projects created with `--record` are identified exactly. Others are
+    matched against the template's history by their files, so how far behind
+    they are is a lower bound (shown as `N+`).
+    """
+    import json
+    import subprocess
+    from dataclasses import asdict
+
+    from .scan import scan as scan_projects
+
+    try:
+        results = scan_projects(Path(root), workers=workers)
+    except (OSError, subprocess.CalledProcessError) as err:
+        raise click.ClickException(f"Unable to read the template's history: {err}")
+
+    if as_json:
+        data = [{**asdict(r), "path": str(r.path), "exact": r.exact} for r in results]
+        click.echo(json.dumps(data, indent=2))
+        return
+
+    up_to_date = behind = unknown = 0
+    for r in results:
+        if r.behind is None:
+            unknown += 1
+            commits_behind = "?"
+        else:
+            if r.behind == 0:
+                up_to_date += 1
+            else:
+                behind += 1
+            commits_behind = str(r.behind) + ("" if r.exact else "+")
+        commit = (r.commit or "?")[:12]
+        source = r.source or "unknown"
+        rel = os.path.relpath(r.path, root)
+        click.echo(f"{rel:<40} {commit:<12} {commits_behind:>6}  {source}")
+
+    n = len(results)
+    click.echo(
+        f"Scanned {n} {pluralize('project', n)}: {up_to_date} up to date,"
+        f" {behind} behind, {unknown} unknown."
+    )
+
+
+@main.command()
+@click.argument("manifest", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--outdir",
+    type=click.Path(file_okay=False),
+    help="Also check that no project directory already exists here.",
+)
+@click.option(
+    "--extra-context",
+    default=None,
+    help="Values used for every entry, like `create --extra-context`.",
+    callback=_parse_extra_context,
+)
+def validate(manifest, outdir, extra_context):
+    """
+    Check every entry in MANIFEST without generating anything.
+
+    Reports all the problems at once: unknown variables, blank or invalid
+    names, duplicate slugs and package names, and colliding project
+    directories. Exits with status 1 if there are any.
+    """
+    from . import batch
+    from .validate import validate_manifest
+
+    try:
+        entries = batch.load_manifest(manifest)
+    except ValueError as err:
+        raise click.BadParameter(str(err), param_hint="MANIFEST")
+
+    defaults = {"create_date": datetime.date.today().isoformat()}
+    entries = [{**defaults, **(extra_context or {}), **entry} for entry in entries]
+    errors = validate_manifest(entries, Path(outdir) if outdir else None)
+
+    n = len(entries)
+    if not errors:
+        click.echo(f"OK: no problems found in {n} {pluralize('project', n)}.")
+        return
+
+    for error in errors:
+        click.echo(str(error))
+    click.secho(
+        f"{len(errors)} {pluralize('problem', len(errors))} in {n}"
+        f" {pluralize('project', n)}.",
+        fg="red",
+        bold=True,
+    )
+    raise click.exceptions.Exit(1)
+
+
+@main.command()
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", default=8765, show_default=True, type=click.IntRange(0))
+@click.option(
+    "--socket",
+    "socket_path",
+    type=click.Path(dir_okay=False),
+    help="Listen on this Unix socket instead of --host and --port.",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    help="Requests handled at once. Defaults to the CPU count.",
+)
+@click.option(
+    "--reload-interval",
+    default=1.0,
+    show_default=True,
+    type=click.FloatRange(min=0),
+    help="Seconds between checks for template changes. 0 disables reloading.",
+)
+@click.option(
+    "--root",
+    type=click.Path(file_okay=False),
+    help=(
+        "Requests with `output_dir` can only write in here. Defaults to the"
+        " current directory."
+    ),
+)
+def serve(host, port, socket_path, workers, reload_interval, root):
+    """
+    Serve project generation over HTTP, keeping the template loaded.
+
+    POST a JSON object to /generate with the `context` (like --extra-context)
+    and either `archive` ("tar.gz" or "zip") to get an archive back, or
+    `output_dir` to write the project there. `output_dir` must be inside
+    --root. Anyone that can connect can write there, so don't listen on
+    anything but localhost or a Unix socket. See `src/server.py` for details.
+    """
+    from .server import ScaffoldServer
+
+    server = ScaffoldServer(
+        host,
+        port,
+        Path(socket_path) if socket_path else None,
+        workers,
+        reload_interval,
+        root=Path(root) if root else None,
     )
+    server.start()
+    where = socket_path if socket_path else server.url
+    click.echo(f"Serving on {where} with {server.workers} workers. Ctrl-C to stop.")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+def _print_watch_update(update, session, show_diff: bool) -> None:
+    from . import dircmp
+
+    now = datetime.datetime.now().strftime("%H:%M:%S")
+    changed = ", ".join(update.changed) if update.changed else "start"
+    if update.error is not None:
+        click.secho(f"[{now}] {changed}: {update.error}", fg="red")
+        return
+
+    n = len(update.rendered)
+    what = "the whole project" if update.full else f"{n} {pluralize('file', n)}"
+    click.echo(f"[{now}] {changed}: rendered {what} in {update.elapsed * 1000:.0f} ms")
+    if not update.diff.ok:
+        if show_diff:
+            click.echo(dircmp.format_diff(update.diff))
+        else:
+            for rel in update.diff.missing:
+                click.echo(f"Missing: {rel}")
+            for rel in update.diff.extra:
+                click.echo(f"Extra: {rel}")
+            for rel in update.diff.differing:
+                click.echo(f"Differs: {rel}")
+
+    n = len(session.differences)
+    if n:
+        click.secho(
+            f"{n} {pluralize('difference', n)} from {session.expected}.", fg="red"
+        )
+    else:
+        click.secho(f"OK: matches {session.expected}.", fg="green")
+
+
+@main.command()
+@click.argument("preview_dir", type=click.Path(file_okay=False))
+@click.option(
+    "--extra-context",
+    default=None,
+    help=(
+        "Template variables for the preview, like `create --extra-context`."
+        " Defaults to the ones the reference project was made with."
+    ),
+    callback=_parse_extra_context,
+)
+@click.option(
+    "--expected",
+    type=click.Path(exists=True, file_okay=False),
+    default=str(DATA_DIR / "reference-proj"),
+    show_default=True,
+    help="The project that the preview is compared against.",
+)
+@click.option("--diff/--no-diff", default=True, help="Show a diff of each file.")
+@click.option(
+    "--poll",
+    is_flag=True,
+    help="Poll for changes instead of using inotify (which is Linux-only).",
+)
+@click.option(
+    "--interval",
+    default=0.25,
+    show_default=True,
+    type=click.FloatRange(min=0),
+    help="Seconds between polls.",
+)
+def watch(preview_dir, extra_context, expected, diff, poll, interval):
+    """
+    Re-render the project into PREVIEW_DIR whenever the template changes.
+
+    Only the files made from changed template files are re-rendered and
+    compared against the expected project again. Changes to
+    `cookiecutter.json`, the hooks, or which files the project has re-render
+    everything.
+    """
+    from . import REFERENCE_CONTEXT
+    from .watch import make_watcher
+    from .watch import WatchSession
+
+    if extra_context is None:
+        extra_context = REFERENCE_CONTEXT
+    session = WatchSession(Path(preview_dir), extra_context, Path(expected))
+    watcher = make_watcher(poll=poll, interval=interval)
+    click.echo(
+        f"Watching {TEMPLATE_DIR} with {type(watcher).__name__}. Ctrl-C to stop."
+    )
+    try:
+        _print_watch_update(session.render_all(), session, diff)
+        while True:
+            update = session.apply(watcher.wait())
+            if update is not None:
+                _print_watch_update(update, session, diff)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
 
 
 if __name__ == "__main__":
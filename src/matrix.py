@@ -0,0 +1,159 @@
+"""
+Render every combination of the template's options.
+
+The option space is read from ``cookiecutter.json``: choice variables (lists)
+and yes/no variables (``"y"`` or ``"n"`` defaults). Every combination is
+rendered once, in parallel, into its own directory::
+
+    matrix = render_matrix(extra_context, output_root)
+    project_dir = matrix.project(project_host="GitLab", has_cli="y")
+
+The tests share a single :class:`RenderMatrix` for the whole session (see
+``conftest.py``), so adding an option adds renders that run in parallel
+instead of tests that run one after another.
+"""
+import itertools
+import json
+import os
+from pathlib import Path
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from . import TEMPLATE_DIR
+from .batch import BatchResult
+from .batch import run_batch
+from .generate import prepare_template
+
+YES_NO = ["y", "n"]
+
+Combination = Dict[str, str]
+
+
+def option_space(template_dir: Path = TEMPLATE_DIR) -> Dict[str, List[str]]:
+    """Return ``{variable: [values]}`` for every option in the template."""
+    with open(template_dir / "cookiecutter.json", encoding="utf-8") as f:
+        variables = json.load(f)
+
+    space = {}
+    for name, default in variables.items():
+        # Private variables (eg: _git_init) aren't about what's rendered.
+        if name.startswith("_"):
+            continue
+        if isinstance(default, list):
+            space[name] = list(default)
+        elif default in YES_NO:
+            space[name] = list(YES_NO)
+    return space
+
+
+def combinations(space: Dict[str, List[str]]) -> List[Combination]:
+    """Return every combination of the options in ``space``."""
+    names = sorted(space)
+    return [
+        dict(zip(names, values))
+        for values in itertools.product(*(space[name] for name in names))
+    ]
+
+
+def combination_id(combination: Combination) -> str:
+    """A short, filesystem-safe name for ``combination``."""
+    return "__".join(f"{k}-{v}" for k, v in sorted(combination.items()))
+
+
+class RenderMatrix:
+    """
+    The rendered projects for every combination in an option space.
+
+    Parameters
+    ----------
+    space : dict
+        The option space that was rendered. See :func:`option_space`.
+    defaults : dict
+        The option values used for any that aren't given to :meth:`project`.
+    results : dict
+        ``{combination_id: (project_dir, BatchResult)}``.
+    """
+
+    def __init__(
+        self,
+        space: Dict[str, List[str]],
+        defaults: Combination,
+        results: Dict[str, Tuple[Path, BatchResult]],
+    ):
+        self.space = space
+        self.defaults = defaults
+        self.results = results
+
+    def combinations(self) -> List[Combination]:
+        return combinations(self.space)
+
+    def project(self, **options: str) -> Path:
+        """
+        Return the project directory rendered with ``options``.
+
+        Raises :class:`KeyError` if a value isn't in the option space and
+        :class:`RuntimeError` if that combination failed to render.
+        """
+        unknown = options.keys() - self.space.keys()
+        if unknown:
+            raise KeyError(f"Not template options: {sorted(unknown)}")
+
+        combination = {**self.defaults, **options}
+        for name, value in combination.items():
+            if value not in self.space[name]:
+                raise KeyError(f"`{value}` is not a choice for `{name}`.")
+
+        project_dir, result = self.results[combination_id(combination)]
+        if not result.ok:
+            raise RuntimeError(f"{combination} failed to render: {result.error}")
+        return project_dir
+
+
+def render_matrix(
+    extra_context: dict,
+    output_root: Path,
+    space: Optional[Dict[str, List[str]]] = None,
+    workers: Optional[int] = None,
+) -> RenderMatrix:
+    """
+    Render ``extra_context`` with every combination of options in ``space``.
+
+    Each combination is rendered into ``output_root/<combination id>/``.
+    ``space`` defaults to the whole option space of the template. Option
+    values in ``extra_context`` are used as the defaults for
+    :meth:`RenderMatrix.project`.
+    """
+    space = space if space is not None else option_space()
+    base_context = prepare_template()
+    defaults = {
+        name: extra_context.get(name, base_context["cookiecutter"][name])
+        for name in space
+    }
+    for name, value in defaults.items():
+        # Choice variables are lists in the parsed cookiecutter.json, and a
+        # restricted ``space`` might not include the template's default.
+        if isinstance(value, list) or value not in space[name]:
+            defaults[name] = space[name][0]
+
+    entries = []
+    output_dirs = []
+    for combination in combinations(space):
+        entries.append({**extra_context, **combination})
+        output_dirs.append(str(Path(output_root) / combination_id(combination)))
+
+    batch_results = run_batch(
+        entries,
+        output_dirs,
+        workers=workers if workers is not None else os.cpu_count() or 1,
+        base_context=base_context,
+    )
+
+    results = {}
+    for context, output_dir, result in zip(entries, output_dirs, batch_results):
+        combination = {name: context[name] for name in space}
+        project_dir = Path(output_dir) / result.project
+        results[combination_id(combination)] = (project_dir, result)
+
+    return RenderMatrix(space, defaults, results)
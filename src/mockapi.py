@@ -0,0 +1,165 @@
+"""
+A local stand-in for the parts of the GitHub API used by the version check.
+
+Used by the tests (and benchmarks) so that they never hit api.github.com::
+
+    with MockGitHubApi() as api:
+        main._get_current_remote_commit_info(api.url)
+        assert api.request_count == 1
+"""
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import List
+from typing import Optional
+from typing import Set
+
+LAST_MODIFIED = "Sun, 05 Sep 2021 13:24:37 GMT"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+
+    # Keep-alive needs HTTP/1.1.
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        # Called once per connection, so this simulates the TCP+TLS handshake.
+        if self.server.api.connect_latency:
+            time.sleep(self.server.api.connect_latency)
+        super().setup()
+
+    def log_message(self, format, *args):
+        # Don't spam stderr during tests.
+        pass
+
+    def do_GET(self):
+        api = self.server.api
+        with api._lock:
+            api.requests.append((self.path, dict(self.headers)))
+            api.connections.add(self.client_address)
+
+        if api.latency:
+            time.sleep(api.latency)
+
+        with api._lock:
+            failing = api.fail_next > 0
+            api.fail_next -= failing
+
+        if failing:
+            status, body = 503, b'{"message": "Service Unavailable"}'
+        else:
+            status, body = api._route(self.path)
+
+        if status == 200:
+            etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 200:
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", LAST_MODIFIED)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    api: "MockGitHubApi"
+
+
+class MockGitHubApi:
+    """
+    Serve ``/commits/master`` and ``/compare/<local>...<remote>`` locally.
+
+    Parameters
+    ----------
+    sha, date : str
+        The latest remote commit.
+    total_commits : int
+        The value returned by every compare request.
+    missing_hashes : set of str, optional
+        Local hashes that the compare endpoint returns 404 for.
+    latency : float
+        Seconds to sleep before answering each request.
+    connect_latency : float
+        Seconds to sleep when a new connection is opened.
+    fail_next : int
+        Respond to this many requests with a 503 before behaving normally.
+    """
+
+    def __init__(
+        self,
+        sha: str = "28d8d1b4e5134676ebe94e9c014a497221370e8b",
+        date: str = "2021-09-05T13:24:37Z",
+        total_commits: int = 5,
+        missing_hashes: Optional[Set[str]] = None,
+        latency: float = 0.0,
+        connect_latency: float = 0.0,
+        fail_next: int = 0,
+    ):
+        self.sha = sha
+        self.date = date
+        self.total_commits = total_commits
+        self.missing_hashes = missing_hashes or set()
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.fail_next = fail_next
+
+        self.requests: List[tuple] = []
+        self.connections: set = set()
+        self._lock = threading.Lock()
+        self._server: Optional[_Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/repos/dougthor42/_template_python"
+
+    @property
+    def request_count(self) -> int:
+        return len(self.requests)
+
+    def _route(self, path: str):
+        if path.endswith("/commits/master"):
+            data = {"sha": self.sha, "commit": {"author": {"date": self.date}}}
+            return 200, json.dumps(data).encode("utf-8")
+        if "/compare/" in path:
+            local_hash = path.rsplit("/compare/", 1)[1].split("...")[0]
+            if local_hash in self.missing_hashes:
+                return 404, b'{"message": "Not Found"}'
+            data = {"total_commits": self.total_commits}
+            return 200, json.dumps(data).encode("utf-8")
+        return 404, b'{"message": "Not Found"}'
+
+    def start(self) -> "MockGitHubApi":
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.api = self
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, kwargs={"poll_interval": 0.05}
+        )
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self) -> "MockGitHubApi":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
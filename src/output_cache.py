@@ -0,0 +1,211 @@
+"""
+A content-addressed cache of generated projects.
+
+The cache key is a hash of the template (the project template dir,
+``cookiecutter.json`` and ``hooks/``) plus the fully resolved context. On a
+hit, the project is materialized from the cache by reflink (copy-on-write)
+or hardlink instead of being rendered again.
+
+The cache is bounded in size. Whenever a new entry is stored, the least
+recently used entries are evicted until the cache fits again.
+
+Layout::
+
+    <cache dir>/
+        <key>/
+            meta.json   # {"name": <project dir name>, "size": <bytes>}
+            tree/       # the generated project
+"""
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from cookiecutter.exceptions import OutputDirExistsException
+
+from . import TEMPLATE_DIR
+from .fileops import hardlink
+from .fileops import reflink
+from .webapi import user_cache_dir
+
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024  # bytes
+
+LINK_MODES = ("reflink", "hardlink")
+
+# The parts of the repo that affect the generated output.
+TEMPLATE_PATHS = ("{{cookiecutter.project_slug}}", "cookiecutter.json", "hooks")
+
+
+def _iter_files(path: Path):
+    if path.is_file():
+        yield path
+        return
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            yield Path(root, name)
+
+
+def hash_template(template_dir: Path = TEMPLATE_DIR) -> str:
+    """Hash every file (path, mode and content) that makes up the template."""
+    h = hashlib.sha256()
+    for rel in TEMPLATE_PATHS:
+        for fp in _iter_files(template_dir / rel):
+            if "__pycache__" in fp.parts:
+                continue
+            h.update(fp.relative_to(template_dir).as_posix().encode("utf-8"))
+            h.update(b"\0")
+            h.update(oct(fp.stat().st_mode & 0o777).encode("utf-8"))
+            h.update(b"\0")
+            h.update(fp.read_bytes())
+            h.update(b"\0")
+    return h.hexdigest()
+
+
+def _materialize_tree(src: Path, dst: Path, link) -> int:
+    """Recreate the tree at ``src`` in ``dst`` using ``link``. Returns bytes."""
+    size = 0
+    for root, dirs, files in os.walk(src):
+        out_root = dst / os.path.relpath(root, src)
+        out_root.mkdir(parents=True, exist_ok=True)
+        for name in files:
+            link(Path(root, name), out_root / name)
+            size += (out_root / name).stat().st_size
+    return size
+
+
+class OutputCache:
+    """
+    Parameters
+    ----------
+    path : :class:`pathlib.Path`, optional
+        The cache directory. Defaults to ``outputs`` in the user cache dir.
+    max_size : int
+        The maximum size of the cache, in bytes.
+    link : str
+        How files are materialized from (and stored in) the cache. One of
+        ``"reflink"`` (copy-on-write if the filesystem supports it, otherwise
+        a regular copy) or ``"hardlink"``. Note that hardlinked files share
+        their content with the cache, so they must not be edited in place.
+    template_dir : :class:`pathlib.Path`
+        The template that's being rendered.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        max_size: int = DEFAULT_MAX_SIZE,
+        link: str = "reflink",
+        template_dir: Path = TEMPLATE_DIR,
+    ):
+        if link not in LINK_MODES:
+            raise ValueError(f"link must be one of {LINK_MODES}, not `{link}`.")
+        self.path = Path(path) if path is not None else user_cache_dir() / "outputs"
+        self.max_size = max_size
+        self.link = link
+        self.template_dir = template_dir
+        self._template_hash: Optional[str] = None
+
+    @property
+    def _link(self):
+        return hardlink if self.link == "hardlink" else reflink
+
+    @property
+    def template_hash(self) -> str:
+        # Only hash the template once per cache object (eg: once per batch
+        # worker).
+        if self._template_hash is None:
+            self._template_hash = hash_template(self.template_dir)
+        return self._template_hash
+
+    def key(self, context: dict) -> str:
+        """Return the cache key for ``context``."""
+        # The output dir doesn't affect what's generated.
+        cookiecutter_dict = {
+            k: v for k, v in context["cookiecutter"].items() if k != "_output_dir"
+        }
+        data = json.dumps(cookiecutter_dict, sort_keys=True, default=str)
+        h = hashlib.sha256(self.template_hash.encode("utf-8"))
+        h.update(data.encode("utf-8"))
+        return h.hexdigest()
+
+    def materialize(self, key: str, output_dir: str) -> Optional[Path]:
+        """
+        Create the cached project for ``key`` in ``output_dir``.
+
+        Returns the path to the project or None on a cache miss.
+        """
+        entry = self.path / key
+        try:
+            meta = json.loads((entry / "meta.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+        project_dir = Path(output_dir).resolve() / meta["name"]
+        if project_dir.exists():
+            msg = f'Error: "{project_dir}" directory already exists'
+            raise OutputDirExistsException(msg)
+
+        try:
+            _materialize_tree(entry / "tree", project_dir, self._link)
+        except OSError:
+            # Most likely evicted out from under us. Treat it as a miss.
+            shutil.rmtree(project_dir, ignore_errors=True)
+            return None
+
+        # Mark the entry as recently used.
+        os.utime(entry / "meta.json")
+        return project_dir
+
+    def store(self, key: str, project_dir: Path) -> None:
+        """Add the generated project in ``project_dir`` to the cache."""
+        entry = self.path / key
+        if entry.exists():
+            return
+
+        tmp = self.path / f".tmp-{uuid.uuid4().hex}"
+        try:
+            size = _materialize_tree(Path(project_dir), tmp / "tree", self._link)
+            meta = {"name": Path(project_dir).name, "size": size}
+            (tmp / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+            # Atomic, so readers never see a partial entry. If another
+            # process stored the same key first, just keep theirs.
+            os.rename(tmp, entry)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+
+        self.evict()
+
+    def _entries(self) -> List[Tuple[float, int, Path]]:
+        """Return (last used, size, path) for every entry."""
+        entries = []
+        for entry in self.path.iterdir():
+            if entry.name.startswith(".tmp-"):
+                continue
+            try:
+                meta_file = entry / "meta.json"
+                size = json.loads(meta_file.read_text(encoding="utf-8"))["size"]
+                entries.append((meta_file.stat().st_mtime, size, entry))
+            except (OSError, ValueError, KeyError):
+                continue
+        return entries
+
+    def size(self) -> int:
+        """Return the total size of the cache, in bytes."""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self) -> None:
+        """Remove least recently used entries until the cache fits."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.max_size:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
@@ -0,0 +1,635 @@
+"""
+Render the project template to disk, following a render plan.
+
+The render plan is built from the context *before* anything is rendered. It
+lists every directory and file that will end up in the project, with the
+output path already rendered (and renamed, if needed). Paths that the project
+doesn't want (eg: CI files for a different host) are never rendered or
+written, instead of being written and then deleted by the post-gen hook.
+
+The rules are declarative:
+
++ :data:`INCLUDE_IF` maps a template path to a predicate of the context. The
+  path (and everything under it, for directories) is only included if the
+  predicate returns True.
++ :data:`RENAME` maps a template path to the name it's written as.
+
+These rules replace the actions in ``hooks/post_gen_project.py``, which is
+still what stock cookiecutter uses. The two must be kept in sync; the tests
+check that both produce the same output.
+
+Files without any Jinja markers are marked as *static* in the plan. Rendering
+them would be a no-op, so they're copied with zero-copy syscalls (or
+hardlinked, if asked) instead of going through the template engine.
+
+Templated files are rendered into a single string, unless they turn out to be
+big (see :data:`STREAM_THRESHOLD`). The rest of those is streamed to the
+output as Jinja produces it, so memory use is bounded no matter how large a
+file is.
+
+Rendered entries are handed to a *sink*: :class:`DirectorySink` writes them to
+disk (:func:`render_project`) and :class:`MemoryTree` keeps them in memory
+(:func:`render_to_memory`).
+
+Writing to disk can also be done on a thread pool (``threads``). The
+directories are all created first, and then the files are rendered and
+written concurrently. That mostly helps on filesystems where each
+create/write/close is a round trip, like NFS.
+"""
+import functools
+import itertools
+import json
+import os
+import stat
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import TYPE_CHECKING
+
+from binaryornot.check import is_binary
+from cookiecutter.environment import StrictEnvironment
+from cookiecutter.exceptions import OutputDirExistsException
+from cookiecutter.exceptions import UndefinedVariableInTemplate
+from cookiecutter.find import find_template
+from cookiecutter.utils import rmtree
+from jinja2 import FileSystemLoader
+from jinja2.exceptions import UndefinedError
+
+from . import fileops
+from .timings import NULL_TIMINGS
+from .timings import Timings
+
+if TYPE_CHECKING:
+    from .dedup import BlobStore
+
+
+def _ci_host(context: dict) -> str:
+    """Return the host that CI files are wanted for, or "" for none."""
+    if context["create_ci_file"] == "n":
+        return ""
+    return context["project_host"]
+
+
+def _wants_cli(context: dict) -> bool:
+    return context["has_cli"] != "n"
+
+
+# Template path (relative to the template's project dir) -> include predicate.
+INCLUDE_IF: Dict[str, Callable[[dict], bool]] = {
+    ".github": lambda context: _ci_host(context) == "GitHub",
+    ".gitlab-ci.yml": lambda context: _ci_host(context) == "GitLab",
+    "src/{{cookiecutter.package_name}}/cli.py": _wants_cli,
+}
+
+# Template path -> output file name.
+RENAME: Dict[str, str] = {
+    # The template has a .j2 extension so that `black` doesn't try to read it
+    # as a config file during pre-commit.
+    "pyproject.toml.j2": "pyproject.toml",
+}
+
+
+@dataclass(frozen=True)
+class PlanEntry:
+    """
+    A single directory or file in the render plan.
+
+    ``src`` is the path relative to the template's project directory and
+    ``dest`` is the rendered path relative to the generated project.
+    """
+
+    src: str
+    dest: str
+    is_dir: bool
+    static: bool = False
+
+
+@dataclass
+class RenderStats:
+    """How much of a project was rendered vs. copied as-is."""
+
+    files_rendered: int = 0
+    bytes_rendered: int = 0
+    files_copied: int = 0
+    bytes_copied: int = 0
+    # Files that were linked to an identical file instead of being written.
+    files_deduped: int = 0
+    bytes_deduped: int = 0
+    inodes_deduped: int = 0
+
+    def summary(self) -> str:
+        summary = (
+            f"Rendered {self.files_rendered} files ({self.bytes_rendered} bytes),"
+            f" copied {self.files_copied} files ({self.bytes_copied} bytes)."
+        )
+        if self.files_deduped:
+            summary += (
+                f" Deduplicated {self.files_deduped} files: saved"
+                f" {self.bytes_deduped} bytes and {self.inodes_deduped} inodes."
+            )
+        return summary
+
+
+# Rendered files that get at least this big are streamed to the sink instead
+# of being rendered into a single string.
+STREAM_THRESHOLD = 1024 * 1024  # bytes
+
+# Anything that Jinja would treat as the start of a tag, with the default
+# delimiters that cookiecutter uses.
+_JINJA_MARKERS = (b"{{", b"{%", b"{#")
+
+# path -> ((mtime_ns, size), is_static). Keyed on the stat so that edits to
+# the template are picked up without having to clear anything.
+_static_memo: Dict[Path, Tuple[Tuple[int, int], bool]] = {}
+
+
+def is_static(path: Path) -> bool:
+    """
+    Return True if rendering ``path`` would produce the exact same bytes.
+
+    That's the case for binary files (which are never rendered) and for UTF-8
+    text without any Jinja markers or carriage returns. Jinja normalizes
+    newlines, so files with ``\r`` could come out differently.
+    """
+    st = path.stat()
+    stat_key = (st.st_mtime_ns, st.st_size)
+    memo = _static_memo.get(path)
+    if memo is not None and memo[0] == stat_key:
+        return memo[1]
+
+    if is_binary(str(path)):
+        static = True
+    else:
+        data = path.read_bytes()
+        try:
+            data.decode("utf-8")
+            static = b"\r" not in data and not any(m in data for m in _JINJA_MARKERS)
+        except UnicodeDecodeError:
+            static = False
+
+    _static_memo[path] = (stat_key, static)
+    return static
+
+
+# (template dir, settings) -> environment. See make_environment.
+_environments: Dict[Tuple[str, str], StrictEnvironment] = {}
+
+
+def make_environment(context: dict, template_dir: Path) -> StrictEnvironment:
+    """
+    Return a Jinja environment set up the same way cookiecutter does.
+
+    The environment only depends on the template's settings (Jinja options
+    and extensions), not on the rest of the context, so it's shared by every
+    project made from the same template. That way each template is only
+    compiled once per process. Jinja recompiles a template if its file
+    changes.
+    """
+    cookiecutter_dict = context["cookiecutter"]
+    envvars = cookiecutter_dict.get("_jinja2_env_vars", {})
+    settings = [envvars, cookiecutter_dict.get("_extensions", [])]
+    key = (str(template_dir), json.dumps(settings, sort_keys=True, default=str))
+
+    env = _environments.get(key)
+    if env is None:
+        env = StrictEnvironment(context=context, keep_trailing_newline=True, **envvars)
+        env.loader = FileSystemLoader(
+            [str(template_dir), str(template_dir.parent / "templates")]
+        )
+        _environments[key] = env
+    return env
+
+
+@functools.lru_cache(maxsize=1024)
+def _path_template(env: StrictEnvironment, path: str):
+    return env.from_string(path)
+
+
+def _is_included(src: str, context: dict) -> bool:
+    predicate = INCLUDE_IF.get(src)
+    return predicate is None or predicate(context["cookiecutter"])
+
+
+def _render_path(env: StrictEnvironment, src: str, context: dict) -> str:
+    head, name = os.path.split(src)
+    path = os.path.join(head, RENAME.get(src, name))
+    if "{" not in path:
+        return path
+    try:
+        return _path_template(env, path).render(**context)
+    except UndefinedError as err:
+        msg = f"Unable to render path '{src}'"
+        raise UndefinedVariableInTemplate(msg, err, context) from err
+
+
+def build_plan(context: dict, template_dir: Path, env=None) -> List[PlanEntry]:
+    """
+    Build the render plan for ``context``.
+
+    Directories always come before the files in them. Entries are sorted so
+    that the plan is deterministic.
+    """
+    env = env or make_environment(context, template_dir)
+    # A configured newline means every text file has to be rewritten.
+    check_static = not context["cookiecutter"].get("_new_lines")
+    plan = []
+    for root, dirs, files in os.walk(template_dir):
+        rel_root = os.path.relpath(root, template_dir)
+        rel_root = "" if rel_root == "." else rel_root
+
+        # Mutate ``dirs`` so that os.walk doesn't descend into excluded dirs.
+        dirs[:] = sorted(
+            d for d in dirs if _is_included(os.path.join(rel_root, d), context)
+        )
+        for d in dirs:
+            src = os.path.join(rel_root, d)
+            plan.append(PlanEntry(src, _render_path(env, src, context), True))
+
+        for f in sorted(files):
+            src = os.path.join(rel_root, f)
+            if not _is_included(src, context):
+                continue
+            dest = _render_path(env, src, context)
+            static = check_static and is_static(Path(root, f))
+            plan.append(PlanEntry(src, dest, False, static))
+
+    return plan
+
+
+def _detect_newline(path: Path) -> str:
+    """Detect the newline of a file's first line, like cookiecutter does."""
+    with open(path, encoding="utf-8") as f:
+        f.readline()
+    newlines = f.newlines
+    return newlines[0] if isinstance(newlines, tuple) else newlines
+
+
+def _encode(rendered: str, newline: Optional[str]) -> bytes:
+    """Encode ``rendered`` like a text-mode file with ``newline`` would."""
+    newline = newline or os.linesep
+    if newline != "\n":
+        rendered = rendered.replace("\n", newline)
+    return rendered.encode("utf-8")
+
+
+def file_mode(path: Path) -> int:
+    """Return the permission bits that a file made from ``path`` gets."""
+    return stat.S_IMODE(path.stat().st_mode)
+
+
+def _render_chunks(
+    env, entry: PlanEntry, template_dir: Path, context
+) -> Iterator[bytes]:
+    """Render a single templated file, yielding its contents piece by piece."""
+    infile = template_dir / entry.src
+    # Jinja wants forward slashes, even on Windows.
+    tmpl = env.get_template(entry.src.replace(os.path.sep, "/"))
+    newline = context["cookiecutter"].get("_new_lines") or _detect_newline(infile)
+    # Newlines are single characters, so encoding piecewise gives the same
+    # bytes as encoding the whole thing.
+    for chunk in tmpl.generate(**context):
+        yield _encode(chunk, newline)
+
+
+def render_file(env, entry: PlanEntry, template_dir: Path, context) -> bytes:
+    """
+    Render the templated file ``entry`` and return its contents.
+
+    The whole file is held in memory, unlike with :func:`render_into`.
+    """
+    return b"".join(_render_chunks(env, entry, template_dir, context))
+
+
+def _add_rendered(sink, env, entry: PlanEntry, template_dir: Path, context) -> int:
+    """
+    Render a templated file into ``sink`` and return its size.
+
+    Most files are small and are added in one go. Once the output reaches
+    :data:`STREAM_THRESHOLD`, the rest of the file is streamed to the sink
+    instead, so memory use doesn't grow with the size of the file.
+    """
+    mode = file_mode(template_dir / entry.src)
+    chunks = _render_chunks(env, entry, template_dir, context)
+    # Jinja's pieces can be tiny (eg: one per loop iteration), so collect them
+    # in one buffer rather than a list of objects.
+    head = bytearray()
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= STREAM_THRESHOLD:
+            return sink.add_stream(entry.dest, itertools.chain([head], chunks), mode)
+    data = bytes(head)
+    sink.add_file(entry.dest, data, mode)
+    return len(data)
+
+
+class DirectorySink:
+    """
+    Writes the rendered project to ``project_dir`` on disk.
+
+    Every sink has the same four methods, which take paths relative to the
+    project. :func:`render_into` calls them in render plan order, so a
+    directory is always added before anything in it. With ``threads``, files
+    are added concurrently, so sinks used that way must be thread-safe.
+
+    Parameters
+    ----------
+    project_dir : :class:`pathlib.Path`
+        The (already existing) project directory.
+    link_static : bool
+        If True, hardlink static files instead of copying them.
+    dedup : :class:`.dedup.BlobStore`, optional
+        If given, files that are already in the store are linked to it instead
+        of being written, and the others are added to it.
+    stats : :class:`RenderStats`, optional
+        Updated with what ``dedup`` saved.
+    """
+
+    def __init__(
+        self,
+        project_dir: Path,
+        link_static: bool = False,
+        dedup: Optional["BlobStore"] = None,
+        stats: Optional[RenderStats] = None,
+    ):
+        self.project_dir = project_dir
+        self.link_static = link_static
+        self.dedup = dedup
+        self.stats = stats if stats is not None else RenderStats()
+        self._stats_lock = threading.Lock()
+
+    def _count_dedup(self, saved: Tuple[int, int]) -> None:
+        nbytes, inodes = saved
+        if not (nbytes or inodes):
+            return
+        with self._stats_lock:
+            self.stats.files_deduped += 1
+            self.stats.bytes_deduped += nbytes
+            self.stats.inodes_deduped += inodes
+
+    def add_dir(self, dest: str) -> None:
+        (self.project_dir / dest).mkdir(parents=True, exist_ok=True)
+
+    def add_file(self, dest: str, data: bytes, mode: int) -> None:
+        outfile = self.project_dir / dest
+        if self.dedup is not None:
+            self._count_dedup(self.dedup.add_bytes(outfile, data, mode))
+            return
+        outfile.write_bytes(data)
+        os.chmod(outfile, mode)
+
+    def add_stream(self, dest: str, chunks: Iterable[bytes], mode: int) -> int:
+        """Add a file from ``chunks`` of its contents. Returns its size."""
+        outfile = self.project_dir / dest
+        size = 0
+        with open(outfile, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                size += len(chunk)
+        os.chmod(outfile, mode)
+        if self.dedup is not None:
+            # The hash isn't known until the whole file has been written.
+            self._count_dedup(self.dedup.adopt(outfile))
+        return size
+
+    def add_copy(self, dest: str, src: Path) -> int:
+        """Add the static file ``src`` as-is. Returns the number of bytes."""
+        outfile = self.project_dir / dest
+        if self.link_static:
+            fileops.hardlink(src, outfile)
+            return outfile.stat().st_size
+        if self.dedup is not None:
+            self._count_dedup(self.dedup.add_copy(outfile, src, fileops.copy_file))
+            return outfile.stat().st_size
+        return fileops.copy_file(src, outfile)
+
+
+@dataclass
+class VirtualFile:
+    data: bytes
+    mode: int
+
+
+class MemoryTree:
+    """
+    A rendered project that only exists in memory.
+
+    ``files`` maps each file's path (relative to the project, with ``/``) to
+    a :class:`VirtualFile` and ``dirs`` lists the directories, in render
+    plan order. This is also the sink that :func:`render_to_memory` renders
+    into.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.dirs: List[str] = []
+        self.files: Dict[str, VirtualFile] = {}
+
+    def add_dir(self, dest: str) -> None:
+        self.dirs.append(dest.replace(os.sep, "/"))
+
+    def add_file(self, dest: str, data: bytes, mode: int) -> None:
+        self.files[dest.replace(os.sep, "/")] = VirtualFile(data, mode)
+
+    def add_stream(self, dest: str, chunks: Iterable[bytes], mode: int) -> int:
+        data = b"".join(chunks)
+        self.add_file(dest, data, mode)
+        return len(data)
+
+    def add_copy(self, dest: str, src: Path) -> int:
+        data = src.read_bytes()
+        self.add_file(dest, data, file_mode(src))
+        return len(data)
+
+    def size(self) -> int:
+        """Return the total size of all files, in bytes."""
+        return sum(len(f.data) for f in self.files.values())
+
+
+def prepare(context: dict) -> Tuple[Path, StrictEnvironment, str]:
+    """Return the template dir, Jinja environment and project dir name."""
+    template_dir = Path(find_template(context["cookiecutter"]["_repo_dir"]))
+    env = make_environment(context, template_dir)
+    return template_dir, env, _render_path(env, template_dir.name, context)
+
+
+def project_name(context: dict) -> str:
+    """Return the name of the project directory for ``context``."""
+    return prepare(context)[2]
+
+
+def is_directory_name(name: str) -> bool:
+    """
+    Return True if ``name`` can be used as a single directory name.
+
+    That rules out path separators and the special names, which would put
+    the project somewhere other than directly in the output dir.
+    """
+    return name not in ("", ".", "..") and "/" not in name and os.sep not in name
+
+
+def render_entry(
+    sink,
+    env,
+    entry: PlanEntry,
+    template_dir: Path,
+    context: dict,
+    timings: Optional[Timings] = None,
+) -> int:
+    """
+    Render the file ``entry`` of the render plan into ``sink``.
+
+    Returns the file's size. Its directory must already have been added to
+    the sink. This is what :func:`render_into` does for every file, so it can
+    be used to re-render just a few files of a project.
+    """
+    timings = timings if timings is not None else NULL_TIMINGS
+    if entry.static:
+        with timings.file(entry.dest, "copy"):
+            return sink.add_copy(entry.dest, template_dir / entry.src)
+    try:
+        with timings.file(entry.dest, "render"):
+            return _add_rendered(sink, env, entry, template_dir, context)
+    except UndefinedError as err:
+        msg = f"Unable to create file '{entry.src}'"
+        raise UndefinedVariableInTemplate(msg, err, context) from err
+
+
+def render_into(
+    sink,
+    context: dict,
+    template_dir: Path,
+    env: StrictEnvironment,
+    stats: Optional[RenderStats] = None,
+    timings: Optional[Timings] = None,
+    threads: int = 1,
+) -> None:
+    """
+    Render every entry of the render plan into ``sink``.
+
+    See :class:`DirectorySink` for what a sink is. ``stats`` and ``timings``
+    are updated if given.
+
+    If ``threads`` is more than 1 then every directory is added first and the
+    files are then rendered and added on that many threads. All of them are
+    finished before this returns or raises, and if several fail, the error
+    is the one for the first file in plan order. Per-file CPU times aren't
+    meaningful in that case, because they include the other threads.
+    """
+    stats = stats if stats is not None else RenderStats()
+    timings = timings if timings is not None else NULL_TIMINGS
+
+    with timings.phase("plan"):
+        plan = build_plan(context, template_dir, env)
+
+    def count(entry: PlanEntry, size: int) -> None:
+        if entry.static:
+            stats.bytes_copied += size
+            stats.files_copied += 1
+        else:
+            stats.bytes_rendered += size
+            stats.files_rendered += 1
+
+    if threads <= 1:
+        for entry in plan:
+            if entry.is_dir:
+                sink.add_dir(entry.dest)
+            else:
+                count(
+                    entry,
+                    render_entry(sink, env, entry, template_dir, context, timings),
+                )
+        return
+
+    # Build the whole skeleton first so that files can be added in any order.
+    for entry in plan:
+        if entry.is_dir:
+            sink.add_dir(entry.dest)
+    files = [entry for entry in plan if not entry.is_dir]
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = [
+            pool.submit(render_entry, sink, env, entry, template_dir, context, timings)
+            for entry in files
+        ]
+    # Leaving the pool waited for every file, so nothing is still being
+    # written if one of them raises.
+    for entry, future in zip(files, futures):
+        count(entry, future.result())
+
+
+def render_project(
+    context: dict,
+    output_dir: str,
+    stats: Optional[RenderStats] = None,
+    link_static: bool = False,
+    timings: Optional[Timings] = None,
+    dedup: Optional["BlobStore"] = None,
+    threads: int = 1,
+) -> Path:
+    """
+    Render the project for ``context`` into ``output_dir``.
+
+    Returns the path to the new project directory.
+
+    If ``stats`` is given then it's updated with how many files and bytes
+    were rendered vs. copied. If ``link_static`` is True then static files
+    are hardlinked to the template instead of copied. Don't edit those files
+    in place: that would also change the template.
+
+    If ``timings`` is given then building the plan and each file are timed.
+
+    If ``dedup`` (a :class:`.dedup.BlobStore`) is given then files that are
+    identical to ones already in it are linked instead of written.
+
+    With ``threads`` greater than 1, files are rendered and written on that
+    many threads (see :func:`render_into`).
+
+    Raises
+    ------
+    OutputDirExistsException
+        If the project directory already exists.
+    UndefinedVariableInTemplate
+        If a path or file uses a variable that isn't in the context.
+    """
+    template_dir, env, project_name = prepare(context)
+
+    project_dir = Path(output_dir).resolve() / project_name
+    if project_dir.exists():
+        raise OutputDirExistsException(
+            f'Error: "{project_dir}" directory already exists'
+        )
+
+    project_dir.mkdir(parents=True)
+    try:
+        sink = DirectorySink(project_dir, link_static, dedup, stats)
+        render_into(sink, context, template_dir, env, stats, timings, threads)
+    except Exception:
+        # Don't leave a half-finished project around.
+        rmtree(project_dir)
+        raise
+
+    return project_dir
+
+
+def render_to_memory(
+    context: dict,
+    stats: Optional[RenderStats] = None,
+    timings: Optional[Timings] = None,
+) -> MemoryTree:
+    """
+    Render the project for ``context`` without touching the filesystem.
+
+    Nothing is written; the template is only read. See
+    :func:`render_project` for ``stats`` and ``timings``.
+    """
+    template_dir, env, project_name = prepare(context)
+    tree = MemoryTree(project_name)
+    render_into(tree, context, template_dir, env, stats, timings)
+    return tree
@@ -0,0 +1,302 @@
+"""
+Find out which template commit each project in a directory tree is on.
+
+Projects are found by walking the tree on a thread pool. A project is a
+directory with a recorded manifest (see :mod:`.update`) or a
+``pyproject.toml``; projects aren't searched for inside other projects.
+
+Each project's commit is identified either:
+
++ exactly, from the ``template_commit`` in its manifest, or
++ by fingerprinting: the project's files are compared (by git blob hash)
+  against the template's static files at every point in its history. The
+  newest commit with the most matching files is taken, so the number of
+  commits behind is a lower bound.
+
+The template's history (``git log --raw`` of the template checkout) is read
+once per scan and cached on disk by HEAD commit, so scanning thousands of
+projects doesn't make a single request per project.
+"""
+import hashlib
+import json
+import os
+import subprocess
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from dataclasses import asdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from . import gitdir
+from . import render
+from . import TEMPLATE_DIR
+from .output_cache import TEMPLATE_PATHS
+from .update import MANIFEST_NAME
+from .webapi import user_cache_dir
+
+# A directory with any of these is a project.
+PROJECT_MARKERS = (MANIFEST_NAME, "pyproject.toml")
+
+HISTORY_CACHE_VERSION = 1
+
+# What git writes for the "new" blob of a deleted file.
+_NULL_SHA = "0" * 40
+
+
+def git_blob_hash(data: bytes) -> str:
+    """Return the hash that git gives a blob with contents ``data``."""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+@dataclass
+class TemplateHistory:
+    """
+    The commits of the template, newest first, and what its static files
+    looked like at each of them.
+
+    Parameters
+    ----------
+    commits : list of str
+        Every commit of HEAD's first-parent history, newest first.
+    segments : list of (dict, int, int)
+        ``(files, newest, oldest)``: between ``commits[newest]`` and
+        ``commits[oldest]`` (inclusive), the project's files that can be
+        fingerprinted were ``files``, a ``{path: git blob hash}`` dict.
+        Newest first.
+    """
+
+    commits: List[str]
+    segments: List[Tuple[Dict[str, str], int, int]]
+
+    def behind(self, commit: str) -> Optional[int]:
+        """How many commits ``commit`` is behind HEAD, or None if unknown."""
+        try:
+            return self.commits.index(commit)
+        except ValueError:
+            return None
+
+    def fingerprint_paths(self) -> List[str]:
+        return sorted({path for files, _, _ in self.segments for path in files})
+
+    def identify(self, blobs: Dict[str, str]) -> Optional[Tuple[str, int]]:
+        """
+        Return the newest commit that best matches the project's ``blobs``.
+
+        Returns ``(commit, number of matching files)``, or None if no files
+        match at all.
+        """
+        best = None
+        best_matches = 0
+        for files, newest, _ in self.segments:
+            matches = sum(1 for p, blob in files.items() if blobs.get(p) == blob)
+            # Segments are newest first, so only a strictly better match wins.
+            if matches > best_matches:
+                best, best_matches = newest, matches
+        if best is None:
+            return None
+        return self.commits[best], best_matches
+
+
+def _dest_path(src: str) -> Optional[str]:
+    """The project path that template path ``src`` is written to, if fixed."""
+    prefix = TEMPLATE_PATHS[0] + "/"
+    if not src.startswith(prefix):
+        return None
+    rel = src[len(prefix) :]
+    if "{" in rel:
+        # Depends on the context; can't be compared across projects.
+        return None
+    head, name = os.path.split(rel)
+    return os.path.join(head, render.RENAME.get(rel, name)).replace(os.sep, "/")
+
+
+def _parse_history(log: str) -> TemplateHistory:
+    """Parse ``git log --format=%x00%H --raw`` output."""
+    commits = []
+    changes = []
+    for record in log.split("\0")[1:]:
+        lines = record.splitlines()
+        commits.append(lines[0].strip())
+        commit_changes = []
+        for line in lines[1:]:
+            if not line.startswith(":"):
+                continue
+            meta, _, path = line.partition("\t")
+            new_sha = meta.split()[3]
+            dest = _dest_path(path)
+            if dest is not None:
+                commit_changes.append((dest, new_sha))
+        changes.append(commit_changes)
+
+    # Replay the changes from the oldest commit to the newest.
+    segments = []
+    files: Dict[str, str] = {}
+    for i in reversed(range(len(commits))):
+        if changes[i] or not segments:
+            files = dict(files)
+            for dest, sha in changes[i]:
+                if sha == _NULL_SHA:
+                    files.pop(dest, None)
+                else:
+                    files[dest] = sha
+            segments.append([files, i, i])
+        else:
+            segments[-1][1] = i
+    segments.reverse()
+    return TemplateHistory(commits, [tuple(s) for s in segments])
+
+
+def _git(template_dir: Path, *args: str) -> str:
+    proc = subprocess.run(
+        ["git", *args],
+        cwd=template_dir,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=True,
+    )
+    return proc.stdout.decode("utf-8")
+
+
+def _head(template_dir: Path) -> str:
+    try:
+        return gitdir.resolve_head(gitdir.find_git_dir(template_dir))
+    except (gitdir.GitReadError, OSError):
+        return _git(template_dir, "rev-parse", "HEAD").strip()
+
+
+def load_history(
+    template_dir: Path = TEMPLATE_DIR, cache_dir: Optional[Path] = None
+) -> TemplateHistory:
+    """
+    Return the template's history, from the cache if HEAD hasn't moved.
+
+    Raises :class:`subprocess.CalledProcessError` if the template isn't a
+    git checkout.
+    """
+    cache_dir = Path(cache_dir) if cache_dir is not None else user_cache_dir()
+    head = _head(template_dir)
+    cache_file = cache_dir / "history" / f"{head}.json"
+    try:
+        with open(cache_file, encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached["version"] == HISTORY_CACHE_VERSION:
+            return TemplateHistory(
+                cached["commits"], [tuple(s) for s in cached["segments"]]
+            )
+    except (OSError, ValueError, KeyError):
+        pass
+
+    log = _git(
+        template_dir,
+        "log",
+        "--first-parent",
+        "--format=%x00%H",
+        "--raw",
+        "--root",
+        "--no-abbrev",
+        "--no-renames",
+        "--relative",
+        head,
+    )
+    history = _parse_history(log)
+
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cache_file.with_suffix(f".{os.getpid()}.tmp")
+    data = {"version": HISTORY_CACHE_VERSION, **asdict(history)}
+    tmp.write_text(json.dumps(data), encoding="utf-8")
+    os.replace(tmp, cache_file)
+    return history
+
+
+def _list_dir(path: Path) -> Tuple[Path, bool, List[Path]]:
+    """Return ``(path, is it a project, subdirectories to search)``."""
+    names = set()
+    subdirs = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                names.add(entry.name)
+                # Skip .git, .venv, .tox and friends.
+                if not entry.name.startswith(".") and entry.is_dir(
+                    follow_symlinks=False
+                ):
+                    subdirs.append(Path(entry.path))
+    except (PermissionError, FileNotFoundError):
+        return path, False, []
+    return path, any(m in names for m in PROJECT_MARKERS), subdirs
+
+
+def find_projects(root: Path, workers: Optional[int] = None) -> List[Path]:
+    """Return every project directory under ``root`` (inclusive), sorted."""
+    projects = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(_list_dir, Path(root))}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, is_project, subdirs = future.result()
+                if is_project:
+                    projects.append(path)
+                else:
+                    pending.update(pool.submit(_list_dir, d) for d in subdirs)
+    return sorted(projects)
+
+
+@dataclass
+class ProjectStatus:
+    """
+    Which template commit the project at ``path`` is on.
+
+    ``source`` is "manifest", "fingerprint" or None if the commit couldn't be
+    identified. For fingerprints, ``behind`` is a lower bound. ``behind`` is
+    None if the commit isn't in the template's history.
+    """
+
+    path: Path
+    commit: Optional[str] = None
+    behind: Optional[int] = None
+    source: Optional[str] = None
+
+    @property
+    def exact(self) -> bool:
+        return self.source == "manifest"
+
+
+def identify_project(project_dir: Path, history: TemplateHistory) -> ProjectStatus:
+    status = ProjectStatus(project_dir)
+    try:
+        with open(project_dir / MANIFEST_NAME, encoding="utf-8") as f:
+            status.commit = json.load(f).get("template_commit")
+        status.source = "manifest"
+    except (OSError, ValueError):
+        blobs = {}
+        for rel in history.fingerprint_paths():
+            try:
+                blobs[rel] = git_blob_hash((project_dir / rel).read_bytes())
+            except OSError:
+                continue
+        match = history.identify(blobs)
+        if match is not None:
+            status.commit = match[0]
+            status.source = "fingerprint"
+
+    if status.commit is not None:
+        status.behind = history.behind(status.commit)
+    return status
+
+
+def scan(
+    root: Path,
+    history: Optional[TemplateHistory] = None,
+    workers: Optional[int] = None,
+) -> List[ProjectStatus]:
+    """Identify the template commit of every project under ``root``."""
+    history = history if history is not None else load_history()
+    projects = find_projects(root, workers)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda p: identify_project(p, history), projects))
@@ -0,0 +1,388 @@
+"""
+A long-running server that generates projects on request.
+
+The template is parsed once when the server starts, and the Jinja templates
+are compiled on first use and then reused (see :func:`.render.make_environment`).
+Hooks run in-process, so a request only pays for rendering. The server
+notices when the template changes and reloads it.
+
+Requests are handled by a bounded pool of worker threads. The server listens
+on a TCP port or on a Unix socket.
+
+API
+---
+
+``POST /generate`` with a JSON body::
+
+    {
+        "context": {"project_name": "Foo", ...},  # like --extra-context
+        "archive": "tar.gz",                      # either this ("tar.gz", "zip")
+        "output_dir": "/path/to/dir"              # or this
+    }
+
+With ``archive``, the response is the archive itself. With ``output_dir``,
+the project is written there and the response is ``201`` with
+``{"project_dir": "..."}``. ``output_dir`` is relative to the server's
+``root`` (the working directory by default), and anything that resolves to
+outside of it is rejected, so clients can only write where they're meant to.
+Even so, anyone that can reach the server can write projects into ``root``:
+only listen on localhost or a Unix socket.
+
+``GET /health`` returns the server status: how many times the template has
+been loaded and how many projects have been generated.
+
+Errors are returned as ``{"error": "..."}``: ``400`` for a bad request or a
+context that the template rejects, ``409`` if the project directory already
+exists, and ``500`` for anything else.
+"""
+import datetime
+import io
+import json
+import os
+import socketserver
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler
+from http.server import HTTPServer
+from pathlib import Path
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+
+from cookiecutter.exceptions import CookiecutterException
+from cookiecutter.exceptions import OutputDirExistsException
+
+from . import hook_runner
+from . import render
+from . import TEMPLATE_DIR
+from .archive import FORMATS
+from .generate import generate_archive
+from .generate import generate_project
+from .generate import prepare_template
+from .generate import resolve_context
+from .output_cache import TEMPLATE_PATHS
+
+CONTENT_TYPES = {"tar.gz": "application/gzip", "zip": "application/zip"}
+
+DEFAULT_PORT = 8765
+
+
+class RequestError(Exception):
+    """A request that can't be handled. ``status`` is the HTTP status."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def template_signature(template_dir: Path = TEMPLATE_DIR) -> Tuple:
+    """
+    Return something that changes whenever the template changes.
+
+    Only the files are ``stat``-ed, so this is cheap enough to poll.
+    """
+    signature = []
+    for rel in TEMPLATE_PATHS:
+        path = template_dir / rel
+        if path.is_file():
+            st = path.stat()
+            signature.append((rel, st.st_mtime_ns, st.st_size))
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+            for name in sorted(files):
+                st = os.stat(os.path.join(root, name))
+                signature.append((root, name, st.st_mtime_ns, st.st_size))
+    return tuple(signature)
+
+
+@dataclass(frozen=True)
+class _LoadedTemplate:
+    base_context: dict
+    signature: Tuple
+    version: int
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_ServerMixin"
+
+    def log_message(self, format, *args):
+        # The portal makes a lot of requests; don't log every one.
+        pass
+
+    def _send(self, status: int, body: bytes, headers: Dict[str, str]) -> None:
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, data: dict) -> None:
+        body = json.dumps(data).encode("utf-8")
+        self._send(status, body, {"Content-Type": "application/json"})
+
+    def do_GET(self):
+        if self.path != "/health":
+            self._send_json(404, {"error": f"Unknown path `{self.path}`."})
+            return
+        self._send_json(200, self.server.scaffold.health())
+
+    def do_POST(self):
+        if self.path != "/generate":
+            self._send_json(404, {"error": f"Unknown path `{self.path}`."})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                request = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError as err:
+                raise RequestError(400, f"Invalid JSON: {err}")
+            status, body, headers = self.server.scaffold.generate(request)
+        except RequestError as err:
+            self._send_json(err.status, {"error": str(err)})
+            return
+        except Exception as err:
+            self._send_json(500, {"error": f"{type(err).__name__}: {err}"})
+            return
+        self._send(status, body, headers)
+
+
+class _ServerMixin:
+    """Handle each connection on a bounded thread pool."""
+
+    scaffold: "ScaffoldServer"
+    pool: ThreadPoolExecutor
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+class _TCPServer(_ServerMixin, HTTPServer):
+    pass
+
+
+class _UnixServer(_ServerMixin, socketserver.UnixStreamServer):
+    pass
+
+
+class ScaffoldServer:
+    """
+    Parameters
+    ----------
+    host, port : str, int
+        The address to listen on. Port 0 picks a free port.
+    socket_path : :class:`pathlib.Path`, optional
+        Listen on this Unix socket instead of ``host`` and ``port``.
+    workers : int, optional
+        The number of requests handled at once. Defaults to the CPU count.
+    reload_interval : float
+        Seconds between checks for template changes. 0 disables reloading.
+    template_dir : :class:`pathlib.Path`
+        The template to generate projects from.
+    root : :class:`pathlib.Path`, optional
+        Requests can only write projects in here. Defaults to the current
+        working directory.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = DEFAULT_PORT,
+        socket_path: Optional[Path] = None,
+        workers: Optional[int] = None,
+        reload_interval: float = 1.0,
+        template_dir: Path = TEMPLATE_DIR,
+        root: Optional[Path] = None,
+    ):
+        self.host = host
+        self.port = port
+        self.socket_path = socket_path
+        self.workers = workers or os.cpu_count() or 1
+        self.reload_interval = reload_interval
+        self.template_dir = template_dir
+        self.root = Path(root if root is not None else os.getcwd()).resolve()
+
+        self.generated = 0
+        self._lock = threading.Lock()
+        self._template: Optional[_LoadedTemplate] = None
+        self._server = None
+        self._threads = []
+        self._stopping = threading.Event()
+
+    @property
+    def url(self) -> str:
+        """The base URL of the server (TCP only)."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def load_template(self) -> None:
+        """(Re)load the template if it changed since it was last loaded."""
+        signature = template_signature(self.template_dir)
+        with self._lock:
+            old = self._template
+            if old is not None and old.signature == signature:
+                return
+            # The hooks might have changed too.
+            hook_runner.load_hook.cache_clear()
+            version = old.version + 1 if old is not None else 1
+            base_context = prepare_template(self.template_dir)
+            self._template = _LoadedTemplate(base_context, signature, version)
+
+    def health(self) -> dict:
+        template = self._template
+        return {
+            "status": "ok",
+            "template_version": template.version,
+            "generated": self.generated,
+        }
+
+    def resolve_output_dir(self, output_dir: str) -> Path:
+        """
+        Return the absolute path of a request's ``output_dir``.
+
+        Raises :class:`RequestError` if it's outside of :attr:`root`.
+        """
+        if not isinstance(output_dir, str) or not output_dir:
+            raise RequestError(400, "`output_dir` must be a non-empty string.")
+        # resolve() follows symlinks, so they can't be used to get out either.
+        path = (self.root / output_dir).resolve()
+        if not path.is_relative_to(self.root):
+            raise RequestError(400, f"`output_dir` must be inside {self.root}.")
+        return path
+
+    def _project_name(self, context: dict, output_dir: Optional[str]) -> str:
+        """
+        Return the project directory name for ``context``.
+
+        Raises :class:`RequestError` if it isn't a plain directory name (eg: a
+        ``project_slug`` of ``../x``), or if the project would end up outside
+        of :attr:`root`.
+        """
+        name = render.project_name(context)
+        if not render.is_directory_name(name):
+            raise RequestError(400, f"'{name}' is not a directory name.")
+        if output_dir is not None:
+            project_dir = (Path(output_dir) / name).resolve()
+            if not project_dir.is_relative_to(self.root):
+                raise RequestError(400, f"The project must be inside {self.root}.")
+        return name
+
+    def generate(self, request: dict) -> Tuple[int, bytes, Dict[str, str]]:
+        """
+        Handle a ``/generate`` request.
+
+        Returns the HTTP status, body and headers. Raises
+        :class:`RequestError` for a bad request.
+        """
+        if not isinstance(request, dict):
+            raise RequestError(400, "The request must be a JSON object.")
+        extra_context = request.get("context", {})
+        fmt = request.get("archive")
+        output_dir = request.get("output_dir")
+        if not isinstance(extra_context, dict):
+            raise RequestError(400, "`context` must be a JSON object.")
+        if (fmt is None) == (output_dir is None):
+            raise RequestError(400, "Give exactly one of `archive` or `output_dir`.")
+        if fmt is not None and fmt not in FORMATS:
+            raise RequestError(400, f"`archive` must be one of {list(FORMATS)}.")
+        if output_dir is not None:
+            output_dir = str(self.resolve_output_dir(output_dir))
+
+        # Use whatever template is loaded now, even if it's reloaded while
+        # this request is running.
+        template = self._template
+        extra_context = {
+            "create_date": datetime.date.today().isoformat(),
+            **extra_context,
+        }
+
+        try:
+            context = resolve_context(
+                template.base_context, extra_context, output_dir or str(self.root)
+            )
+            project_name = self._project_name(context, output_dir)
+            if fmt is not None:
+                buf = io.BytesIO()
+                generate_archive(context, buf, fmt)
+                response = (
+                    200,
+                    buf.getvalue(),
+                    {
+                        "Content-Type": CONTENT_TYPES[fmt],
+                        "Content-Disposition": (
+                            f'attachment; filename="{project_name}.{fmt}"'
+                        ),
+                    },
+                )
+            else:
+                project_dir = generate_project(context, output_dir)
+                body = json.dumps({"project_dir": str(project_dir)}).encode("utf-8")
+                response = (201, body, {"Content-Type": "application/json"})
+        except OutputDirExistsException as err:
+            raise RequestError(409, str(err))
+        except CookiecutterException as err:
+            # Eg: the pre-gen hook rejected the context, or it's missing a
+            # variable that the template uses.
+            raise RequestError(400, f"{type(err).__name__}: {err}")
+
+        with self._lock:
+            self.generated += 1
+        return response
+
+    def _watch(self) -> None:
+        while not self._stopping.wait(self.reload_interval):
+            try:
+                self.load_template()
+            except Exception:
+                # Most likely a half-saved file. Keep serving the old
+                # template and try again next time.
+                continue
+
+    def start(self) -> "ScaffoldServer":
+        """Load the template and start serving in background threads."""
+        self.load_template()
+
+        if self.socket_path is not None:
+            self._server = _UnixServer(str(self.socket_path), _Handler)
+        else:
+            self._server = _TCPServer((self.host, self.port), _Handler)
+        self._server.scaffold = self
+        self._server.pool = ThreadPoolExecutor(max_workers=self.workers)
+
+        self._stopping.clear()
+        targets = [lambda: self._server.serve_forever(poll_interval=0.05)]
+        if self.reload_interval > 0:
+            targets.append(self._watch)
+        for target in targets:
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self) -> None:
+        self._stopping.set()
+        self._server.shutdown()
+        self._server.server_close()
+        self._server.pool.shutdown(wait=True)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self.socket_path is not None:
+            Path(self.socket_path).unlink(missing_ok=True)
+
+    def __enter__(self) -> "ScaffoldServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
@@ -0,0 +1,140 @@
+"""
+"""
+import io
+import stat
+import tarfile
+import zipfile
+
+import pytest
+from click.testing import CliRunner
+
+from . import archive
+from . import DATA_DIR
+from . import main
+from . import render
+from .generate import generate_archive
+from .generate import prepare_template
+from .generate import resolve_context
+
+REFERENCE_DIR = DATA_DIR / "reference-proj"
+
+
+class _Unseekable(io.RawIOBase):
+    """A write-only stream, like a pipe."""
+
+    def __init__(self):
+        self.buffer = io.BytesIO()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        return self.buffer.write(data)
+
+
+def _reference_files():
+    return {
+        "reference-proj/" + p.relative_to(REFERENCE_DIR).as_posix(): p.read_bytes()
+        for p in REFERENCE_DIR.rglob("*")
+        if p.is_file()
+    }
+
+
+def _archive_bytes(extra_context, tmp_path, fmt):
+    out = _Unseekable()
+    context = resolve_context(prepare_template(), extra_context, str(tmp_path))
+    generate_archive(context, out, fmt)
+    return out.buffer.getvalue()
+
+
+def test_tar_gz(tmp_path, extra_context):
+    data = _archive_bytes(extra_context, tmp_path, "tar.gz")
+
+    with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as tar:
+        members = tar.getmembers()
+        files = {m.name: tar.extractfile(m).read() for m in members if m.isfile()}
+
+    assert files == _reference_files()
+    assert members[0].name == "reference-proj" and members[0].isdir()
+    assert {m.mtime for m in members} == {archive.DEFAULT_EPOCH}
+    assert {(m.uid, m.gid, m.uname, m.gname) for m in members} == {(0, 0, "", "")}
+
+
+def test_zip(tmp_path, extra_context):
+    data = _archive_bytes(extra_context, tmp_path, "zip")
+
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        infos = zf.infolist()
+        files = {i.filename: zf.read(i) for i in infos if not i.is_dir()}
+
+    assert files == _reference_files()
+    assert infos[0].filename == "reference-proj/"
+    assert {i.date_time for i in infos} == {(1980, 1, 1, 0, 0, 0)}
+    for info in infos:
+        assert stat.S_ISDIR(info.external_attr >> 16) == info.is_dir()
+
+
+@pytest.mark.parametrize("fmt", ["tar.gz", "zip"])
+def test_archive_is_deterministic(monkeypatch, tmp_path, extra_context, fmt):
+    first = _archive_bytes(extra_context, tmp_path, fmt)
+    assert _archive_bytes(extra_context, tmp_path, fmt) == first
+
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1600000000")
+    assert _archive_bytes(extra_context, tmp_path, fmt) != first
+
+
+@pytest.mark.parametrize("fmt", ["tar.gz", "zip"])
+def test_archive_streamed_files(monkeypatch, tmp_path, extra_context, fmt):
+    monkeypatch.setattr(render, "STREAM_THRESHOLD", 1)
+    data = _archive_bytes(extra_context, tmp_path, fmt)
+
+    if fmt == "zip":
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            files = {i.filename: zf.read(i) for i in zf.infolist() if not i.is_dir()}
+    else:
+        with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as tar:
+            files = {m.name: tar.extractfile(m).read() for m in tar if m.isfile()}
+    assert files == _reference_files()
+
+
+def test_archive_sink_unknown_format():
+    with pytest.raises(ValueError):
+        archive.archive_sink("rar", io.BytesIO(), "foo")
+
+
+def test_main_archive_file(tmp_path, extra_context):
+    args = [
+        "--no-version-check",
+        str(tmp_path),
+        "--extra-context",
+        f"""{extra_context}""",
+        "--archive",
+        "zip",
+    ]
+
+    result = CliRunner().invoke(main.main, args)
+    assert result.exit_code == 0
+    assert zipfile.is_zipfile(tmp_path / "reference-proj.zip")
+
+    # Never overwrite an existing archive.
+    result = CliRunner().invoke(main.main, args)
+    assert result.exit_code == 1
+    assert "already exists" in result.output
+
+
+def test_main_archive_stdout(tmp_path, extra_context):
+    args = [
+        "--no-version-check",
+        "-",
+        "--extra-context",
+        f"""{extra_context}""",
+        "--archive",
+        "tar.gz",
+    ]
+
+    result = CliRunner().invoke(main.main, args)
+    assert result.exit_code == 0
+
+    # Nothing but the archive should be on stdout.
+    expected = _archive_bytes(extra_context, tmp_path, "tar.gz")
+    assert result.stdout_bytes == expected
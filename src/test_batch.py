@@ -0,0 +1,134 @@
+"""
+"""
+import json
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from . import batch
+from . import DATA_DIR
+from . import main
+from .test_main import _assert_dirs_equal
+
+
+def _write_jsonl(path, entries):
+    path.write_text("\n".join(json.dumps(e) for e in entries) + "\n")
+
+
+def test_load_manifest_jsonl(tmp_path):
+    fp = tmp_path / "manifest.jsonl"
+    fp.write_text('{"project_name": "a"}\n\n{"project_name": "b"}\n')
+
+    got = batch.load_manifest(fp)
+    assert got == [{"project_name": "a"}, {"project_name": "b"}]
+
+
+def test_load_manifest_csv(tmp_path):
+    fp = tmp_path / "manifest.csv"
+    fp.write_text("project_name,package_name\nA,a\nB,b\n")
+
+    got = batch.load_manifest(fp)
+    assert got == [
+        {"project_name": "A", "package_name": "a"},
+        {"project_name": "B", "package_name": "b"},
+    ]
+
+
+@pytest.mark.parametrize(
+    "name, content",
+    [
+        ("manifest.txt", ""),
+        ("manifest.jsonl", '["not", "a", "dict"]\n'),
+    ],
+)
+def test_load_manifest_raises(tmp_path, name, content):
+    fp = tmp_path / name
+    fp.write_text(content)
+    with pytest.raises(ValueError):
+        batch.load_manifest(fp)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_batch(tmp_path, extra_context, workers):
+    bad = dict(extra_context, project_slug="bad-proj", package_name="1bad")
+    entries = [extra_context, bad]
+
+    results = list(batch.run_batch(entries, str(tmp_path), workers=workers))
+
+    assert [r.index for r in results] == [0, 1]
+    assert results[0].ok
+    assert results[0].project == "reference-proj"
+    assert not results[1].ok
+    assert results[1].error is not None
+
+    # The failure must not affect the good project.
+    _assert_dirs_equal(actual=tmp_path, expected=DATA_DIR)
+
+
+def test_run_batch_output_dirs(tmp_path, extra_context):
+    output_dirs = [str(tmp_path / "a"), str(tmp_path / "b")]
+
+    results = list(batch.run_batch([extra_context] * 2, output_dirs))
+
+    assert all(r.ok for r in results)
+    for output_dir in output_dirs:
+        _assert_dirs_equal(actual=Path(output_dir), expected=DATA_DIR)
+
+    with pytest.raises(ValueError, match="one output dir per entry"):
+        list(batch.run_batch([extra_context], output_dirs))
+
+
+def test_main_manifest(tmp_path, extra_context):
+    manifest = tmp_path / "manifest.jsonl"
+    outdir = tmp_path / "out"
+    second = dict(extra_context, project_slug="second-proj")
+    _write_jsonl(manifest, [extra_context, second])
+
+    args = [
+        "--no-version-check",
+        str(outdir),
+        "--manifest",
+        str(manifest),
+        "--workers",
+        "2",
+    ]
+
+    runner = CliRunner()
+    result = runner.invoke(main.main, args)
+
+    assert result.exit_code == 0
+    assert "Created 2 of 2 projects" in result.output
+    assert (outdir / "reference-proj" / "pyproject.toml").exists()
+    assert (outdir / "second-proj" / "pyproject.toml").exists()
+
+
+def test_main_manifest_failure_exit_code(tmp_path, extra_context):
+    manifest = tmp_path / "manifest.jsonl"
+    outdir = tmp_path / "out"
+    bad = dict(extra_context, project_slug="bad-proj", package_name="")
+    _write_jsonl(manifest, [extra_context, bad])
+
+    args = ["--no-version-check", str(outdir), "--manifest", str(manifest)]
+
+    runner = CliRunner()
+    result = runner.invoke(main.main, args)
+
+    assert result.exit_code == 1
+    assert "Created 1 of 2 projects" in result.output
+    assert "bad-proj: FAILED" in result.output
+
+
+def test_main_manifest_git_init(tmp_path, extra_context):
+    manifest = tmp_path / "manifest.jsonl"
+    outdir = tmp_path / "out"
+    second = dict(extra_context, project_slug="second-proj")
+    _write_jsonl(manifest, [extra_context, second])
+    args = ["--no-version-check", str(outdir), "--manifest", str(manifest)]
+
+    runner = CliRunner()
+    result = runner.invoke(main.main, [*args, "--workers", "2", "--git-init"])
+
+    assert result.exit_code == 0, result.output
+    for name in ["reference-proj", "second-proj"]:
+        assert (outdir / name / ".git" / "HEAD").exists()
@@ -0,0 +1,83 @@
+"""
+"""
+import json
+import os
+
+import pytest
+
+from . import benchmark
+
+
+def test_measure():
+    calls = []
+    result = benchmark.measure(lambda x: calls.append(x), lambda: (1,), 3, calls=4)
+
+    # One untimed call for the memory measurement, then 3 samples of 4.
+    assert len(calls) == 1 + 3 * 4
+    assert result["samples"] == 3
+    assert result["calls"] == 4
+    assert 0 <= result["min"] <= result["median"] <= result["max"]
+    assert result["peak_memory"] >= 0
+
+
+def test_measure_peak_memory():
+    small = benchmark.measure(lambda: bytearray(1), samples=1)
+    big = benchmark.measure(lambda: bytearray(10 * 1024 * 1024), samples=1)
+    assert big["peak_memory"] >= 10 * 1024 * 1024 > small["peak_memory"]
+
+
+def test_save_load_results(tmp_path):
+    results = {"case": {"median": 1.0, "peak_memory": 10}}
+    path = tmp_path / "results.json"
+
+    benchmark.save_results(results, path)
+    assert benchmark.load_results(path) == results
+    assert json.loads(path.read_text())["version"] == benchmark.RESULTS_VERSION
+
+
+def test_load_results_raises(tmp_path):
+    path = tmp_path / "results.json"
+    path.write_text(json.dumps({"version": 999, "results": {}}))
+    with pytest.raises(ValueError):
+        benchmark.load_results(path)
+
+
+def test_compare():
+    baseline = {
+        "same": {"median": 1.0, "peak_memory": 100},
+        "slower": {"median": 1.0, "peak_memory": 100},
+        "bigger": {"median": 1.0, "peak_memory": 100},
+        "removed": {"median": 1.0, "peak_memory": 100},
+    }
+    current = {
+        "same": {"median": 1.05, "peak_memory": 100},
+        "slower": {"median": 1.5, "peak_memory": 100},
+        "bigger": {"median": 0.5, "peak_memory": 200},
+        "added": {"median": 1.0, "peak_memory": 100},
+    }
+
+    comparisons = benchmark.compare(baseline, current, threshold=0.1)
+
+    assert {c.case for c in comparisons} == {"same", "slower", "bigger"}
+    regressed = {(c.case, c.metric) for c in comparisons if c.regressed}
+    assert regressed == {("slower", "median"), ("bigger", "peak_memory")}
+
+
+def test_comparison_zero_baseline():
+    assert benchmark.Comparison("c", "m", 0, 0, 0.1).change == 0
+    assert benchmark.Comparison("c", "m", 0, 1, 0.1).regressed
+
+
+def test_patched(monkeypatch):
+    monkeypatch.delenv("BENCHMARK_TEST_VAR", raising=False)
+    monkeypatch.setattr(benchmark, "DEFAULT_THRESHOLD", 0.1)
+
+    with pytest.raises(RuntimeError):
+        with benchmark.patched(benchmark, "DEFAULT_THRESHOLD", 0.5):
+            with benchmark.patched_env("BENCHMARK_TEST_VAR", "x"):
+                assert benchmark.DEFAULT_THRESHOLD == 0.5
+                assert os.environ["BENCHMARK_TEST_VAR"] == "x"
+                raise RuntimeError
+
+    assert benchmark.DEFAULT_THRESHOLD == 0.1
+    assert "BENCHMARK_TEST_VAR" not in os.environ
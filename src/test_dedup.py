@@ -0,0 +1,112 @@
+"""
+"""
+import json
+import os
+
+import pytest
+from click.testing import CliRunner
+
+from . import batch
+from . import DATA_DIR
+from . import dedup
+from . import fileops
+from . import main
+from .test_main import _assert_dirs_equal
+
+
+@pytest.fixture
+def store(tmp_path):
+    with dedup.temporary_store(tmp_path / "out") as store:
+        yield store
+    assert not store.path.exists()
+
+
+def test_add_bytes(store):
+    out = store.path.parent
+    assert store.add_bytes(out / "a", b"same\n", 0o644) == (0, 0)
+    assert store.add_bytes(out / "b", b"same\n", 0o644) == (5, 1)
+    # A different mode can't share the inode.
+    assert store.add_bytes(out / "c", b"same\n", 0o755) == (0, 0)
+    assert store.add_bytes(out / "d", b"other\n", 0o644) == (0, 0)
+
+    assert os.path.samefile(out / "a", out / "b")
+    assert not os.path.samefile(out / "a", out / "c")
+    assert os.stat(out / "c").st_mode & 0o777 == 0o755
+    assert (out / "b").read_bytes() == b"same\n"
+
+
+def test_add_copy_and_adopt(store, tmp_path):
+    out = store.path.parent
+    src = tmp_path / "src"
+    src.write_bytes(b"data\n")
+    os.chmod(src, 0o644)
+    assert store.add_bytes(out / "a", b"data\n", 0o644) == (0, 0)
+    assert store.add_copy(out / "b", src, fileops.copy_file) == (5, 1)
+
+    (out / "c").write_bytes(b"data\n")
+    os.chmod(out / "c", 0o644)
+    assert store.adopt(out / "c") == (5, 1)
+    assert os.path.samefile(out / "a", out / "c")
+    assert sorted(p.name for p in out.iterdir() if p != store.path) == ["a", "b", "c"]
+
+
+def test_reflink(store):
+    out = store.path.parent
+    store.link = "reflink"
+    store.add_bytes(out / "a", b"same\n", 0o644)
+    nbytes, inodes = store.add_bytes(out / "b", b"same\n", 0o644)
+
+    # Only some filesystems support reflinks; either way it's a copy.
+    assert inodes == 0
+    assert nbytes in (0, 5)
+    assert not os.path.samefile(out / "a", out / "b")
+    assert (out / "b").read_bytes() == b"same\n"
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_batch(tmp_path, extra_context, workers):
+    first = tmp_path / "first"
+    second = tmp_path / "second"
+    entries = [extra_context, extra_context]
+    with dedup.temporary_store(tmp_path) as store:
+        results = [
+            *batch.run_batch(entries[:1], str(first), workers=workers, dedup=store),
+            *batch.run_batch(entries[1:], str(second), workers=workers, dedup=store),
+        ]
+
+    assert all(r.ok for r in results)
+    # Only the first project's empty files are linked to each other, but the
+    # second one is all links.
+    assert 0 < results[0].stats.files_deduped < 5
+    assert results[0].stats.bytes_deduped == 0
+    stats = results[1].stats
+    assert stats.files_deduped == stats.files_rendered + stats.files_copied
+    assert stats.inodes_deduped == stats.files_deduped
+    assert stats.bytes_deduped == stats.bytes_rendered + stats.bytes_copied
+    assert os.path.samefile(
+        first / "reference-proj" / "README.md", second / "reference-proj" / "README.md"
+    )
+    _assert_dirs_equal(actual=first, expected=DATA_DIR)
+    _assert_dirs_equal(actual=second, expected=DATA_DIR)
+
+
+def test_cli(tmp_path, extra_context):
+    manifest = tmp_path / "manifest.jsonl"
+    outdir = tmp_path / "out"
+    entries = [dict(extra_context, project_slug=f"proj-{i}") for i in range(3)]
+    manifest.write_text("\n".join(json.dumps(e) for e in entries) + "\n")
+    args = ["--no-version-check", str(outdir), "--manifest", str(manifest)]
+
+    runner = CliRunner()
+    result = runner.invoke(main.main, [*args, "--dedup", "hardlink"])
+
+    assert result.exit_code == 0, result.output
+    assert "Deduplicated " in result.output
+    # The store is gone.
+    assert sorted(p.name for p in outdir.iterdir()) == ["proj-0", "proj-1", "proj-2"]
+
+    result = runner.invoke(
+        main.main, ["--no-version-check", str(outdir), "--dedup", "hardlink"]
+    )
+    assert result.exit_code == 2
+    assert "--dedup can only be used with --manifest" in result.output
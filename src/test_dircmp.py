@@ -0,0 +1,113 @@
+"""
+"""
+import os
+
+import pytest
+
+from . import dircmp
+
+
+@pytest.fixture
+def trees(tmp_path):
+    actual = tmp_path / "actual"
+    expected = tmp_path / "expected"
+    for root in (actual, expected):
+        (root / "sub").mkdir(parents=True)
+        (root / "same.txt").write_text("same\n")
+        (root / "sub" / "same.bin").write_bytes(b"\0\1\2" * 1000)
+    return actual, expected
+
+
+def test_compare_trees_equal(trees):
+    diff = dircmp.compare_trees(*trees)
+    assert diff.ok
+    assert diff.compared == 2
+    assert dircmp.format_diff(diff) == ""
+
+
+def test_compare_trees_missing_extra(trees):
+    actual, expected = trees
+    (actual / "extra.txt").write_text("extra\n")
+    (expected / "sub" / "missing.txt").write_text("missing\n")
+    (actual / "foo.swp").write_text("ignored")
+
+    diff = dircmp.compare_trees(actual, expected)
+    assert not diff.ok
+    assert diff.missing == ["sub/missing.txt"]
+    assert diff.extra == ["extra.txt"]
+    assert diff.differing == []
+
+
+def test_compare_trees_paths(trees):
+    actual, expected = trees
+    (actual / "extra.txt").write_text("extra\n")
+    (expected / "missing.txt").write_text("missing\n")
+    (actual / "same.txt").write_text("changed\n")
+    (actual / "sub" / "same.bin").write_bytes(b"changed")
+
+    diff = dircmp.compare_trees(
+        actual, expected, paths=["same.txt", "missing.txt", "nowhere.txt"]
+    )
+    assert diff.missing == ["missing.txt"]
+    assert diff.extra == []
+    assert diff.differing == ["same.txt"]
+    assert diff.compared == 1
+
+
+def test_compare_trees_differing(trees):
+    actual, expected = trees
+    # Same size, different content: only found by hashing.
+    (actual / "same.txt").write_text("SAME\n")
+    # Different size: found by stat.
+    (actual / "sub" / "same.bin").write_bytes(b"\0")
+
+    diff = dircmp.compare_trees(actual, expected, workers=2)
+    assert diff.differing == ["same.txt", "sub/same.bin"]
+
+    report = dircmp.format_diff(diff)
+    assert "-SAME\n+same\n" in report
+    assert "Binary files" in report and "same.bin differ" in report
+
+
+def test_compare_trees_only_hashes_same_size(monkeypatch, trees):
+    actual, expected = trees
+    (actual / "same.txt").write_text("longer\n")
+    hashed = []
+    original = dircmp.file_hash
+
+    def spy(path, *args):
+        hashed.append(path.name)
+        return original(path, *args)
+
+    monkeypatch.setattr(dircmp, "file_hash", spy)
+    dircmp.compare_trees(actual, expected)
+    assert "same.txt" not in hashed
+
+
+def test_file_hash_notices_changes(tmp_path):
+    path = tmp_path / "f"
+    path.write_bytes(b"a")
+    first = dircmp.file_hash(path)
+    path.write_bytes(b"bb")
+    assert dircmp.file_hash(path) != first
+
+
+def test_file_hash_memo(monkeypatch, tmp_path):
+    monkeypatch.setattr(dircmp, "HASH_MEMO_SIZE", 2)
+    monkeypatch.setattr(dircmp, "_hash_memo", dircmp.OrderedDict())
+    paths = [tmp_path / name for name in "abc"]
+    for path in paths:
+        path.write_bytes(path.name.encode())
+        dircmp.file_hash(path)
+    # Only the most recent ones are kept.
+    assert [key[0] for key in dircmp._hash_memo] == [str(p) for p in paths[1:]]
+
+    # A same-size edit that keeps the mtime still changes the ctime.
+    path = paths[2]
+    first = dircmp.file_hash(path)
+    st = os.stat(path)
+    path.write_bytes(b"C")
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert dircmp.file_hash(path) != first
+    assert dircmp.file_hash(path, memo=False) == dircmp.file_hash(path)
+    assert len(dircmp._hash_memo) == 2
@@ -0,0 +1,58 @@
+"""
+"""
+import os
+
+import pytest
+
+from . import fileops
+
+
+@pytest.fixture
+def src_file(tmp_path):
+    path = tmp_path / "src.bin"
+    path.write_bytes(os.urandom(256 * 1024))
+    path.chmod(0o755)
+    return path
+
+
+def test_copy_file(tmp_path, src_file):
+    dst = tmp_path / "dst.bin"
+
+    assert fileops.copy_file(src_file, dst) == src_file.stat().st_size
+    assert dst.read_bytes() == src_file.read_bytes()
+    assert dst.stat().st_mode == src_file.stat().st_mode
+
+
+def test_copy_file_userspace_fallback(monkeypatch, tmp_path, src_file):
+    def fail(*args):
+        raise OSError("no zero-copy here")
+
+    monkeypatch.setattr(fileops, "_copy_range", fail)
+    dst = tmp_path / "dst.bin"
+
+    fileops.copy_file(src_file, dst)
+    assert dst.read_bytes() == src_file.read_bytes()
+
+
+def test_copy_file_empty(tmp_path):
+    src = tmp_path / "empty"
+    src.touch()
+    dst = tmp_path / "dst"
+
+    assert fileops.copy_file(src, dst) == 0
+    assert dst.read_bytes() == b""
+
+
+def test_reflink(tmp_path, src_file):
+    dst = tmp_path / "dst.bin"
+
+    fileops.reflink(src_file, dst)
+    assert dst.read_bytes() == src_file.read_bytes()
+    assert not os.path.samefile(src_file, dst)
+
+
+def test_hardlink(tmp_path, src_file):
+    dst = tmp_path / "dst.bin"
+
+    fileops.hardlink(src_file, dst)
+    assert os.path.samefile(src_file, dst)
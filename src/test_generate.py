@@ -0,0 +1,60 @@
+"""
+"""
+import copy
+from collections import OrderedDict
+
+import pytest
+from cookiecutter.exceptions import UndefinedVariableInTemplate
+from cookiecutter.prompt import prompt_for_config
+
+from . import generate
+from .generate import prepare_template
+
+
+def _both(context):
+    expected = prompt_for_config(copy.deepcopy(context), no_input=True)
+    actual = generate._render_variables(copy.deepcopy(context))
+    return actual, expected
+
+
+def test_render_variables_template(extra_context):
+    context = prepare_template()
+    context["cookiecutter"].update(extra_context)
+
+    actual, expected = _both(context)
+
+    assert actual == expected
+    assert list(actual) == list(expected)
+
+
+def test_render_variables_types():
+    context = {
+        "cookiecutter": OrderedDict(
+            [
+                ("name", "Foo Bar"),
+                ("slug", "{{ cookiecutter.name | lower | replace(' ', '-') }}"),
+                ("number", 3),
+                ("flag", True),
+                ("nothing", None),
+                ("choice", ["{{ cookiecutter.slug }}", "other"]),
+                ("mapping", {"{{ cookiecutter.slug }}": ["{{ cookiecutter.number }}"]}),
+                ("__derived", "{{ cookiecutter.slug }}.py"),
+                ("_private", "{{ not rendered }}"),
+                ("_extensions", []),
+            ]
+        )
+    }
+
+    actual, expected = _both(context)
+
+    assert actual == expected
+    assert actual["choice"] == "foo-bar"
+    assert actual["mapping"] == {"foo-bar": ["3"]}
+    assert actual["_private"] == "{{ not rendered }}"
+
+
+def test_render_variables_undefined():
+    context = {"cookiecutter": {"name": "{{ cookiecutter.missing }}"}}
+
+    with pytest.raises(UndefinedVariableInTemplate):
+        generate._render_variables(context)
@@ -0,0 +1,99 @@
+"""
+"""
+import os
+import subprocess
+
+import pytest
+
+from . import gitdir
+from . import main
+
+
+def _git(repo, *args):
+    env = {
+        **os.environ,
+        "GIT_AUTHOR_NAME": "pytest",
+        "GIT_AUTHOR_EMAIL": "pytest@foo.bar",
+        "GIT_COMMITTER_NAME": "pytest",
+        "GIT_COMMITTER_EMAIL": "pytest@foo.bar",
+        "GIT_AUTHOR_DATE": "2021-09-05T11:43:40-0700",
+        "GIT_COMMITTER_DATE": "2021-09-05T11:43:40-0700",
+    }
+    proc = subprocess.run(
+        ["git", *args], cwd=repo, env=env, stdout=subprocess.PIPE, check=True
+    )
+    return proc.stdout.decode("utf-8").strip()
+
+
+@pytest.fixture
+def git_repo(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _git(repo, "init", "-q", "-b", "master")
+    (repo / "foo.txt").write_text("foo")
+    _git(repo, "add", "foo.txt")
+    _git(repo, "commit", "-q", "-m", "Initial commit")
+    yield repo
+
+
+def _expected(repo):
+    return _git(repo, "rev-parse", "HEAD"), _git(repo, "log", "-1", "--format=%ai")
+
+
+def test_head_commit_info_loose(git_repo):
+    got = gitdir.head_commit_info(git_repo)
+    assert got == _expected(git_repo)
+    assert got[1] == "2021-09-05 11:43:40 -0700"
+
+
+def test_head_commit_info_from_subdir(git_repo):
+    subdir = git_repo / "a" / "b"
+    subdir.mkdir(parents=True)
+    assert gitdir.head_commit_info(subdir) == _expected(git_repo)
+
+
+def test_head_commit_info_packed_refs(git_repo):
+    _git(git_repo, "pack-refs", "--all")
+    assert not (git_repo / ".git" / "refs" / "heads" / "master").exists()
+
+    assert gitdir.head_commit_info(git_repo) == _expected(git_repo)
+
+
+def test_head_commit_info_detached(git_repo):
+    _git(git_repo, "checkout", "-q", "--detach")
+    assert gitdir.head_commit_info(git_repo) == _expected(git_repo)
+
+
+def test_head_commit_info_packed_object_raises(git_repo):
+    _git(git_repo, "gc", "-q")
+    with pytest.raises(gitdir.GitReadError):
+        gitdir.head_commit_info(git_repo)
+
+
+def test_head_commit_info_worktree_raises(git_repo, tmp_path):
+    worktree = tmp_path / "worktree"
+    _git(git_repo, "worktree", "add", "-q", str(worktree))
+    with pytest.raises(gitdir.GitReadError):
+        gitdir.head_commit_info(worktree)
+
+
+def test_head_commit_info_no_repo_raises(tmp_path):
+    with pytest.raises(gitdir.GitReadError):
+        gitdir.head_commit_info(tmp_path)
+
+
+@pytest.mark.parametrize(
+    "timestamp, offset, want",
+    [
+        ("1630867420", "-0700", "2021-09-05 11:43:40 -0700"),
+        ("1630867420", "+0000", "2021-09-05 18:43:40 +0000"),
+        ("1630867420", "+0530", "2021-09-06 00:13:40 +0530"),
+    ],
+)
+def test_format_git_date(timestamp, offset, want):
+    assert gitdir._format_git_date(timestamp, offset) == want
+
+
+def test_local_commit_info_matches_git():
+    got = main._get_current_local_commit_info()
+    assert got == main._get_current_local_commit_info_from_git()
@@ -0,0 +1,176 @@
+"""
+"""
+import os
+import subprocess
+
+import pytest
+from cookiecutter.exceptions import FailedHookException
+from cookiecutter.main import cookiecutter
+
+from . import DATA_DIR
+from . import generate
+from . import hook_runner
+from . import TEMPLATE_DIR
+from .test_main import _assert_dirs_equal
+
+
+def _context(**kwargs):
+    cookiecutter_dict = {
+        "project_name": "Reference Project",
+        "package_name": "reference_proj",
+        "has_cli": "n",
+        "project_host": "GitHub",
+        "create_ci_file": "n",
+    }
+    cookiecutter_dict.update(kwargs)
+    return {"cookiecutter": cookiecutter_dict}
+
+
+def test_load_hook_is_cached():
+    assert hook_runner.load_hook("pre_gen_project") is hook_runner.load_hook(
+        "pre_gen_project"
+    )
+
+
+def test_run_pre_gen_project(capsys):
+    hook_runner.run_pre_gen_project(_context())
+
+    out = capsys.readouterr().out
+    assert "check_project_name" in out
+    assert "check_package_name" in out
+    assert "Failed" not in out
+
+
+def test_run_pre_gen_project_sets_up_colorama(monkeypatch, capsys):
+    calls = []
+    monkeypatch.setattr(
+        hook_runner.colorama, "just_fix_windows_console", lambda: calls.append(1)
+    )
+    hook_runner._init_colorama.cache_clear()
+
+    hook_runner.run_pre_gen_project(_context())
+    hook_runner.run_pre_gen_project(_context())
+
+    assert calls == [1]
+    hook_runner._init_colorama.cache_clear()
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"project_name": ""},
+        {"package_name": "1_starts_with_a_number"},
+        {"package_name": "has-a-dash"},
+    ],
+)
+def test_run_pre_gen_project_raises(capsys, kwargs):
+    with pytest.raises(FailedHookException):
+        hook_runner.run_pre_gen_project(_context(**kwargs))
+
+    assert "Failed" in capsys.readouterr().out
+
+
+def test_hook_scripts_work_with_stock_cookiecutter(
+    monkeypatch, tmp_path, extra_context
+):
+    # Keep cookiecutter's replay files out of the real home dir.
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    outdir = tmp_path / "out"
+
+    cookiecutter(
+        template=str(TEMPLATE_DIR),
+        extra_context=extra_context,
+        output_dir=str(outdir),
+        no_input=True,
+    )
+
+    _assert_dirs_equal(actual=outdir, expected=DATA_DIR)
+
+
+def _git(project_dir, *args):
+    return subprocess.run(
+        ["git", *args], cwd=project_dir, check=True, capture_output=True, text=True
+    ).stdout
+
+
+def test_init_git_repo_is_opt_in(tmp_path, capsys):
+    hook_runner.init_git_repo(_context(), tmp_path)
+
+    assert not (tmp_path / ".git").exists()
+    assert "Skipped" in capsys.readouterr().out
+
+
+def test_init_git_repo(tmp_path):
+    commits = []
+    for name in ["a", "b"]:
+        project_dir = tmp_path / name
+        (project_dir / "src").mkdir(parents=True)
+        (project_dir / "src" / "mod.py").write_text("x = 1\n")
+        (project_dir / "run.sh").write_text("#!/bin/sh\n")
+        os.chmod(project_dir / "run.sh", 0o755)
+        os.symlink("src/mod.py", project_dir / "link.py")
+        context = _context(
+            _git_init="y",
+            author="Jane Doe",
+            author_email="jane@example.com",
+            create_date="2020-07-10",
+        )
+
+        hook_runner.init_git_repo(context, project_dir)
+
+        assert _git(project_dir, "status", "--porcelain") == ""
+        assert _git(project_dir, "log", "--format=%an <%ae> %aI %cI") == (
+            "Jane Doe <jane@example.com> 2020-07-10T00:00:00+00:00"
+            " 2020-07-10T00:00:00+00:00\n"
+        )
+        # A clean status means that the contents match, but not the modes.
+        staged = _git(project_dir, "ls-files", "-s").splitlines()
+        assert [(line.split()[0], line.split()[-1]) for line in staged] == [
+            ("120000", "link.py"),
+            ("100755", "run.sh"),
+            ("100644", "src/mod.py"),
+        ]
+        commits.append(_git(project_dir, "rev-parse", "HEAD"))
+    # Same files, same context: same commit.
+    assert commits[0] == commits[1]
+
+
+@pytest.mark.parametrize(
+    "bad, message",
+    [
+        ({"author": "Jane <x@y.z>"}, "`author` can't contain"),
+        ({"author": "Jane\ncommit refs/heads/evil"}, "`author` can't contain"),
+        ({"author_email": "jane@example.com> 0 +0000\nfrom"}, "`author_email`"),
+        ({"create_date": "July 10th"}, "`create_date` must be YYYY-MM-DD"),
+    ],
+)
+def test_init_git_repo_bad_context(tmp_path, bad, message):
+    context = _context(
+        _git_init="y",
+        author="Jane Doe",
+        author_email="jane@example.com",
+        create_date="2020-07-10",
+    )
+    context["cookiecutter"].update(bad)
+
+    with pytest.raises(ValueError, match=message):
+        hook_runner.init_git_repo(context, tmp_path)
+    assert not (tmp_path / ".git").exists()
+
+
+def test_init_git_repo_matches_stock_cookiecutter(monkeypatch, tmp_path, extra_context):
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    extra_context["_git_init"] = "y"
+    cookiecutter(
+        template=str(TEMPLATE_DIR),
+        extra_context=extra_context,
+        output_dir=str(tmp_path / "stock"),
+        no_input=True,
+    )
+    context = generate.resolve_context(
+        generate.prepare_template(), extra_context, str(tmp_path / "ours")
+    )
+    project_dir = generate.generate_project(context, str(tmp_path / "ours"))
+
+    stock_head = _git(tmp_path / "stock" / "reference-proj", "rev-parse", "HEAD")
+    assert _git(project_dir, "rev-parse", "HEAD") == stock_head
@@ -1,138 +1,35 @@
 """
 """
-import difflib
-import os
 import re
-from pathlib import Path
+import threading
+import time
 
 import pytest
 import requests
 from click.testing import CliRunner
 
 from . import DATA_DIR
+from . import dircmp
 from . import main
-
-
-@pytest.fixture
-def extra_context():
-    slug = "reference-proj"
-    descr = "A reference project used for testing my CookieCutter template."
-
-    # Until cookiecutter #1433 gets addressed, we need to send in ALL
-    # values present in cookiecutter.json to --extra-context and also pass
-    # --no-input.
-    # https://github.com/cookiecutter/cookiecutter/issues/1433
-    # --no-input is automatically added by main.main if --extra-context is
-    # given.
-    extra_context = {
-        "author": "pytest",
-        "author_email": "pytest@foo.bar",
-        "create_date": "2020-07-10",
-        "license": "MIT",
-        "package_name": "reference_proj",
-        "project_name": "Reference Project",
-        "project_short_description": descr,
-        "project_slug": slug,
-        "project_url": "https://foo.bar",
-        "project_host": "GitHub",
-        "create_ci_file": "n",
-    }
-
-    yield extra_context
-
-
-def _all_files_relative(path):
-    """
-    Return a list of all files in the path, relative to the path.
-
-    To make things a little easier for development, vim swapfiles are ignored.
-    """
-    files = []
-    for root, _, filenames in os.walk(path):
-        for name in filenames:
-            r = Path(root, name).relative_to(path)
-            if r.suffix == ".swp":
-                continue
-            files.append(r)
-    return files
+from .mockapi import MockGitHubApi
 
 
 def _assert_dirs_equal(actual, expected):
     """
     Compare two directories, asserting that their contents match exactly.
 
-    The AssertionError that's raised attempts to contain all differences, not
-    just the first difference.
+    The AssertionError that's raised contains all differences, not just the
+    first difference. See :mod:`src.dircmp`.
 
     Parameters
     ----------
     actual, expected : :class:`pathlib.Path`
         The directories to compare. Everything is compared to ``expected``.
-
-    Returns
-    -------
-    None
-
-    Raises
-    ------
-    AssertionError
-
-    Notes
-    -----
-    This might also be possible to write using :class:`filecmp.dircmp`.
-    However, initial investigation showed that the ``dircmp`` class didn't
-    have a suitable high-level API for doing so (recursive checking of the
-    ``dircmp.subdirs`` attribute... bleh).
-
-    If future work wants to switch this to ``dircmp``, you'll likely need
-    to subclass ``dircmp`` and mokneypatch the ``phase3`` function because
-    ``dircmp`` only does shallow comparisons and we are interested in deep
-    comparisons. See
-    https://stackoverflow.com/q/4187564/1354930 and
-    https://stackoverflow.com/a/24860799/1354930
     """
-    # Get a list of all the files in each actual and expected directories
-    actual_files = _all_files_relative(actual)
-    expected_files = _all_files_relative(expected)
-
-    # Asserting that the *sets* are equal tells us about both missing and extra files.
-    assert set(actual_files) == set(expected_files)
-
-    # Diff the contents of each file that exists in both. We don't need to
-    # act on the intersection of the two sets because the assert will break
-    # us out of this function before we zip things.
-    diffs = []
-    for a, e in zip(actual_files, expected_files):
-        # Build the absolute paths
-        a_absolute = actual / a
-        e_absolute = expected / e
-
-        a_lines = a_absolute.read_text().split("\n")
-        e_lines = e_absolute.read_text().split("\n")
-
-        d = difflib.unified_diff(
-            a_lines, e_lines, fromfile=str(a_absolute), tofile=str(e_absolute), n=2
-        )
-        d = list(d)
-
-        # We don't assert here because we want to collect ALL differences
-        # before rasing an AssertionError.
-        if len(d) != 0:
-            # Originally I was adding to a dict with the key being the filename,
-            # but the unified diff contains the filename so we can just use a
-            # list which results in easier-to-read diffs in pytest.
-            diffs.append("\n".join(x.strip() for x in d))
-
-    if len(diffs) != 0:
-        # Merge all the diffs into an easy-to-read string.
-        # Future me might want to consider defining my own explaination/diff
-        # for failed assertions. See
-        # https://docs.pytest.org/en/stable/assert.html#defining-your-
-        #   own-explanation-for-failed-assertions
-        diff_string = "\n\n".join(diffs)
-        # This is guarenteed to be false and is only used to (a) ensure the
-        # test fails and (b) show the diff.
-        assert diff_string == ""
+    diff = dircmp.compare_trees(actual, expected)
+    # Guaranteed to be false when there's a difference. It's only used to
+    # (a) fail the test and (b) show the differences.
+    assert dircmp.format_diff(diff) == ""
 
 
 @pytest.mark.parametrize(
@@ -270,22 +167,8 @@ def test_main(tmp_path, extra_context):
 
 
 # Really this is testing the same stuff as `test_main`, but oh well.
-def test_main_no_ci(tmp_path, extra_context):
-    proj_path = tmp_path / extra_context["project_slug"]
-
-    extra_context["create_ci_file"] = "n"
-
-    args = [
-        "--no-version-check",
-        str(tmp_path),
-        "--extra-context",
-        f"""{extra_context}""",
-    ]
-
-    runner = CliRunner()
-    result = runner.invoke(main.main, args)
-
-    assert result.exit_code == 0
+def test_main_no_ci(matrix):
+    proj_path = matrix.project(create_ci_file="n")
 
     # No CI files should exist
     for fp in (".github", ".gitlab-ci.yml"):
@@ -293,23 +176,8 @@ def test_main_no_ci(tmp_path, extra_context):
         assert not ci_file.exists()
 
 
-def test_main_github_ci(tmp_path, extra_context):
-    proj_path = tmp_path / extra_context["project_slug"]
-
-    extra_context["project_host"] = "GitHub"
-    extra_context["create_ci_file"] = "y"
-
-    args = [
-        "--no-version-check",
-        str(tmp_path),
-        "--extra-context",
-        f"""{extra_context}""",
-    ]
-
-    runner = CliRunner()
-    result = runner.invoke(main.main, args)
-
-    assert result.exit_code == 0
+def test_main_github_ci(matrix):
+    proj_path = matrix.project(project_host="GitHub", create_ci_file="y")
 
     # The .github directory should exist
     fp = proj_path / ".github"
@@ -324,23 +192,8 @@ def test_main_github_ci(tmp_path, extra_context):
 # between github (directory) and gitlab (file), and the fact that we need to
 # assert the **other** doesn't exist, makes combining these two tests into
 # a single parametrized one a bit annoying.
-def test_main_gitlab_ci(tmp_path, extra_context):
-    proj_path = tmp_path / extra_context["project_slug"]
-
-    extra_context["project_host"] = "GitLab"
-    extra_context["create_ci_file"] = "y"
-
-    args = [
-        "--no-version-check",
-        str(tmp_path),
-        "--extra-context",
-        f"""{extra_context}""",
-    ]
-
-    runner = CliRunner()
-    result = runner.invoke(main.main, args)
-
-    assert result.exit_code == 0
+def test_main_gitlab_ci(matrix):
+    proj_path = matrix.project(project_host="GitLab", create_ci_file="y")
 
     # The .gitlab-ci.yml file should exist
     fp = proj_path / ".gitlab-ci.yml"
@@ -351,27 +204,158 @@ def test_main_gitlab_ci(tmp_path, extra_context):
     assert not (proj_path / ".github").exists()
 
 
-def test_main_has_cli(tmp_path, extra_context):
-    proj_path = tmp_path / extra_context["project_slug"]
+def test_main_has_cli(matrix, extra_context):
+    proj_path = matrix.project(has_cli="y")
+
+    # pyproject.toml should define an entry point that ends in ".cli:main"
+    assert ".cli:main" in open(proj_path / "pyproject.toml", "r").read()
+
+    # The "srs/<package_name>/cli.py" file should exist
+    fp = proj_path / "src" / extra_context["package_name"] / "cli.py"
+    assert fp.exists()
+    assert fp.is_file()
+
+
+def test_matrix_invariants(matrix, extra_context):
+    # Every combination, not just the ones with their own test above.
+    for combination in matrix.combinations():
+        proj_path = matrix.project(**combination)
+        ci_host = combination["project_host"]
+        if combination["create_ci_file"] == "n":
+            ci_host = None
 
-    extra_context["has_cli"] = "y"
+        assert (proj_path / ".github").exists() == (ci_host == "GitHub")
+        assert (proj_path / ".gitlab-ci.yml").exists() == (ci_host == "GitLab")
 
+        cli_file = proj_path / "src" / extra_context["package_name"] / "cli.py"
+        assert cli_file.exists() == (combination["has_cli"] == "y")
+        assert (proj_path / "pyproject.toml").exists()
+        assert not (proj_path / "pyproject.toml.j2").exists()
+
+
+def test_main_create_command(tmp_path, extra_context):
     args = [
+        "create",
         "--no-version-check",
         str(tmp_path),
         "--extra-context",
         f"""{extra_context}""",
     ]
 
-    runner = CliRunner()
-    result = runner.invoke(main.main, args)
+    result = CliRunner().invoke(main.main, args)
 
     assert result.exit_code == 0
+    _assert_dirs_equal(actual=tmp_path, expected=DATA_DIR)
 
-    # pyproject.toml should define an entry point that ends in ".cli:main"
-    assert ".cli:main" in open(proj_path / "pyproject.toml", "r").read()
 
-    # The "srs/<package_name>/cli.py" file should exist
-    fp = proj_path / "src" / extra_context["package_name"] / "cli.py"
-    assert fp.exists()
-    assert fp.is_file()
+def test_main_dry_run(tmp_path, extra_context):
+    args = [
+        "--no-version-check",
+        str(tmp_path / "out"),
+        "--extra-context",
+        f"""{extra_context}""",
+        "--dry-run",
+    ]
+
+    result = CliRunner().invoke(main.main, args)
+
+    assert result.exit_code == 0
+    assert not (tmp_path / "out").exists()
+    assert "would create" in result.output
+    assert "src/reference_proj/__init__.py" in result.output
+
+
+def test_main_dry_run_manifest(tmp_path):
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_text("")
+    args = ["--no-version-check", str(tmp_path), "--manifest", str(manifest)]
+
+    result = CliRunner().invoke(main.main, [*args, "--dry-run"])
+
+    assert result.exit_code == 2
+    assert "--dry-run can't be used with --manifest" in result.output
+
+
+def test_verify(matrix):
+    project_dir = matrix.project()
+
+    result = CliRunner().invoke(main.main, ["verify", str(project_dir)])
+
+    assert result.exit_code == 0
+    assert result.output.startswith("OK: 13 files match")
+
+
+def test_verify_differences(matrix):
+    # Matches the reference project except for the CLI file.
+    project_dir = matrix.project(has_cli="y")
+
+    result = CliRunner().invoke(main.main, ["verify", "--no-diff", str(project_dir)])
+
+    assert result.exit_code == 1
+    assert "Extra: src/reference_proj/cli.py" in result.output
+    assert "Differs: pyproject.toml" in result.output
+    assert "2 differences" in result.output
+
+
+def test_background_version_check_reports(monkeypatch, capsys):
+    monkeypatch.setattr(main, "_get_version_warning", lambda *a: ["new version!"])
+
+    checker = main._BackgroundVersionCheck(cache_ttl=0, timeout=5)
+    checker.report()
+
+    captured = capsys.readouterr()
+    assert "new version!" in captured.out
+    assert "git pull" in captured.out
+
+
+def test_background_version_check_deadline(monkeypatch, capsys):
+    release = threading.Event()
+
+    def hung_check(*args):
+        release.wait(5)
+        return ["new version!"]
+
+    monkeypatch.setattr(main, "_get_version_warning", hung_check)
+
+    start = time.monotonic()
+    checker = main._BackgroundVersionCheck(cache_ttl=0, timeout=0.1)
+    checker.report()
+    elapsed = time.monotonic() - start
+    release.set()
+
+    assert elapsed < 1
+    assert capsys.readouterr().out == ""
+
+
+def test_background_version_check_swallows_errors(monkeypatch, capsys):
+    def broken_check(*args):
+        raise requests.ConnectionError("offline")
+
+    monkeypatch.setattr(main, "_get_version_warning", broken_check)
+
+    checker = main._BackgroundVersionCheck(cache_ttl=0, timeout=5)
+    checker.report()
+
+    assert capsys.readouterr().out == ""
+
+
+def test_get_version_warning_against_mock(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    with MockGitHubApi(sha="f" * 40) as api:
+        monkeypatch.setattr(main, "REMOTE_API_URL", api.url)
+        got = main._get_version_warning(cache_ttl=0, timeout=1)
+
+    assert got[0] == "A new version of this template is available."
+    assert "5 commits ahead" in got[2]
+
+
+def test_main_version_check_reported_at_end(monkeypatch, tmp_path, extra_context):
+    monkeypatch.setattr(main, "_get_version_warning", lambda *a: ["new version!"])
+
+    args = [str(tmp_path), "--extra-context", f"""{extra_context}"""]
+
+    runner = CliRunner()
+    result = runner.invoke(main.main, args)
+
+    assert result.exit_code == 0
+    assert "new version!" in result.output
@@ -0,0 +1,60 @@
+"""
+"""
+import json
+
+import pytest
+
+from . import matrix as matrix_mod
+
+
+def test_option_space():
+    space = matrix_mod.option_space()
+    assert space == {
+        "project_host": ["GitLab", "GitHub", "Other", "None"],
+        "create_ci_file": ["y", "n"],
+        "has_cli": ["y", "n"],
+    }
+
+
+def test_option_space_new_option(tmp_path):
+    variables = {"name": "", "license": ["MIT", "GPL"], "docs": "y"}
+    (tmp_path / "cookiecutter.json").write_text(json.dumps(variables))
+
+    space = matrix_mod.option_space(tmp_path)
+    assert space == {"license": ["MIT", "GPL"], "docs": ["y", "n"]}
+    assert len(matrix_mod.combinations(space)) == 4
+
+
+def test_combinations():
+    combos = matrix_mod.combinations({"b": ["1", "2"], "a": ["x"]})
+    assert combos == [{"a": "x", "b": "1"}, {"a": "x", "b": "2"}]
+    ids = {matrix_mod.combination_id(c) for c in combos}
+    assert ids == {"a-x__b-1", "a-x__b-2"}
+
+
+def test_render_matrix(matrix):
+    assert len(matrix.results) == len(matrix.combinations()) == 16
+    # Defaults come from the extra context, then cookiecutter.json.
+    assert matrix.defaults == {
+        "project_host": "GitHub",
+        "create_ci_file": "n",
+        "has_cli": "n",
+    }
+    assert matrix.project().name == "reference-proj"
+
+
+def test_render_matrix_unknown_option(matrix):
+    with pytest.raises(KeyError):
+        matrix.project(foo="bar")
+    with pytest.raises(KeyError):
+        matrix.project(has_cli="maybe")
+
+
+def test_render_matrix_failure(tmp_path, extra_context):
+    # An invalid package name fails the pre-gen hook.
+    extra_context["package_name"] = "not-valid"
+    result = matrix_mod.render_matrix(
+        extra_context, tmp_path, space={"has_cli": ["y"]}, workers=1
+    )
+    with pytest.raises(RuntimeError, match="failed to render"):
+        result.project()
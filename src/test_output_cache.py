@@ -0,0 +1,131 @@
+"""
+"""
+import shutil
+
+import pytest
+from click.testing import CliRunner
+from cookiecutter.exceptions import OutputDirExistsException
+
+from . import DATA_DIR
+from . import main
+from . import output_cache
+from . import render
+from . import TEMPLATE_DIR
+from .generate import generate_project
+from .generate import prepare_template
+from .generate import resolve_context
+from .test_main import _assert_dirs_equal
+
+
+@pytest.fixture
+def cache(tmp_path):
+    yield output_cache.OutputCache(tmp_path / "cache")
+
+
+def _context(extra_context, output_dir):
+    return resolve_context(prepare_template(), extra_context, str(output_dir))
+
+
+def test_hash_template_changes_with_template(tmp_path):
+    for name in output_cache.TEMPLATE_PATHS:
+        src = TEMPLATE_DIR / name
+        if src.is_dir():
+            shutil.copytree(src, tmp_path / name)
+        else:
+            shutil.copy(src, tmp_path / name)
+
+    before = output_cache.hash_template(tmp_path)
+    assert before == output_cache.hash_template(tmp_path)
+
+    (tmp_path / "hooks" / "pre_gen_project.py").write_text("# changed\n")
+    assert output_cache.hash_template(tmp_path) != before
+
+
+def test_key(tmp_path, cache, extra_context):
+    a = _context(extra_context, tmp_path / "a")
+    b = _context(extra_context, tmp_path / "b")
+    assert cache.key(a) == cache.key(b)
+
+    extra_context["has_cli"] = "y"
+    c = _context(extra_context, tmp_path / "a")
+    assert cache.key(a) != cache.key(c)
+
+
+def test_generate_project_cache_hit(monkeypatch, tmp_path, cache, extra_context):
+    first = tmp_path / "first"
+    generate_project(_context(extra_context, first), str(first), cache)
+
+    def no_render(*args):
+        raise AssertionError("should have been a cache hit")
+
+    monkeypatch.setattr(render, "render_project", no_render)
+
+    second = tmp_path / "second"
+    generate_project(_context(extra_context, second), str(second), cache)
+
+    _assert_dirs_equal(actual=second, expected=DATA_DIR)
+
+
+def test_materialize_miss(tmp_path, cache):
+    assert cache.materialize("nope", str(tmp_path)) is None
+
+
+def test_materialize_exists(tmp_path, cache, extra_context):
+    context = _context(extra_context, tmp_path)
+    generate_project(context, str(tmp_path), cache)
+
+    with pytest.raises(OutputDirExistsException):
+        cache.materialize(cache.key(context), str(tmp_path))
+
+
+def test_hardlink(tmp_path, extra_context):
+    cache = output_cache.OutputCache(tmp_path / "cache", link="hardlink")
+    context = _context(extra_context, tmp_path / "out")
+    project_dir = generate_project(context, str(tmp_path / "out"), cache)
+
+    cached = tmp_path / "cache" / cache.key(context) / "tree" / "setup.py"
+    assert cached.stat().st_ino == (project_dir / "setup.py").stat().st_ino
+
+
+def test_invalid_link_mode(tmp_path):
+    with pytest.raises(ValueError):
+        output_cache.OutputCache(tmp_path, link="symlink")
+
+
+def test_evict_lru(tmp_path, cache, extra_context):
+    contexts = []
+    for i, host in enumerate(["GitHub", "GitLab", "Other"]):
+        extra_context["project_host"] = host
+        context = _context(extra_context, tmp_path / str(i))
+        generate_project(context, str(tmp_path / str(i)), cache)
+        contexts.append(context)
+
+    # Use the first entry so that the second is the least recently used.
+    cache.materialize(cache.key(contexts[0]), str(tmp_path / "again"))
+
+    # Only enough room for all but the least recently used entry.
+    sizes = {entry.name: size for _, size, entry in cache._entries()}
+    cache.max_size = cache.size() - sizes[cache.key(contexts[1])]
+    cache.evict()
+
+    remaining = {p.name for p in cache.path.iterdir()}
+    assert remaining == {cache.key(contexts[0]), cache.key(contexts[2])}
+
+
+def test_main_cache(monkeypatch, tmp_path, extra_context):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+    runner = CliRunner()
+    for outdir in ("first", "second"):
+        args = [
+            "--no-version-check",
+            "--cache",
+            str(tmp_path / outdir),
+            "--extra-context",
+            f"""{extra_context}""",
+        ]
+        result = runner.invoke(main.main, args)
+        assert result.exit_code == 0
+
+    _assert_dirs_equal(actual=tmp_path / "second", expected=DATA_DIR)
+    assert len(list((tmp_path / "cache").glob("*/outputs/*/meta.json"))) == 1
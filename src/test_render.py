@@ -0,0 +1,300 @@
+"""
+"""
+import itertools
+import os
+import stat
+import tracemalloc
+
+import pytest
+from cookiecutter.exceptions import FailedHookException
+from cookiecutter.exceptions import OutputDirExistsException
+from cookiecutter.exceptions import UndefinedVariableInTemplate
+from cookiecutter.main import cookiecutter
+
+from . import DATA_DIR
+from . import render
+from . import TEMPLATE_DIR
+from .generate import generate_in_memory
+from .generate import prepare_template
+from .generate import resolve_context
+from .test_main import _assert_dirs_equal
+
+PROJECT_TEMPLATE_DIR = TEMPLATE_DIR / "{{cookiecutter.project_slug}}"
+
+
+def _context(extra_context, output_dir):
+    return resolve_context(prepare_template(), extra_context, str(output_dir))
+
+
+def _plan_dests(context):
+    plan = render.build_plan(context, PROJECT_TEMPLATE_DIR)
+    return {entry.dest for entry in plan}
+
+
+def test_build_plan_excludes(tmp_path, extra_context):
+    dests = _plan_dests(_context(extra_context, tmp_path))
+
+    assert "pyproject.toml" in dests
+    assert "pyproject.toml.j2" not in dests
+    assert "src/reference_proj/__init__.py" in dests
+    assert "src/reference_proj/cli.py" not in dests
+    assert not any(d.startswith(".github") for d in dests)
+    assert ".gitlab-ci.yml" not in dests
+
+
+def test_build_plan_includes(tmp_path, extra_context):
+    extra_context.update(create_ci_file="y", project_host="GitHub", has_cli="y")
+    dests = _plan_dests(_context(extra_context, tmp_path))
+
+    assert "src/reference_proj/cli.py" in dests
+    assert ".github/workflows/ci.yml" in dests
+    assert ".gitlab-ci.yml" not in dests
+
+
+def test_build_plan_dirs_before_files(tmp_path, extra_context):
+    plan = render.build_plan(_context(extra_context, tmp_path), PROJECT_TEMPLATE_DIR)
+    seen_dirs = {""}
+    for entry in plan:
+        parent = entry.dest.rpartition("/")[0]
+        assert parent in seen_dirs
+        if entry.is_dir:
+            seen_dirs.add(entry.dest)
+
+
+def test_excluded_files_are_never_rendered(monkeypatch, tmp_path, extra_context):
+    rendered = []
+    original = render._render_chunks
+
+    def spy(env, entry, *args):
+        rendered.append(entry.src)
+        return original(env, entry, *args)
+
+    def copy_spy(self, dest, src):
+        rendered.append(str(src.relative_to(PROJECT_TEMPLATE_DIR)))
+        return original_copy(self, dest, src)
+
+    original_copy = render.DirectorySink.add_copy
+    monkeypatch.setattr(render, "_render_chunks", spy)
+    monkeypatch.setattr(render.DirectorySink, "add_copy", copy_spy)
+    render.render_project(_context(extra_context, tmp_path), str(tmp_path))
+
+    assert "README.md" in rendered
+    assert "src/{{cookiecutter.package_name}}/cli.py" not in rendered
+    assert ".gitlab-ci.yml" not in rendered
+    assert not any(src.startswith(".github") for src in rendered)
+
+
+@pytest.mark.parametrize(
+    "content, expected",
+    [
+        (b"plain text\n", True),
+        (b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR", True),
+        (b"name = {{ cookiecutter.project_name }}\n", False),
+        (b"{% if x %}x{% endif %}\n", False),
+        (b"{# comment #}\n", False),
+        (b"windows\r\nnewlines\r\n", False),
+    ],
+)
+def test_is_static(tmp_path, content, expected):
+    path = tmp_path / "file"
+    path.write_bytes(content)
+    assert render.is_static(path) is expected
+
+
+def test_is_static_notices_edits(tmp_path):
+    path = tmp_path / "file"
+    path.write_bytes(b"plain text\n")
+    assert render.is_static(path)
+
+    path.write_bytes(b"{{ cookiecutter.project_name }}\n")
+    assert not render.is_static(path)
+
+
+def test_render_stats(tmp_path, extra_context):
+    context = _context(extra_context, tmp_path)
+    plan = render.build_plan(context, PROJECT_TEMPLATE_DIR)
+    files = [entry for entry in plan if not entry.is_dir]
+    static = [entry for entry in files if entry.static]
+    assert 0 < len(static) < len(files)
+
+    stats = render.RenderStats()
+    project_dir = render.render_project(context, str(tmp_path), stats)
+
+    assert stats.files_copied == len(static)
+    assert stats.files_rendered == len(files) - len(static)
+    assert stats.bytes_copied == sum(
+        (PROJECT_TEMPLATE_DIR / entry.src).stat().st_size for entry in static
+    )
+    assert stats.bytes_rendered + stats.bytes_copied == sum(
+        (project_dir / entry.dest).stat().st_size for entry in files
+    )
+
+
+def test_render_link_static(tmp_path, extra_context):
+    context = _context(extra_context, tmp_path)
+    project_dir = render.render_project(context, str(tmp_path), link_static=True)
+
+    for entry in render.build_plan(context, PROJECT_TEMPLATE_DIR):
+        if entry.is_dir:
+            continue
+        linked = os.path.samefile(
+            PROJECT_TEMPLATE_DIR / entry.src, project_dir / entry.dest
+        )
+        assert linked == entry.static
+
+
+def test_render_threads(tmp_path, extra_context):
+    context = _context(extra_context, tmp_path)
+    expected = render.RenderStats()
+    render.render_to_memory(context, expected)
+
+    stats = render.RenderStats()
+    render.render_project(context, str(tmp_path), stats, threads=4)
+
+    _assert_dirs_equal(actual=tmp_path, expected=DATA_DIR)
+    assert stats == expected
+
+
+def test_render_threads_error_is_deterministic(tmp_path):
+    template_dir = tmp_path / "template"
+    (template_dir / "sub").mkdir(parents=True)
+    # The first failure in plan order takes the longest to fail.
+    (template_dir / "a.txt").write_text(
+        "{% for i in range(20000) %}{{ i }}{% endfor %}{{ cookiecutter.nope }}"
+    )
+    (template_dir / "b.txt").write_text("{{ cookiecutter.nope }}")
+    (template_dir / "sub" / "c.txt").write_text("{{ cookiecutter.name }}")
+    context = {"cookiecutter": {"name": "x"}}
+    env = render.make_environment(context, template_dir)
+
+    for i in range(5):
+        project_dir = tmp_path / f"out{i}"
+        project_dir.mkdir()
+        sink = render.DirectorySink(project_dir)
+        with pytest.raises(UndefinedVariableInTemplate, match="'a.txt'"):
+            render.render_into(sink, context, template_dir, env, threads=4)
+        # Everything else was still written before the error was raised.
+        assert (project_dir / "sub" / "c.txt").read_text() == "x"
+
+
+def test_render_to_memory(tmp_path, extra_context):
+    context = _context(extra_context, tmp_path)
+    stats = render.RenderStats()
+    tree = render.render_to_memory(context, stats)
+
+    assert tree.name == "reference-proj"
+    assert list(tmp_path.iterdir()) == []
+    assert stats.bytes_rendered + stats.bytes_copied == tree.size()
+
+    expected_dir = DATA_DIR / "reference-proj"
+    expected_files = {
+        p.relative_to(expected_dir).as_posix(): p
+        for p in expected_dir.rglob("*")
+        if p.is_file()
+    }
+    assert tree.files.keys() == expected_files.keys()
+    for path, file in tree.files.items():
+        assert file.data == expected_files[path].read_bytes(), path
+
+    # Same bytes and modes as rendering to disk.
+    project_dir = render.render_project(context, str(tmp_path))
+    for path, file in tree.files.items():
+        assert file.mode == stat.S_IMODE((project_dir / path).stat().st_mode)
+    assert set(tree.dirs) == {
+        p.relative_to(project_dir).as_posix()
+        for p in project_dir.rglob("*")
+        if p.is_dir()
+    }
+
+
+def test_streamed_files_are_identical(monkeypatch, tmp_path, extra_context):
+    context = _context(extra_context, tmp_path)
+    expected = render.render_to_memory(context)
+
+    # Stream every rendered file.
+    monkeypatch.setattr(render, "STREAM_THRESHOLD", 1)
+    stats = render.RenderStats()
+    render.render_project(context, str(tmp_path), stats)
+    _assert_dirs_equal(actual=tmp_path, expected=DATA_DIR)
+    assert render.render_to_memory(context).files == expected.files
+    assert stats.bytes_rendered + stats.bytes_copied == expected.size()
+
+
+def test_streaming_bounds_memory(monkeypatch, tmp_path):
+    threshold = 64 * 1024
+    monkeypatch.setattr(render, "STREAM_THRESHOLD", threshold)
+    template_dir = tmp_path / "template"
+    template_dir.mkdir()
+    (template_dir / "big.txt").write_text(
+        "{% for i in range(50000) %}line {{ i }} of {{ cookiecutter.name }}\n"
+        "{% endfor %}"
+    )
+    context = {"cookiecutter": {"name": "a big file"}}
+    env = render.make_environment(context, template_dir)
+    project_dir = tmp_path / "out"
+    project_dir.mkdir()
+
+    tracemalloc.start()
+    try:
+        render.render_into(
+            render.DirectorySink(project_dir), context, template_dir, env
+        )
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    size = (project_dir / "big.txt").stat().st_size
+    assert size > 16 * threshold
+    # Rendering the file as one string would take at least twice its size.
+    assert peak < 8 * threshold
+    assert (project_dir / "big.txt").read_text().splitlines()[-1] == (
+        "line 49999 of a big file"
+    )
+
+
+def test_generate_in_memory_runs_pre_gen_hook(tmp_path, extra_context):
+    extra_context["package_name"] = "not-valid"
+    with pytest.raises(FailedHookException):
+        generate_in_memory(_context(extra_context, tmp_path))
+
+
+def test_render_project_exists(tmp_path, extra_context):
+    (tmp_path / extra_context["project_slug"]).mkdir()
+    with pytest.raises(OutputDirExistsException):
+        render.render_project(_context(extra_context, tmp_path), str(tmp_path))
+
+
+_MATRIX = list(
+    itertools.product(["GitLab", "GitHub", "Other", "None"], ["y", "n"], ["y", "n"])
+)
+
+
+@pytest.mark.parametrize("host, ci, cli", _MATRIX)
+def test_render_plan_matches_post_gen_hook(
+    monkeypatch, tmp_path, matrix, extra_context, host, ci, cli
+):
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    extra_context.update(project_host=host, create_ci_file=ci, has_cli=cli)
+
+    stock = tmp_path / "stock"
+    cookiecutter(
+        template=str(TEMPLATE_DIR),
+        extra_context=extra_context,
+        output_dir=str(stock),
+        no_input=True,
+    )
+
+    ours = matrix.project(project_host=host, create_ci_file=ci, has_cli=cli)
+
+    _assert_dirs_equal(actual=ours, expected=stock / ours.name)
+    ci_files = {
+        name
+        for name in (".github", ".gitlab-ci.yml")
+        if (stock / ours.name / name).exists()
+    }
+    if ci == "y" and host == "GitHub":
+        assert ci_files == {".github"}
+    elif ci == "y" and host == "GitLab":
+        assert ci_files == {".gitlab-ci.yml"}
+    else:
+        assert ci_files == set()
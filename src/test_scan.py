@@ -0,0 +1,166 @@
+"""
+"""
+import json
+import subprocess
+
+import pytest
+from click.testing import CliRunner
+
+from . import main
+from . import scan
+from .update import MANIFEST_NAME
+
+SLUG_DIR = "{{cookiecutter.project_slug}}"
+
+
+def _commit(repo, files):
+    for rel, content in files.items():
+        path = repo / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    git = ["git", "-c", "user.name=t", "-c", "user.email=t@t", "-C", str(repo)]
+    subprocess.run([*git, "add", "-A"], check=True, capture_output=True)
+    subprocess.run([*git, "commit", "-m", "x"], check=True, capture_output=True)
+    return subprocess.run(
+        [*git, "rev-parse", "HEAD"], check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+@pytest.fixture
+def template(tmp_path):
+    """A template repo with four commits. Returns (path, commits, newest first)."""
+    repo = tmp_path / "template"
+    repo.mkdir()
+    subprocess.run(["git", "init", "-q", str(repo)], check=True)
+    commits = [
+        _commit(
+            repo,
+            {
+                f"{SLUG_DIR}/static.txt": "v1\n",
+                f"{SLUG_DIR}/.yamllint": "rules: {}\n",
+                f"{SLUG_DIR}/README.md": "# {{ cookiecutter.project_name }}\n",
+            },
+        ),
+        # Doesn't touch the project.
+        _commit(repo, {"cookiecutter.json": "{}\n"}),
+        _commit(repo, {f"{SLUG_DIR}/static.txt": "v2\n"}),
+        _commit(repo, {f"{SLUG_DIR}/pyproject.toml.j2": "[build-system]\n"}),
+    ]
+    return repo, commits[::-1]
+
+
+@pytest.fixture
+def history(template, tmp_path):
+    return scan.load_history(template[0], cache_dir=tmp_path / "cache")
+
+
+def _project(root, files):
+    root.mkdir(parents=True)
+    for rel, content in files.items():
+        (root / rel).write_text(content)
+    return root
+
+
+def test_git_blob_hash(tmp_path):
+    fp = tmp_path / "f"
+    fp.write_bytes(b"hello\n")
+    proc = subprocess.run(
+        ["git", "hash-object", str(fp)], check=True, capture_output=True, text=True
+    )
+    assert scan.git_blob_hash(b"hello\n") == proc.stdout.strip()
+
+
+def test_history(history, template):
+    _, commits = template
+
+    assert history.commits == commits
+    # Only commits that change the project's static files start a segment.
+    assert [(newest, oldest) for _, newest, oldest in history.segments] == [
+        (0, 0),
+        (1, 1),
+        (2, 3),
+    ]
+    # Templated files are included, but they won't match a rendered file.
+    newest_files = history.segments[0][0]
+    assert sorted(newest_files) == [
+        ".yamllint",
+        "README.md",
+        "pyproject.toml",
+        "static.txt",
+    ]
+    assert history.behind(commits[2]) == 2
+    assert history.behind("f" * 40) is None
+
+
+def test_history_is_cached(template, tmp_path, monkeypatch):
+    repo, _ = template
+    first = scan.load_history(repo, cache_dir=tmp_path / "cache")
+
+    def fail(*args):
+        raise AssertionError("git was run")
+
+    monkeypatch.setattr(scan, "_git", fail)
+    assert scan.load_history(repo, cache_dir=tmp_path / "cache") == first
+
+
+def test_scan(tmp_path, template, history):
+    _, commits = template
+    fleet = tmp_path / "fleet"
+    _project(
+        fleet / "team-a" / "old",
+        {"static.txt": "v1\n", ".yamllint": "rules: {}\n", "pyproject.toml": ""},
+    )
+    new = _project(
+        fleet / "team-a" / "new",
+        {
+            "static.txt": "v2\n",
+            ".yamllint": "rules: {}\n",
+            "pyproject.toml": "[build-system]\n",
+        },
+    )
+    # Projects inside projects aren't searched for.
+    _project(new / "nested", {"pyproject.toml": ""})
+    manifest = {"version": 1, "template_commit": commits[1], "files": {}}
+    _project(fleet / "recorded", {MANIFEST_NAME: json.dumps(manifest)})
+    _project(fleet / "unrelated", {"pyproject.toml": "[tool.other]\n"})
+    _project(fleet / ".venv" / "lib", {"pyproject.toml": ""})
+
+    results = scan.scan(fleet, history, workers=4)
+
+    got = [
+        (r.path.relative_to(fleet).as_posix(), r.commit, r.behind, r.source)
+        for r in results
+    ]
+    assert got == [
+        # Any of the commits 2 and 3 match, so it's at least 2 behind.
+        ("recorded", commits[1], 1, "manifest"),
+        ("team-a/new", commits[0], 0, "fingerprint"),
+        ("team-a/old", commits[2], 2, "fingerprint"),
+        ("unrelated", None, None, None),
+    ]
+    assert results[0].exact and not results[1].exact
+
+
+def test_cli(tmp_path, extra_context, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    runner = CliRunner()
+    outdir = tmp_path / "out"
+    args = ["--no-version-check", "--extra-context", str(extra_context)]
+    result = runner.invoke(main.main, [str(outdir), *args, "--record"])
+    assert result.exit_code == 0, result.output
+    (outdir / "other").mkdir()
+    (outdir / "other" / "pyproject.toml").write_text("[tool.other]\n")
+
+    result = runner.invoke(main.main, ["scan", str(outdir)])
+
+    assert result.exit_code == 0, result.output
+    lines = result.output.splitlines()
+    assert lines[0].split()[0] == "other"
+    assert lines[0].split()[-1] == "unknown"
+    assert lines[1].split()[0] == "reference-proj"
+    assert lines[1].split()[-2:] == ["0", "manifest"]
+    assert lines[2] == "Scanned 2 projects: 1 up to date, 0 behind, 1 unknown."
+
+    result = runner.invoke(main.main, ["scan", str(outdir), "--json"])
+    data = json.loads(result.output)
+    assert [(d["behind"], d["exact"]) for d in data] == [(None, False), (0, True)]
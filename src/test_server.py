@@ -0,0 +1,228 @@
+"""
+"""
+import http.client
+import io
+import json
+import socket
+import tarfile
+import time
+import urllib.error
+import urllib.request
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from . import DATA_DIR
+from . import server
+from .server import ScaffoldServer
+
+REFERENCE_DIR = DATA_DIR / "reference-proj"
+
+
+def _reference_files():
+    return {
+        "reference-proj/" + p.relative_to(REFERENCE_DIR).as_posix(): p.read_bytes()
+        for p in REFERENCE_DIR.rglob("*")
+        if p.is_file()
+    }
+
+
+def _post(url, data):
+    body = data if isinstance(data, bytes) else json.dumps(data).encode("utf-8")
+    request = urllib.request.Request(f"{url}/generate", data=body, method="POST")
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as err:
+        return err.code, err.headers, err.read()
+
+
+@pytest.fixture
+def scaffold(tmp_path):
+    with ScaffoldServer(port=0, workers=4, reload_interval=0, root=tmp_path) as s:
+        yield s
+
+
+def test_archive(scaffold, extra_context):
+    status, headers, body = _post(
+        scaffold.url, {"context": extra_context, "archive": "tar.gz"}
+    )
+
+    assert status == 200
+    assert headers["Content-Type"] == "application/gzip"
+    assert 'filename="reference-proj.tar.gz"' in headers["Content-Disposition"]
+    with tarfile.open(fileobj=io.BytesIO(body), mode="r:gz") as tar:
+        files = {m.name: tar.extractfile(m).read() for m in tar if m.isfile()}
+    assert files == _reference_files()
+
+
+def test_output_dir(scaffold, extra_context, tmp_path):
+    status, _, body = _post(
+        scaffold.url, {"context": extra_context, "output_dir": str(tmp_path)}
+    )
+
+    assert status == 201
+    project_dir = json.loads(body)["project_dir"]
+    assert project_dir == str(tmp_path / "reference-proj")
+    assert (tmp_path / "reference-proj" / "pyproject.toml").is_file()
+
+    # The project exists now.
+    status, _, body = _post(
+        scaffold.url, {"context": extra_context, "output_dir": str(tmp_path)}
+    )
+    assert status == 409
+    assert "already exists" in json.loads(body)["error"]
+
+
+@pytest.mark.parametrize("fmt", [None, "tar.gz"])
+@pytest.mark.parametrize("slug", ["../escaped", "..", "a/../../escaped"])
+def test_project_slug_outside_root(scaffold, extra_context, tmp_path, slug, fmt):
+    request = {"context": dict(extra_context, project_slug=slug)}
+    if fmt is None:
+        request["output_dir"] = "."
+    else:
+        request["archive"] = fmt
+
+    status, _, body = _post(scaffold.url, request)
+
+    assert status == 400
+    assert "is not a directory name" in json.loads(body)["error"]
+    assert not (tmp_path.parent / "escaped").exists()
+    assert list(tmp_path.iterdir()) == []
+    assert scaffold.health()["generated"] == 0
+
+
+def test_output_dir_is_relative_to_root(scaffold, extra_context, tmp_path):
+    status, _, body = _post(scaffold.url, {"context": extra_context, "output_dir": "a"})
+
+    assert status == 201
+    assert json.loads(body)["project_dir"] == str(tmp_path / "a" / "reference-proj")
+
+
+@pytest.mark.parametrize("output_dir", ["..", "/tmp", "a/../../b", "link", ""])
+def test_output_dir_outside_root(scaffold, extra_context, tmp_path, output_dir):
+    (tmp_path / "link").symlink_to(tmp_path.parent)
+    request = {"context": extra_context, "output_dir": output_dir}
+
+    status, _, body = _post(scaffold.url, request)
+
+    assert status == 400
+    assert "`output_dir` must be" in json.loads(body)["error"]
+    assert scaffold.health()["generated"] == 0
+
+
+@pytest.mark.parametrize(
+    "data, message",
+    [
+        (b"{not json", "Invalid JSON"),
+        ([], "must be a JSON object"),
+        ({"context": [], "archive": "zip"}, "`context` must be"),
+        ({"context": {}}, "exactly one of"),
+        ({"archive": "zip", "output_dir": "/tmp"}, "exactly one of"),
+        ({"archive": "rar"}, "`archive` must be one of"),
+        ({"context": {"project_name": ""}, "archive": "zip"}, "not a directory name"),
+        (
+            {
+                "context": {"project_name": "Foo", "package_name": "1x"},
+                "archive": "zip",
+            },
+            "FailedHookException",
+        ),
+    ],
+)
+def test_bad_request(scaffold, data, message):
+    status, headers, body = _post(scaffold.url, data)
+
+    assert status == 400
+    assert headers["Content-Type"] == "application/json"
+    assert message in json.loads(body)["error"]
+
+
+def test_health(scaffold, extra_context):
+    with urllib.request.urlopen(f"{scaffold.url}/health") as response:
+        assert json.load(response) == {
+            "status": "ok",
+            "template_version": 1,
+            "generated": 0,
+        }
+
+    _post(scaffold.url, {"context": extra_context, "archive": "zip"})
+    assert scaffold.health()["generated"] == 1
+
+
+def test_unknown_path(scaffold):
+    with pytest.raises(urllib.error.HTTPError) as excinfo:
+        urllib.request.urlopen(f"{scaffold.url}/nope")
+    assert excinfo.value.code == 404
+
+
+def test_concurrent_requests(scaffold, extra_context):
+    def request(i):
+        context = dict(extra_context, project_slug=f"proj-{i}")
+        return _post(scaffold.url, {"context": context, "archive": "zip"})
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        responses = list(pool.map(request, range(16)))
+
+    for i, (status, _, body) in enumerate(responses):
+        assert status == 200
+        with zipfile.ZipFile(io.BytesIO(body)) as zf:
+            assert f"proj-{i}/pyproject.toml" in zf.namelist()
+    assert scaffold.health()["generated"] == 16
+
+
+def test_reload(monkeypatch):
+    signature = ["a"]
+    monkeypatch.setattr(server, "template_signature", lambda _: tuple(signature))
+
+    with ScaffoldServer(port=0, reload_interval=0.01) as scaffold:
+        assert scaffold.health()["template_version"] == 1
+        base_context = scaffold._template.base_context
+
+        signature.append("b")
+        deadline = time.monotonic() + 5
+        while scaffold.health()["template_version"] == 1:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+        assert scaffold._template.base_context is not base_context
+        assert scaffold._template.base_context == base_context
+
+
+def test_template_signature_changes(tmp_path):
+    (tmp_path / "cookiecutter.json").write_text("{}")
+    (tmp_path / "hooks").mkdir()
+    before = server.template_signature(tmp_path)
+
+    (tmp_path / "hooks" / "pre_gen_project.py").write_text("")
+    assert server.template_signature(tmp_path) != before
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path):
+        super().__init__("localhost")
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+
+def test_unix_socket(tmp_path, extra_context):
+    socket_path = tmp_path / "scaffold.sock"
+    with ScaffoldServer(socket_path=socket_path, reload_interval=0):
+        conn = _UnixConnection(str(socket_path))
+        conn.request(
+            "POST",
+            "/generate",
+            json.dumps({"context": extra_context, "archive": "tar.gz"}),
+        )
+        response = conn.getresponse()
+        assert response.status == 200
+        with tarfile.open(fileobj=io.BytesIO(response.read()), mode="r:gz") as tar:
+            files = {m.name: tar.extractfile(m).read() for m in tar if m.isfile()}
+        conn.close()
+
+    assert files == _reference_files()
+    assert not socket_path.exists()
@@ -0,0 +1,32 @@
+"""
+Startup-time budget for the CLI entry point.
+
+If one of these fails then something slow is being imported at module level.
+Move the import into the function that uses it (see the note in main.py).
+"""
+import pytest
+
+from . import importtime
+
+# Cumulative import time of src.main, in ms. It's currently well under half
+# of this; the slack is for slow and noisy CI machines.
+IMPORT_BUDGET_MS = 200
+
+HEAVY_MODULES = ["cookiecutter", "jinja2", "requests", "rich", "urllib3"]
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "import src.main",
+        "from src import main; main.main(['--help'], standalone_mode=False)",
+    ],
+)
+def test_heavy_modules_not_imported(code):
+    imported = importtime.import_times(code)
+    assert [m for m in HEAVY_MODULES if m in imported] == []
+
+
+def test_import_time_budget():
+    got = importtime.best_import_time("src.main") / 1000
+    assert got < IMPORT_BUDGET_MS
@@ -0,0 +1,131 @@
+"""
+"""
+import json
+
+from click.testing import CliRunner
+
+from . import main
+from .timings import NULL_TIMINGS
+from .timings import Timings
+from .timings import write_report
+
+
+def test_timings_records_phases_and_files():
+    timings = Timings({"project": "foo"})
+    with timings.phase("render"):
+        with timings.file("a.txt", "copy"):
+            pass
+
+    report = timings.report()
+    assert report["meta"] == {"project": "foo"}
+    assert [p["name"] for p in report["phases"]] == ["render"]
+    assert report["files"][0]["path"] == "a.txt"
+    assert report["files"][0]["action"] == "copy"
+    for record in report["phases"] + report["files"] + [report["total"]]:
+        assert record["wall"] >= 0
+        assert record["cpu"] >= 0
+
+
+def test_timings_records_failed_phase():
+    timings = Timings()
+    try:
+        with timings.phase("boom"):
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert [p["name"] for p in timings.phases] == ["boom"]
+
+
+def test_null_timings_records_nothing():
+    with NULL_TIMINGS.phase("render"):
+        with NULL_TIMINGS.file("a.txt", "render"):
+            pass
+    assert NULL_TIMINGS.phases == []
+    assert NULL_TIMINGS.files == []
+    # The same no-op context manager is handed out every time.
+    assert NULL_TIMINGS.phase("a") is NULL_TIMINGS.file("b", "render")
+
+
+def test_write_report(tmp_path, capsys):
+    report = Timings().report()
+
+    write_report(report, str(tmp_path / "t.json"))
+    assert json.loads((tmp_path / "t.json").read_text()) == report
+
+    write_report(report, "-")
+    assert json.loads(capsys.readouterr().out) == report
+
+
+def test_main_timings(tmp_path, extra_context):
+    report_path = tmp_path / "timings.json"
+    args = [
+        "--no-version-check",
+        str(tmp_path / "out"),
+        "--extra-context",
+        f"""{extra_context}""",
+        "--timings",
+        str(report_path),
+    ]
+
+    result = CliRunner().invoke(main.main, args)
+    assert result.exit_code == 0
+
+    report = json.loads(report_path.read_text())
+    phases = [p["name"] for p in report["phases"]]
+    for name in [
+        "parse_extra_context",
+        "prepare_template",
+        "resolve_context",
+        "pre_gen_hook",
+        "plan",
+        "render",
+    ]:
+        assert name in phases
+    paths = {f["path"] for f in report["files"]}
+    assert "pyproject.toml" in paths
+    assert ".gitattributes" in paths
+
+
+def test_main_timings_stdout(tmp_path, extra_context):
+    args = [
+        "--no-version-check",
+        str(tmp_path / "out"),
+        "--extra-context",
+        f"""{extra_context}""",
+        "--timings",
+        "-",
+    ]
+
+    result = CliRunner().invoke(main.main, args)
+    assert result.exit_code == 0, result.output
+
+    # Only the report is on stdout; the hook output and summary aren't.
+    report = json.loads(result.stdout)
+    assert any(p["name"] == "render" for p in report["phases"])
+    assert "Rendered " in result.stderr
+    assert "pre-generate hooks" in result.stderr
+
+
+def test_main_manifest_timings(tmp_path, extra_context):
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_text(json.dumps(extra_context) + "\n")
+    report_path = tmp_path / "timings.json"
+    args = [
+        "--no-version-check",
+        str(tmp_path / "out"),
+        "--manifest",
+        str(manifest),
+        "--workers",
+        "1",
+        "--timings",
+        str(report_path),
+    ]
+
+    result = CliRunner().invoke(main.main, args)
+    assert result.exit_code == 0
+
+    report = json.loads(report_path.read_text())
+    assert [p["name"] for p in report["phases"]] == ["batch"]
+    (project,) = report["meta"]["projects"]
+    assert project["meta"] == {"index": 0, "project": "reference-proj"}
+    assert any(p["name"] == "render" for p in project["phases"])
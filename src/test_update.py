@@ -0,0 +1,222 @@
+"""
+"""
+import hashlib
+import json
+import os
+
+import pytest
+from click.testing import CliRunner
+
+from . import DATA_DIR
+from . import dircmp
+from . import main
+from . import render
+from . import update
+
+REFERENCE_DIR = DATA_DIR / "reference-proj"
+
+
+def _create(tmp_path, extra_context, *args):
+    runner = CliRunner()
+    result = runner.invoke(
+        main.main,
+        [
+            str(tmp_path),
+            "--no-version-check",
+            "--extra-context",
+            str(extra_context),
+            "--record",
+            *args,
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    return tmp_path / "reference-proj"
+
+
+def _manifest(project_dir):
+    with open(project_dir / update.MANIFEST_NAME) as f:
+        return json.load(f)
+
+
+def _save_manifest(project_dir, manifest):
+    (project_dir / update.MANIFEST_NAME).write_text(json.dumps(manifest))
+
+
+def _pretend_template_changed(project_dir, path, old_content):
+    """Make it look like ``path`` was generated from an older template."""
+    (project_dir / path).write_bytes(old_content)
+    manifest = _manifest(project_dir)
+    manifest["files"][path]["hash"] = hashlib.blake2b(old_content).hexdigest()
+    manifest["files"][path]["source_hash"] = "old"
+    _save_manifest(project_dir, manifest)
+
+
+@pytest.fixture
+def project_dir(tmp_path, extra_context):
+    return _create(tmp_path, extra_context)
+
+
+def test_record(project_dir, extra_context):
+    manifest = _manifest(project_dir)
+
+    assert manifest["version"] == update.MANIFEST_VERSION
+    assert manifest["template_commit"] == update.template_commit()
+    assert manifest["context"]["package_name"] == extra_context["package_name"]
+    assert not any(k.startswith("_") for k in manifest["context"])
+
+    expected = {
+        p.relative_to(REFERENCE_DIR).as_posix()
+        for p in REFERENCE_DIR.rglob("*")
+        if p.is_file()
+    }
+    assert manifest["files"].keys() == expected
+    readme = manifest["files"]["README.md"]
+    assert readme["source"] == "README.md"
+    assert readme["hash"] == update._hash_file(project_dir / "README.md")
+
+
+def test_record_with_cache(tmp_path, extra_context, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    first = _create(tmp_path / "a", extra_context, "--cache")
+    # The second one comes from the cache.
+    second = _create(tmp_path / "b", extra_context, "--cache")
+
+    assert _manifest(first)["files"] == _manifest(second)["files"]
+
+
+def test_up_to_date_renders_nothing(project_dir, monkeypatch):
+    calls = []
+    render_file = render.render_file
+    monkeypatch.setattr(
+        render, "render_file", lambda *a: calls.append(a) or render_file(*a)
+    )
+
+    result = update.update_project(project_dir)
+
+    assert calls == []
+    assert result.ok
+    assert result.updated == result.added == result.removed == []
+    assert result.unchanged == len(_manifest(project_dir)["files"])
+
+
+def test_updates_changed_files(project_dir):
+    _pretend_template_changed(project_dir, "README.md", b"old readme\n")
+
+    result = update.update_project(project_dir)
+
+    assert result.ok
+    assert result.updated == ["README.md"]
+    diff = dircmp.compare_trees(project_dir, REFERENCE_DIR)
+    assert diff.extra == [update.MANIFEST_NAME]
+    assert diff.missing == diff.differing == []
+    # And now it's up to date.
+    assert update.update_project(project_dir).updated == []
+
+
+def test_conflict(project_dir):
+    _pretend_template_changed(project_dir, "README.md", b"old readme\n")
+    (project_dir / "README.md").write_text("my own readme\n")
+
+    result = update.update_project(project_dir)
+
+    assert result.conflicts == {"README.md": "modified locally"}
+    assert (project_dir / "README.md").read_text() == "my own readme\n"
+    # It's still a conflict the next time.
+    assert update.update_project(project_dir).conflicts == result.conflicts
+
+    result = update.update_project(project_dir, force=True)
+    assert result.ok
+    assert result.updated == ["README.md"]
+    assert (project_dir / "README.md").read_bytes() == (
+        REFERENCE_DIR / "README.md"
+    ).read_bytes()
+
+
+def test_hardlinked_files_are_replaced(project_dir, tmp_path):
+    _pretend_template_changed(project_dir, "README.md", b"old readme\n")
+    # Eg: from create --dedup hardlink.
+    other = tmp_path / "other-readme"
+    os.link(project_dir / "README.md", other)
+
+    assert update.update_project(project_dir).updated == ["README.md"]
+    assert other.read_bytes() == b"old readme\n"
+
+
+def test_user_changes_without_template_changes(project_dir):
+    (project_dir / "README.md").write_text("my own readme\n")
+
+    result = update.update_project(project_dir)
+
+    assert result.ok
+    assert result.updated == []
+    assert (project_dir / "README.md").read_text() == "my own readme\n"
+
+
+def test_added_and_removed(project_dir):
+    manifest = _manifest(project_dir)
+    del manifest["files"]["README.md"]
+    (project_dir / "README.md").unlink()
+    (project_dir / "old" / "dir").mkdir(parents=True)
+    (project_dir / "old" / "dir" / "gone.txt").write_text("gone\n")
+    (project_dir / "kept.txt").write_text("mine now\n")
+    for name, content in [("old/dir/gone.txt", b"gone\n"), ("kept.txt", b"old\n")]:
+        manifest["files"][name] = {
+            "source": name,
+            "source_hash": "old",
+            "hash": hashlib.blake2b(content).hexdigest(),
+        }
+    _save_manifest(project_dir, manifest)
+
+    result = update.update_project(project_dir)
+
+    assert result.added == ["README.md"]
+    assert result.removed == ["old/dir/gone.txt"]
+    assert result.conflicts == {
+        "kept.txt": "modified locally but removed from the template"
+    }
+    assert not (project_dir / "old").exists()
+    assert (project_dir / "kept.txt").exists()
+    assert "kept.txt" not in _manifest(project_dir)["files"]
+
+
+def test_change_context(project_dir):
+    result = update.update_project(project_dir, {"has_cli": "y"})
+
+    assert result.ok
+    assert "src/reference_proj/cli.py" in result.added
+    assert "pyproject.toml" in result.updated
+    assert _manifest(project_dir)["context"]["has_cli"] == "y"
+
+
+def test_dry_run(project_dir):
+    _pretend_template_changed(project_dir, "README.md", b"old readme\n")
+    before = _manifest(project_dir)
+
+    result = update.update_project(project_dir, dry_run=True)
+
+    assert result.updated == ["README.md"]
+    assert (project_dir / "README.md").read_bytes() == b"old readme\n"
+    assert _manifest(project_dir) == before
+
+
+def test_cli(project_dir, tmp_path):
+    _pretend_template_changed(project_dir, "README.md", b"old readme\n")
+    _pretend_template_changed(project_dir, "CHANGELOG.md", b"old changelog\n")
+    (project_dir / "CHANGELOG.md").write_text("changed\n")
+
+    runner = CliRunner()
+    result = runner.invoke(main.main, ["update", str(project_dir)])
+
+    assert result.exit_code == 1
+    lines = result.output.splitlines()
+    assert lines[:2] == [
+        "Updated: README.md",
+        "Conflict: CHANGELOG.md (modified locally)",
+    ]
+    assert lines[2].startswith("Changed 1 file (")
+    assert lines[3] == "1 conflict."
+
+    (tmp_path / "plain").mkdir()
+    result = runner.invoke(main.main, ["update", str(tmp_path / "plain")])
+    assert result.exit_code == 1
+    assert "Only projects created with --record" in result.output
@@ -0,0 +1,119 @@
+"""
+"""
+import json
+
+from click.testing import CliRunner
+
+from . import main
+from .validate import ManifestError
+from .validate import validate_manifest
+
+
+def _entry(extra_context, **overrides):
+    return dict(extra_context, **overrides)
+
+
+def test_valid(extra_context, tmp_path):
+    entries = [
+        extra_context,
+        _entry(extra_context, project_slug="second", package_name="second"),
+    ]
+    assert validate_manifest(entries, tmp_path) == []
+
+
+def test_reports_every_error(extra_context):
+    entries = [
+        extra_context,
+        _entry(extra_context, project_name="", package_name="1bad"),
+        _entry(extra_context, package_name="other", projcet_host="GitLab"),
+        _entry(extra_context, project_slug="REFERENCE-PROJ", package_name="third"),
+        _entry(extra_context, project_slug="fourth", project_host="Nope"),
+    ]
+
+    errors = validate_manifest(entries)
+
+    assert errors == [
+        ManifestError(1, "project_name", "cannot be blank."),
+        ManifestError(1, "package_name", "'1bad' is not a valid Python package name."),
+        ManifestError(1, "project_slug", "'reference-proj' is also used by entry 0."),
+        ManifestError(2, "projcet_host", "not a template variable."),
+        ManifestError(2, "project_slug", "'reference-proj' is also used by entry 0."),
+        ManifestError(
+            3,
+            "project_slug",
+            "'REFERENCE-PROJ' collides with 'reference-proj' (entry 0) on"
+            " case-insensitive filesystems.",
+        ),
+        ManifestError(
+            4,
+            None,
+            "ValueError: Nope provided for choice variable project_host, but the"
+            " choices are ['GitLab', 'GitHub', 'Other', 'None'].",
+        ),
+    ]
+
+
+def test_duplicate_package_name(extra_context):
+    entries = [extra_context, _entry(extra_context, project_slug="second")]
+
+    assert [str(e) for e in validate_manifest(entries)] == [
+        "[1] package_name: 'reference_proj' is also used by entry 0."
+    ]
+
+
+def test_derived_slug(extra_context):
+    # project_slug is derived from project_name if it isn't given.
+    first = {k: v for k, v in extra_context.items() if k != "project_slug"}
+    first["project_name"] = "Foo Bar"
+    second = _entry(extra_context, project_slug="foo-bar", package_name="other")
+
+    errors = validate_manifest([first, second])
+
+    assert errors == [
+        ManifestError(1, "project_slug", "'foo-bar' is also used by entry 0.")
+    ]
+
+
+def test_bad_directory_name(extra_context):
+    entries = [_entry(extra_context, project_slug="../escape")]
+
+    assert validate_manifest(entries) == [
+        ManifestError(0, "project_slug", "'../escape' is not a directory name.")
+    ]
+
+
+def test_existing_directory(extra_context, tmp_path):
+    (tmp_path / "reference-proj").mkdir()
+
+    errors = validate_manifest([extra_context], tmp_path)
+
+    assert errors == [
+        ManifestError(
+            0, "project_slug", f"{tmp_path / 'reference-proj'} already exists."
+        )
+    ]
+    # Without an output dir there's nothing to check against.
+    assert validate_manifest([extra_context]) == []
+
+
+def test_cli(extra_context, tmp_path):
+    manifest = tmp_path / "manifest.jsonl"
+    bad = _entry(extra_context, package_name="")
+    manifest.write_text(json.dumps(extra_context) + "\n" + json.dumps(bad) + "\n")
+
+    runner = CliRunner()
+    result = runner.invoke(main.main, ["validate", str(manifest)])
+
+    assert result.exit_code == 1
+    assert result.output.splitlines() == [
+        "[1] package_name: '' is not a valid Python package name.",
+        "[1] project_slug: 'reference-proj' is also used by entry 0.",
+        "2 problems in 2 projects.",
+    ]
+    # Nothing was generated.
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["manifest.jsonl"]
+
+    manifest.write_text(json.dumps(extra_context) + "\n")
+    result = runner.invoke(main.main, ["validate", str(manifest)])
+    assert result.exit_code == 0
+    assert result.output == "OK: no problems found in 1 project.\n"
@@ -0,0 +1,186 @@
+"""
+"""
+import json
+import shutil
+
+import pytest
+from click.testing import CliRunner
+
+from . import DATA_DIR
+from . import main
+from . import REFERENCE_CONTEXT
+from . import render
+from . import TEMPLATE_DIR
+from . import watch
+
+SLUG_DIR = "{{cookiecutter.project_slug}}"
+
+
+@pytest.fixture
+def template_dir(tmp_path):
+    """A copy of the template that can be edited."""
+    template_dir = tmp_path / "template"
+    template_dir.mkdir()
+    shutil.copytree(TEMPLATE_DIR / SLUG_DIR, template_dir / SLUG_DIR)
+    shutil.copytree(TEMPLATE_DIR / "hooks", template_dir / "hooks")
+    shutil.copy(TEMPLATE_DIR / "cookiecutter.json", template_dir)
+    return template_dir
+
+
+@pytest.fixture
+def session(tmp_path, template_dir):
+    session = watch.WatchSession(
+        tmp_path / "preview",
+        dict(REFERENCE_CONTEXT),
+        DATA_DIR / "reference-proj",
+        template_dir,
+    )
+    update = session.render_all()
+    assert update.error is None
+    assert update.full and update.diff.ok
+    return session
+
+
+def test_template_paths(template_dir):
+    paths = [
+        template_dir / SLUG_DIR / "README.md",
+        template_dir / "cookiecutter.json",
+        template_dir / "hooks" / "__pycache__" / "x.pyc",
+        template_dir / SLUG_DIR / ".README.md.swp",
+        template_dir / "src" / "main.py",
+        template_dir.parent / "elsewhere",
+    ]
+    assert watch.template_paths(template_dir, paths) == {
+        f"{SLUG_DIR}/README.md",
+        "cookiecutter.json",
+    }
+
+
+def test_only_changed_files_are_rendered(session, template_dir, monkeypatch):
+    calls = []
+    render_entry = render.render_entry
+    monkeypatch.setattr(
+        render, "render_entry", lambda *a: calls.append(a[2].dest) or render_entry(*a)
+    )
+    readme = template_dir / SLUG_DIR / "README.md"
+    original = readme.read_text()
+
+    readme.write_text(original + "More docs.\n")
+    update = session.apply([readme])
+
+    assert calls == ["README.md"]
+    assert not update.full
+    assert update.rendered == ["README.md"]
+    assert update.diff.differing == ["README.md"]
+    assert update.diff.compared == 1
+    assert session.differences == {"README.md": "differs"}
+
+    readme.write_text(original)
+    update = session.apply([readme])
+    assert update.diff.ok
+    assert session.differences == {}
+
+
+def test_unrelated_changes_are_ignored(session, template_dir):
+    assert session.apply([template_dir / "setup.cfg"]) is None
+    assert session.apply([template_dir / SLUG_DIR / ".README.md.swp"]) is None
+
+
+def test_new_file_renders_everything(session, template_dir):
+    new = template_dir / SLUG_DIR / "NEW.md"
+    new.write_text("{{ cookiecutter.project_name }}\n")
+
+    update = session.apply([new])
+
+    assert update.full
+    assert session.differences == {"NEW.md": "extra"}
+    assert (session.project_dir / "NEW.md").read_text() == "Reference Project\n"
+
+
+def test_cookiecutter_json_renders_everything(session, template_dir):
+    path = template_dir / "cookiecutter.json"
+    variables = json.loads(path.read_text())
+    variables["license"] = "BSD"
+    path.write_text(json.dumps(variables))
+
+    update = session.apply([path])
+
+    assert update.full
+    # The reference context sets the license anyway.
+    assert update.diff.ok
+
+
+def test_render_error(session, template_dir):
+    readme = template_dir / SLUG_DIR / "README.md"
+    original = readme.read_text()
+    readme.write_text("{{ cookiecutter.nope }}\n")
+
+    update = session.apply([readme])
+    assert "UndefinedVariableInTemplate" in update.error
+
+    readme.write_text(original)
+    assert session.apply([readme]).diff.ok
+
+
+def _polling(template_dir):
+    return watch.PollingWatcher(template_dir, interval=0.01)
+
+
+def _inotify(template_dir):
+    try:
+        return watch.InotifyWatcher(template_dir)
+    except OSError:
+        pytest.skip("inotify isn't available")
+
+
+@pytest.mark.parametrize("make", [_polling, _inotify])
+def test_watcher(template_dir, make):
+    watcher = make(template_dir)
+    try:
+        assert watcher.wait(timeout=0.1) == set()
+
+        readme = template_dir / SLUG_DIR / "README.md"
+        readme.write_text("changed\n")
+        assert readme in watcher.wait(timeout=5)
+
+        # Files in new directories are found too.
+        new_dir = template_dir / SLUG_DIR / "new" / "dir"
+        new_dir.mkdir(parents=True)
+        (new_dir / "file.txt").write_text("new\n")
+        changed = set()
+        while new_dir / "file.txt" not in changed:
+            more = watcher.wait(timeout=5)
+            assert more
+            changed |= more
+    finally:
+        watcher.close()
+
+
+def test_cli(tmp_path, monkeypatch):
+    readme = TEMPLATE_DIR / SLUG_DIR / "README.md"
+
+    class FakeWatcher:
+        def __init__(self):
+            self.changes = [{TEMPLATE_DIR / "setup.cfg"}, {readme}]
+
+        def wait(self):
+            if not self.changes:
+                raise KeyboardInterrupt
+            return self.changes.pop(0)
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(watch, "make_watcher", lambda **kwargs: FakeWatcher())
+    runner = CliRunner()
+
+    result = runner.invoke(main.main, ["watch", str(tmp_path)])
+
+    assert result.exit_code == 0, result.output
+    lines = result.output.splitlines()
+    assert lines[0].startswith("Watching ")
+    assert " start: rendered the whole project in " in lines[1]
+    assert lines[2] == f"OK: matches {DATA_DIR / 'reference-proj'}."
+    assert f"{SLUG_DIR}/README.md: rendered 1 file in " in lines[3]
+    assert lines[4] == lines[2]
+    assert len(lines) == 5
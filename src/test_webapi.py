@@ -0,0 +1,132 @@
+"""
+"""
+import time
+
+import pytest
+
+from . import main
+from . import webapi
+from .mockapi import MockGitHubApi
+
+
+@pytest.fixture
+def mock_api():
+    with MockGitHubApi(missing_hashes={"deadbeef"}) as api:
+        yield api
+
+
+@pytest.fixture
+def cache(tmp_path):
+    yield webapi.ResponseCache(tmp_path / "cache", ttl=60)
+
+
+def test_cached_get_no_cache(mock_api):
+    url = mock_api.url + "/commits/master"
+    got = webapi.cached_get(url, lambda json: json["sha"])
+    assert got == mock_api.sha
+    webapi.cached_get(url, lambda json: json["sha"])
+    assert mock_api.request_count == 2
+
+
+def test_cached_get_fresh_hit_skips_network(mock_api, cache):
+    url = mock_api.url + "/commits/master"
+    first = webapi.cached_get(url, lambda json: json["sha"], cache)
+    second = webapi.cached_get(url, lambda json: json["sha"], cache)
+
+    assert first == second == mock_api.sha
+    assert mock_api.request_count == 1
+
+
+def test_cached_get_revalidates_stale_entry(mock_api, cache):
+    cache.ttl = 0
+    url = mock_api.url + "/commits/master"
+    calls = []
+
+    def extract(json):
+        calls.append(json)
+        return json["sha"]
+
+    webapi.cached_get(url, extract, cache)
+    got = webapi.cached_get(url, extract, cache)
+
+    assert got == mock_api.sha
+    assert mock_api.request_count == 2
+    # The second request was conditional and the 304 was not parsed.
+    _, headers = mock_api.requests[1]
+    assert headers["If-None-Match"].startswith('"')
+    assert headers["If-Modified-Since"] == "Sun, 05 Sep 2021 13:24:37 GMT"
+    assert len(calls) == 1
+
+
+def test_cached_get_not_found(mock_api, cache):
+    with pytest.raises(webapi.NotFoundError):
+        webapi.cached_get(mock_api.url + "/nope", lambda json: json, cache)
+
+    # Errors are not cached.
+    assert list(cache.path.glob("*.json")) == []
+
+
+def test_cache_corrupt_entry_is_a_miss(mock_api, cache):
+    url = mock_api.url + "/commits/master"
+    webapi.cached_get(url, lambda json: json["sha"], cache)
+    for fp in cache.path.glob("*.json"):
+        fp.write_text("{not json")
+
+    assert cache.load(url) is None
+    assert webapi.cached_get(url, lambda json: json["sha"], cache) == mock_api.sha
+    assert mock_api.request_count == 2
+
+
+def test_remote_commit_info_against_mock(mock_api, cache):
+    with webapi.ApiClient(cache) as client:
+        got = main._get_current_remote_commit_info(mock_api.url, client)
+    assert got == (mock_api.sha, mock_api.date)
+
+
+def test_diff_total_commits_against_mock(mock_api, cache):
+    with webapi.ApiClient(cache) as client:
+        got = main._get_diff_total_commits(mock_api.url, "111", "222", client)
+        assert got == 5
+
+        with pytest.raises(main.WebApiError):
+            main._get_diff_total_commits(mock_api.url, "deadbeef", "222", client)
+
+
+def test_client_reuses_connection(mock_api):
+    with webapi.ApiClient() as client:
+        for _ in range(3):
+            client.get(mock_api.url + "/commits/master", lambda json: json["sha"])
+
+    assert mock_api.request_count == 3
+    assert len(mock_api.connections) == 1
+
+
+def test_client_retries_transient_errors(mock_api):
+    mock_api.fail_next = 2
+    with webapi.ApiClient(backoff=0) as client:
+        got = client.get(mock_api.url + "/commits/master", lambda json: json["sha"])
+
+    assert got == mock_api.sha
+    assert mock_api.request_count == 3
+
+
+def test_client_gives_up_after_retries(mock_api):
+    mock_api.fail_next = 10
+    with webapi.ApiClient(retries=1, backoff=0) as client:
+        with pytest.raises(webapi.WebApiError, match="503"):
+            client.get(mock_api.url + "/commits/master", lambda json: json["sha"])
+
+    assert mock_api.request_count == 2
+
+
+def test_client_submit_runs_concurrently(mock_api):
+    mock_api.latency = 0.2
+    url = mock_api.url + "/commits/master"
+    with webapi.ApiClient() as client:
+        start = time.monotonic()
+        futures = [client.submit(client.get, url, lambda j: j["sha"]) for _ in range(3)]
+        got = [f.result() for f in futures]
+        elapsed = time.monotonic() - start
+
+    assert got == [mock_api.sha] * 3
+    assert elapsed < 0.5
@@ -0,0 +1,109 @@
+"""
+Wall and CPU time instrumentation for project generation.
+
+A :class:`Timings` object records how long each phase of a run took (eg:
+``prepare_template``, ``pre_gen_hook``, ``render``) and, within rendering, how
+long each file took. The result is a plain dict (see :meth:`Timings.report`)
+that's written as JSON by ``--timings``.
+
+Instrumented code is written against :data:`NULL_TIMINGS` when timings are
+disabled. Its methods return a shared no-op context manager, so a disabled
+timer costs one method call and nothing else::
+
+    timings = timings if timings is not None else NULL_TIMINGS
+    with timings.phase("render"):
+        ...
+"""
+import contextlib
+import json
+import os
+import sys
+import time
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import TextIO
+
+# Bump this if the report layout changes in a way that breaks readers.
+REPORT_VERSION = 1
+
+
+class Timings:
+    """
+    Records wall and CPU time for phases and files.
+
+    Parameters
+    ----------
+    meta : dict, optional
+        Extra information to include in the report (eg: the project slug).
+    """
+
+    def __init__(self, meta: Optional[dict] = None):
+        self.meta = dict(meta or {})
+        self.phases: List[Dict] = []
+        self.files: List[Dict] = []
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+
+    @contextlib.contextmanager
+    def _measure(self, records: List[Dict], record: Dict):
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            record["wall"] = time.perf_counter() - wall
+            record["cpu"] = time.process_time() - cpu
+            records.append(record)
+
+    def phase(self, name: str):
+        """Time the body of a ``with`` block as the phase ``name``."""
+        return self._measure(self.phases, {"name": name})
+
+    def file(self, path: str, action: str):
+        """Time the body of a ``with`` block as writing ``path``."""
+        return self._measure(self.files, {"path": path, "action": action})
+
+    def report(self) -> dict:
+        """Return everything recorded so far, in the JSON report layout."""
+        return {
+            "version": REPORT_VERSION,
+            "pid": os.getpid(),
+            "meta": self.meta,
+            "total": {
+                "wall": time.perf_counter() - self._wall_start,
+                "cpu": time.process_time() - self._cpu_start,
+            },
+            "phases": self.phases,
+            "files": self.files,
+        }
+
+
+class _NullTimings(Timings):
+    """A :class:`Timings` that doesn't record anything."""
+
+    _NULL = contextlib.nullcontext()
+
+    def phase(self, name: str):
+        return self._NULL
+
+    def file(self, path: str, action: str):
+        return self._NULL
+
+
+NULL_TIMINGS: Timings = _NullTimings()
+
+
+def write_report(report: dict, path: str, stdout: Optional[TextIO] = None) -> None:
+    """
+    Write ``report`` as JSON to ``path``, or to ``stdout`` if it's ``-``.
+
+    ``stdout`` defaults to :data:`sys.stdout`.
+    """
+    data = json.dumps(report, indent=2)
+    if path == "-":
+        print(data, file=stdout or sys.stdout)
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(data)
+        f.write("\n")
@@ -0,0 +1,267 @@
+"""
+Re-apply the template to a project that was generated from it.
+
+Projects created with ``--record`` get a manifest, :data:`MANIFEST_NAME`,
+that records:
+
++ the template commit that the project was generated from,
++ the context (the template variables) it was generated with,
++ for every file: the template file it came from, a hash of that template
+  file, and a hash of what was written.
+
+:func:`update_project` uses the manifest to only redo what changed. Files
+whose template source (and context) are the same as last time are skipped
+without being rendered, so an update costs about as much as the template's
+diff, not the whole project. For each file that did change:
+
++ If the project's copy is still what was written last time, it's replaced.
++ If the user changed it, it's left alone and reported as a conflict
+  (unless ``force`` is given).
+
+Files that the template no longer produces are removed, again only if the
+user hasn't changed them. The manifest is then rewritten for the new state.
+"""
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from dataclasses import field
+from pathlib import Path
+from typing import Dict
+from typing import List
+from typing import Optional
+
+from . import gitdir
+from . import render
+from . import TEMPLATE_DIR
+from .dircmp import file_hash
+from .generate import prepare_template
+from .generate import resolve_context
+
+MANIFEST_NAME = ".template-manifest.json"
+MANIFEST_VERSION = 1
+
+
+class UpdateError(Exception):
+    pass
+
+
+@dataclass
+class UpdateResult:
+    """
+    What :func:`update_project` did (or would do, for a dry run).
+
+    Every list has paths relative to the project, with ``/``. ``conflicts``
+    maps each path that was skipped to the reason.
+    """
+
+    old_commit: Optional[str] = None
+    new_commit: Optional[str] = None
+    updated: List[str] = field(default_factory=list)
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    conflicts: Dict[str, str] = field(default_factory=dict)
+    unchanged: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return not self.conflicts
+
+
+def template_commit(template_dir: Path = TEMPLATE_DIR) -> Optional[str]:
+    """Return the template's HEAD commit, or None if it can't be read."""
+    try:
+        return gitdir.resolve_head(gitdir.find_git_dir(template_dir))
+    except (gitdir.GitReadError, OSError):
+        return None
+
+
+def _hash_bytes(data: bytes) -> str:
+    return hashlib.blake2b(data).hexdigest()
+
+
+def _hash_file(path: Path) -> Optional[str]:
+    """Hash a project file, or return None if it doesn't exist."""
+    # Without the memo: it could miss an edit that doesn't change the size or
+    # (coarse) mtime, and these are files that users edit.
+    try:
+        return file_hash(path, memo=False).hex()
+    except FileNotFoundError:
+        return None
+
+
+def _recorded_context(context: dict) -> dict:
+    # Private variables are either template settings or are set at
+    # generation time (eg: _output_dir), so they aren't part of the project.
+    return {k: v for k, v in context["cookiecutter"].items() if not k.startswith("_")}
+
+
+def read_manifest(project_dir: Path) -> dict:
+    path = Path(project_dir) / MANIFEST_NAME
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        raise UpdateError(
+            f"{path} doesn't exist. Only projects created with --record can be"
+            " updated."
+        )
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise UpdateError(f"{path} has an unsupported version.")
+    return manifest
+
+
+def write_manifest(project_dir: Path, context: dict, files: Dict[str, dict]) -> None:
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "template_commit": template_commit(),
+        "context": _recorded_context(context),
+        "files": dict(sorted(files.items())),
+    }
+    path = Path(project_dir) / MANIFEST_NAME
+    path.write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+
+
+def record_manifest(context: dict, project_dir: Path) -> None:
+    """
+    Write the manifest for a project that was just generated from ``context``.
+
+    The written files are hashed from disk, so this works no matter how the
+    project was made (rendered, copied from the output cache, ...).
+    """
+    template_dir, env, _ = render.prepare(context)
+    files = {}
+    for entry in render.build_plan(context, template_dir, env):
+        if entry.is_dir:
+            continue
+        files[entry.dest.replace(os.sep, "/")] = {
+            "source": entry.src.replace(os.sep, "/"),
+            "source_hash": file_hash(template_dir / entry.src).hex(),
+            "hash": _hash_file(Path(project_dir) / entry.dest),
+        }
+    write_manifest(project_dir, context, files)
+
+
+def _write(path: Path, data: bytes, mode: int) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Replace the file rather than writing into it: it may be hardlinked to
+    # other projects (see :mod:`.dedup`).
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.chmod(tmp, mode)
+    os.replace(tmp, path)
+
+
+def _remove_empty_parents(path: Path, project_dir: Path) -> None:
+    parent = path.parent
+    while parent != project_dir and not any(parent.iterdir()):
+        parent.rmdir()
+        parent = parent.parent
+
+
+def update_project(
+    project_dir: Path,
+    extra_context: Optional[dict] = None,
+    force: bool = False,
+    dry_run: bool = False,
+) -> UpdateResult:
+    """
+    Bring ``project_dir`` up to date with the current template.
+
+    The project is re-rendered with the context in its manifest, updated
+    with ``extra_context`` if given. With ``force``, files changed by the
+    user are overwritten instead of being reported as conflicts. With
+    ``dry_run``, nothing is changed.
+
+    Raises :class:`UpdateError` if the project doesn't have a manifest.
+    """
+    project_dir = Path(project_dir)
+    manifest = read_manifest(project_dir)
+    old_files: Dict[str, dict] = manifest["files"]
+
+    recorded = {**manifest["context"], **(extra_context or {})}
+    context = resolve_context(prepare_template(), recorded, str(project_dir.parent))
+    # If any variable changed then every rendered file might have, too.
+    context_changed = _recorded_context(context) != manifest["context"]
+
+    result = UpdateResult(manifest.get("template_commit"), template_commit())
+    template_dir, env, _ = render.prepare(context)
+    new_files: Dict[str, dict] = {}
+
+    for entry in render.build_plan(context, template_dir, env):
+        if entry.is_dir:
+            if not dry_run:
+                (project_dir / entry.dest).mkdir(parents=True, exist_ok=True)
+            continue
+        dest = entry.dest.replace(os.sep, "/")
+        src = template_dir / entry.src
+        record = {
+            "source": entry.src.replace(os.sep, "/"),
+            "source_hash": file_hash(src).hex(),
+        }
+
+        old = old_files.get(dest)
+        if (
+            old is not None
+            and old["source"] == record["source"]
+            and old["source_hash"] == record["source_hash"]
+            and (entry.static or not context_changed)
+        ):
+            new_files[dest] = old
+            result.unchanged += 1
+            continue
+
+        if entry.static:
+            data = src.read_bytes()
+        else:
+            data = render.render_file(env, entry, template_dir, context)
+        record["hash"] = _hash_bytes(data)
+
+        path = project_dir / dest
+        current = _hash_file(path)
+        if current == record["hash"]:
+            # Already what the template would write.
+            new_files[dest] = record
+            result.unchanged += 1
+            continue
+
+        if old is None and current is not None:
+            conflict = "exists but wasn't created by the template"
+        elif old is not None and current is None:
+            conflict = "deleted locally"
+        elif old is not None and current != old["hash"]:
+            conflict = "modified locally"
+        else:
+            conflict = None
+
+        if conflict is not None and not force:
+            result.conflicts[dest] = conflict
+            # Keep the old record so that it's still a conflict next time.
+            if old is not None:
+                new_files[dest] = old
+            continue
+
+        (result.added if old is None else result.updated).append(dest)
+        new_files[dest] = record
+        if not dry_run:
+            _write(path, data, render.file_mode(src))
+
+    for dest, old in old_files.items():
+        if dest in new_files or dest in result.conflicts:
+            continue
+        # The template doesn't produce this file anymore.
+        path = project_dir / dest
+        current = _hash_file(path)
+        if current is None:
+            continue
+        if current != old["hash"] and not force:
+            result.conflicts[dest] = "modified locally but removed from the template"
+            continue
+        result.removed.append(dest)
+        if not dry_run:
+            path.unlink()
+            _remove_empty_parents(path, project_dir)
+
+    if not dry_run:
+        write_manifest(project_dir, context, new_files)
+    return result
@@ -0,0 +1,145 @@
+"""
+Check a whole manifest before generating any of it.
+
+The pre-gen hook only checks one project at a time, after its context has
+been resolved, so a bad entry in a big batch fails deep into the run. This
+checks every entry up front and reports every problem at once:
+
++ keys that aren't in ``cookiecutter.json`` (cookiecutter silently ignores
+  them, so they're usually typos) and invalid choices,
++ blank project names and invalid package names, using the same pattern as
+  the pre-gen hook,
++ slugs and package names used by more than one entry,
++ project directories that collide, either with each other (eg: slugs that
+  only differ in case) or with a directory that already exists.
+
+Contexts are resolved the same way as for generation, so derived values
+(like the default ``project_slug``) are checked too. Nothing is rendered.
+"""
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Pattern
+
+from cookiecutter.exceptions import CookiecutterException
+
+from . import hook_runner
+from .generate import prepare_template
+from .generate import resolve_context
+from .render import is_directory_name
+
+# Variables that must be unique across a manifest.
+UNIQUE_KEYS = ("project_slug", "package_name")
+
+
+@dataclass
+class ManifestError:
+    """A problem with manifest entry ``index`` (``key`` is None if general)."""
+
+    index: int
+    key: Optional[str]
+    message: str
+
+    def __str__(self) -> str:
+        where = f"[{self.index}]" if self.key is None else f"[{self.index}] {self.key}"
+        return f"{where}: {self.message}"
+
+
+def _check_entry(
+    index: int, cookiecutter: dict, pattern: Pattern, errors: List[ManifestError]
+) -> None:
+    # The same checks as hooks/pre_gen_project.py, without the printing.
+    if cookiecutter["project_name"] == "":
+        errors.append(ManifestError(index, "project_name", "cannot be blank."))
+
+    package_name = cookiecutter["package_name"]
+    if not pattern.match(package_name):
+        errors.append(
+            ManifestError(
+                index,
+                "package_name",
+                f"'{package_name}' is not a valid Python package name.",
+            )
+        )
+
+
+def validate_manifest(
+    entries: List[dict],
+    output_dir: Optional[Path] = None,
+    base_context: Optional[dict] = None,
+) -> List[ManifestError]:
+    """
+    Return every problem with ``entries``, in manifest order.
+
+    If ``output_dir`` is given then project directories that already exist
+    in it are reported too.
+    """
+    if base_context is None:
+        base_context = prepare_template()
+    known_keys = base_context["cookiecutter"].keys()
+    # Already compiled, once, by the hook module.
+    pattern = hook_runner.load_hook("pre_gen_project").PACKAGE_NAME_PATTERN
+    root = Path(output_dir) if output_dir is not None else Path(".")
+
+    errors: List[ManifestError] = []
+    # key -> value -> index of the first entry that used it
+    seen: Dict[str, Dict[str, int]] = {key: {} for key in UNIQUE_KEYS}
+    # Normalized project dir -> (index, slug) of the first entry that used it
+    seen_dirs: Dict[str, tuple] = {}
+
+    for index, entry in enumerate(entries):
+        for key in entry:
+            if key not in known_keys:
+                errors.append(ManifestError(index, key, "not a template variable."))
+
+        try:
+            context = resolve_context(base_context, entry, str(root))
+        except (ValueError, CookiecutterException) as err:
+            # Eg: an invalid choice, or a variable that can't be rendered.
+            errors.append(ManifestError(index, None, f"{type(err).__name__}: {err}"))
+            continue
+        cookiecutter = context["cookiecutter"]
+
+        _check_entry(index, cookiecutter, pattern, errors)
+
+        for key in UNIQUE_KEYS:
+            value = cookiecutter[key]
+            first = seen[key].setdefault(value, index)
+            if first != index:
+                errors.append(
+                    ManifestError(
+                        index, key, f"'{value}' is also used by entry {first}."
+                    )
+                )
+
+        slug = cookiecutter["project_slug"]
+        if not is_directory_name(slug):
+            errors.append(
+                ManifestError(
+                    index, "project_slug", f"'{slug}' is not a directory name."
+                )
+            )
+            continue
+        project_dir = root / slug
+        # Case-insensitive filesystems (macOS, Windows) treat these as one.
+        key = os.path.normcase(str(project_dir)).casefold()
+        first_index, first_slug = seen_dirs.setdefault(key, (index, slug))
+        if first_index != index and first_slug != slug:
+            # Identical slugs were already reported above.
+            errors.append(
+                ManifestError(
+                    index,
+                    "project_slug",
+                    f"'{slug}' collides with '{first_slug}' (entry {first_index})"
+                    " on case-insensitive filesystems.",
+                )
+            )
+        if output_dir is not None and first_index == index and project_dir.exists():
+            errors.append(
+                ManifestError(index, "project_slug", f"{project_dir} already exists.")
+            )
+
+    return errors
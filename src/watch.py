@@ -0,0 +1,430 @@
+"""
+Keep a rendered preview of the template up to date while it's being edited.
+
+A :class:`WatchSession` renders the project into a preview directory and
+compares it against the golden project (``src/data/reference-proj`` by
+default). After that, each change to the template only costs what it
+touches:
+
++ If files in the project template were edited, only the project files made
+  from them are re-rendered, and only those are compared again.
++ Anything else (``cookiecutter.json``, the hooks, or files being added,
+  removed or renamed in a way that changes the render plan) re-renders the
+  whole project.
+
+Changes are found with inotify on Linux (:class:`InotifyWatcher`) and by
+polling ``stat`` everywhere else (:class:`PollingWatcher`). Both coalesce
+bursts of events, like an editor saving via a temp file, into one change.
+"""
+import contextlib
+import ctypes.util
+import io
+import os
+import select
+import struct
+import time
+from dataclasses import dataclass
+from dataclasses import field
+from pathlib import Path
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+from cookiecutter.utils import rmtree
+
+from . import dircmp
+from . import hook_runner
+from . import render
+from . import TEMPLATE_DIR
+from .generate import prepare_template
+from .generate import resolve_context
+from .output_cache import TEMPLATE_PATHS
+
+# From linux/inotify.h
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+_WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+# Editor backup and swap files.
+IGNORE_SUFFIXES = ("~", ".swp", ".swx")
+
+# How long a burst of events has to be quiet before it's reported.
+SETTLE_TIME = 0.05  # seconds
+
+
+def _is_ignored(rel: str) -> bool:
+    parts = rel.split("/")
+    return (
+        "__pycache__" in parts
+        or parts[-1].endswith(IGNORE_SUFFIXES)
+        or parts[-1].startswith(".#")
+    )
+
+
+def template_paths(template_dir: Path, paths: Iterable[Path]) -> Set[str]:
+    """
+    Return the ``paths`` that are part of the template, relative to it.
+
+    Those are the project template, ``cookiecutter.json`` and the hooks (see
+    :data:`.output_cache.TEMPLATE_PATHS`), minus editor and bytecode files.
+    """
+    rels = set()
+    for path in paths:
+        try:
+            rel = Path(path).relative_to(template_dir).as_posix()
+        except ValueError:
+            continue
+        if rel.split("/")[0] in TEMPLATE_PATHS and not _is_ignored(rel):
+            rels.add(rel)
+    return rels
+
+
+def _walk_dirs(root: Path) -> Iterable[Path]:
+    for dirpath, dirs, _ in os.walk(root):
+        dirs[:] = [d for d in dirs if d != "__pycache__"]
+        yield Path(dirpath)
+
+
+class PollingWatcher:
+    """
+    Finds changes by comparing ``stat`` snapshots of the template.
+
+    Parameters
+    ----------
+    template_dir : :class:`pathlib.Path`
+    interval : float
+        Seconds between snapshots.
+    """
+
+    def __init__(self, template_dir: Path = TEMPLATE_DIR, interval: float = 0.25):
+        self.template_dir = Path(template_dir)
+        self.interval = interval
+        self._snapshot = self.snapshot()
+
+    def snapshot(self) -> Dict[Path, Tuple[int, int]]:
+        """Return ``{path: (mtime_ns, size)}`` for every template file."""
+        snapshot = {}
+        for rel in TEMPLATE_PATHS:
+            path = self.template_dir / rel
+            if path.is_file():
+                st = path.stat()
+                snapshot[path] = (st.st_mtime_ns, st.st_size)
+                continue
+            for dirpath in _walk_dirs(path):
+                for entry in os.scandir(dirpath):
+                    if entry.is_file(follow_symlinks=False):
+                        st = entry.stat(follow_symlinks=False)
+                        snapshot[Path(entry.path)] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def wait(self, timeout: Optional[float] = None) -> Set[Path]:
+        """
+        Block until something changed and return the paths that did.
+
+        Returns an empty set if nothing changed within ``timeout`` seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self.snapshot()
+            changed = {
+                path
+                for path in snapshot.keys() | self._snapshot.keys()
+                if snapshot.get(path) != self._snapshot.get(path)
+            }
+            if changed:
+                # Wait for the burst to be over.
+                time.sleep(SETTLE_TIME)
+                self._snapshot = self.snapshot()
+                return changed | {
+                    path
+                    for path in self._snapshot.keys() | snapshot.keys()
+                    if snapshot.get(path) != self._snapshot.get(path)
+                }
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            time.sleep(self.interval)
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """
+    Finds changes with Linux's inotify.
+
+    Every directory of the template is watched, and new directories are
+    watched as they're created. Raises :class:`OSError` if inotify isn't
+    available.
+
+    Parameters
+    ----------
+    template_dir : :class:`pathlib.Path`
+    """
+
+    def __init__(self, template_dir: Path = TEMPLATE_DIR):
+        self.template_dir = Path(template_dir)
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("libc not found.")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not available.")
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: Dict[int, Path] = {}
+
+        # The top dir is watched too, for cookiecutter.json and for the other
+        # paths being replaced.
+        self._add_watch(self.template_dir)
+        for rel in TEMPLATE_PATHS:
+            if (self.template_dir / rel).is_dir():
+                self._add_tree(self.template_dir / rel)
+
+    def _add_watch(self, path: Path) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"Can't watch {path}")
+        self._dirs[wd] = path
+
+    def _add_tree(self, root: Path) -> Set[Path]:
+        """Watch ``root`` and everything in it. Returns the files in it."""
+        files = set()
+        for dirpath in _walk_dirs(root):
+            try:
+                self._add_watch(dirpath)
+                files.update(p for p in dirpath.iterdir() if not p.is_dir())
+            except OSError:
+                # It's already gone again.
+                continue
+        return files
+
+    def _read(self) -> Set[Path]:
+        changed: Set[Path] = set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost, so treat everything as changed.
+                changed.add(self.template_dir)
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None:
+                continue
+            path = directory / os.fsdecode(name) if name else directory
+            changed.add(path)
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                # Files can be created in it before it's watched.
+                changed.update(self._add_tree(path))
+        return changed
+
+    def wait(self, timeout: Optional[float] = None) -> Set[Path]:
+        """
+        Block until something changed and return the paths that did.
+
+        Returns an empty set if nothing changed within ``timeout`` seconds.
+        """
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed = self._read()
+        # Wait for the burst to be over.
+        while select.select([self._fd], [], [], SETTLE_TIME)[0]:
+            changed |= self._read()
+        return changed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+def make_watcher(
+    template_dir: Path = TEMPLATE_DIR, poll: bool = False, interval: float = 0.25
+):
+    """Return an :class:`InotifyWatcher`, or a :class:`PollingWatcher`."""
+    if not poll:
+        try:
+            return InotifyWatcher(template_dir)
+        except OSError:
+            pass
+    return PollingWatcher(template_dir, interval)
+
+
+@dataclass
+class WatchUpdate:
+    """
+    What one render of the preview did.
+
+    ``changed`` are the template paths that triggered it and ``rendered`` the
+    project files that were written. ``diff`` only covers ``rendered``.
+    ``error`` is set, and nothing else is, if rendering failed.
+    """
+
+    changed: List[str]
+    rendered: List[str] = field(default_factory=list)
+    diff: Optional[dircmp.TreeDiff] = None
+    full: bool = False
+    elapsed: float = 0.0
+    error: Optional[str] = None
+
+
+class WatchSession:
+    """
+    A preview of the project that's re-rendered as the template changes.
+
+    Parameters
+    ----------
+    preview_dir : :class:`pathlib.Path`
+        The project is rendered into a directory in here.
+    extra_context : dict
+        The template variables for the preview.
+    expected : :class:`pathlib.Path`
+        The project that the preview is compared against.
+    template_dir : :class:`pathlib.Path`
+    """
+
+    def __init__(
+        self,
+        preview_dir: Path,
+        extra_context: dict,
+        expected: Path,
+        template_dir: Path = TEMPLATE_DIR,
+    ):
+        self.preview_dir = Path(preview_dir)
+        self.extra_context = extra_context
+        self.expected = Path(expected)
+        self.template_dir = Path(template_dir)
+        self.project_dir: Optional[Path] = None
+        # rel -> "missing", "extra" or "differs", for the whole project.
+        self.differences: Dict[str, str] = {}
+        self._context: Optional[dict] = None
+        self._layout: Optional[List[Tuple[str, str, bool]]] = None
+
+    def _compare(self, paths: Optional[Iterable[str]] = None) -> dircmp.TreeDiff:
+        # The preview is rewritten in place on every save, so the hash memo
+        # could be stale.
+        diff = dircmp.compare_trees(
+            self.project_dir, self.expected, paths=paths, memo=False
+        )
+        if paths is None:
+            self.differences.clear()
+        else:
+            for rel in paths:
+                self.differences.pop(rel, None)
+        for kind, rels in [
+            ("missing", diff.missing),
+            ("extra", diff.extra),
+            ("differs", diff.differing),
+        ]:
+            self.differences.update(dict.fromkeys(rels, kind))
+        return diff
+
+    def render_all(self, changed: Iterable[str] = ()) -> WatchUpdate:
+        """Render the whole project from scratch and compare all of it."""
+        start = time.perf_counter()
+        update = WatchUpdate(sorted(changed), full=True)
+        # The hooks and cookiecutter.json might have changed too.
+        hook_runner.load_hook.cache_clear()
+        try:
+            context = resolve_context(
+                prepare_template(self.template_dir),
+                self.extra_context,
+                str(self.preview_dir),
+            )
+            with contextlib.redirect_stdout(io.StringIO()):
+                hook_runner.run_pre_gen_project(context)
+            template_dir, env, name = render.prepare(context)
+            for stale in {self.project_dir, self.preview_dir / name}:
+                if stale is not None and stale.exists():
+                    rmtree(stale)
+            self.project_dir = render.render_project(context, str(self.preview_dir))
+        except Exception as err:
+            update.error = f"{type(err).__name__}: {err}"
+            self._context = self._layout = None
+            return update
+
+        plan = render.build_plan(context, template_dir, env)
+        self._context = context
+        self._layout = [(e.src, e.dest, e.is_dir) for e in plan]
+        update.rendered = sorted(
+            e.dest.replace(os.sep, "/") for e in plan if not e.is_dir
+        )
+        update.diff = self._compare()
+        update.elapsed = time.perf_counter() - start
+        return update
+
+    def apply(self, paths: Iterable[Path]) -> Optional[WatchUpdate]:
+        """
+        Bring the preview up to date after ``paths`` changed.
+
+        Returns None if none of them are part of the template.
+        """
+        paths = [Path(path) for path in paths]
+        changed = template_paths(self.template_dir, paths)
+        if self.template_dir in paths:
+            # Everything might have changed.
+            return self.render_all(changed)
+        if not changed:
+            return None
+
+        prefix = TEMPLATE_PATHS[0] + "/"
+        if self._context is None or not all(c.startswith(prefix) for c in changed):
+            return self.render_all(changed)
+
+        start = time.perf_counter()
+        context = self._context
+        update = WatchUpdate(sorted(changed))
+        try:
+            template_dir, env, _ = render.prepare(context)
+            plan = render.build_plan(context, template_dir, env)
+            if [(e.src, e.dest, e.is_dir) for e in plan] != self._layout:
+                return self.render_all(changed)
+
+            srcs = {c[len(prefix) :] for c in changed}
+            entries = [
+                e for e in plan if not e.is_dir and e.src.replace(os.sep, "/") in srcs
+            ]
+            sink = render.DirectorySink(self.project_dir)
+            for entry in entries:
+                render.render_entry(sink, env, entry, template_dir, context)
+        except Exception as err:
+            update.error = f"{type(err).__name__}: {err}"
+            return update
+
+        update.rendered = sorted(e.dest.replace(os.sep, "/") for e in entries)
+        update.diff = self._compare(update.rendered)
+        update.elapsed = time.perf_counter() - start
+        return update
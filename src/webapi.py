@@ -0,0 +1,255 @@
+"""
+Small helpers for talking to the GitHub API.
+
+Responses can be cached on disk. A cache entry younger than the TTL is used
+without touching the network. Older entries are revalidated with a conditional
+request (``If-None-Match`` / ``If-Modified-Since``) and a ``304 Not Modified``
+simply refreshes the entry.
+
+Only the value *extracted* from the response is cached, not the raw body.
+Some responses (eg: ``/compare/...``) can be hundreds of KB even though we
+only want a single integer out of them.
+
+Requests go through an :class:`ApiClient`, which keeps a single keep-alive
+session (so repeated requests reuse the TCP+TLS connection), applies explicit
+timeouts, retries transient failures with backoff, and can run independent
+requests concurrently.
+
+``requests`` is imported lazily because it's slow to import and most code
+paths (eg: ``--no-version-check``) never make a request.
+"""
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from dataclasses import asdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+from typing import Callable
+from typing import Optional
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+    import requests
+
+DEFAULT_CACHE_TTL = 600  # seconds
+DEFAULT_TIMEOUT = 5.0  # seconds
+DEFAULT_RETRIES = 2
+
+
+class WebApiError(Exception):
+    pass
+
+
+class NotFoundError(WebApiError):
+    pass
+
+
+def user_cache_dir() -> Path:
+    """Return the per-user cache directory for this project."""
+    if sys.platform.startswith("win"):
+        base = Path(os.environ.get("LOCALAPPDATA", Path.home() / "AppData/Local"))
+    elif sys.platform == "darwin":
+        base = Path.home() / "Library" / "Caches"
+    else:
+        base = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+    return base / "_template_python"
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    fetched_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    def is_fresh(self, ttl: float) -> bool:
+        return (time.time() - self.fetched_at) < ttl
+
+
+class ResponseCache:
+    """
+    An on-disk cache of (extracted) API responses, one file per URL.
+
+    Parameters
+    ----------
+    path : :class:`pathlib.Path`
+        The directory to store entries in. Created on first write.
+    ttl : float
+        How long, in seconds, an entry is used without revalidation.
+    """
+
+    def __init__(self, path: Optional[Path] = None, ttl: float = DEFAULT_CACHE_TTL):
+        self.path = Path(path) if path is not None else user_cache_dir() / "api"
+        self.ttl = ttl
+
+    def _file(self, url: str) -> Path:
+        return self.path / (hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def load(self, url: str) -> Optional[CacheEntry]:
+        try:
+            with open(self._file(url), encoding="utf-8") as f:
+                return CacheEntry(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            # Missing or corrupt entries are just cache misses.
+            return None
+
+    def store(self, url: str, entry: CacheEntry) -> None:
+        fp = self._file(url)
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            # Write to a temp file and then move it into place so that
+            # concurrent readers never see a partial entry.
+            tmp = fp.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(asdict(entry)), encoding="utf-8")
+            os.replace(tmp, fp)
+        except OSError:
+            # Failing to cache should never break the version check.
+            pass
+
+
+class ApiClient:
+    """
+    A pooled, retrying HTTP client for the GitHub API.
+
+    Parameters
+    ----------
+    cache : :class:`ResponseCache`, optional
+        Where to cache responses. No caching is done if not given.
+    timeout : float, optional
+        The timeout, in seconds, for each request.
+    retries : int
+        How many times to retry connection errors and 429/5xx responses.
+        Retries back off exponentially starting at ``backoff`` seconds.
+    backoff : float
+        The backoff factor passed to :class:`urllib3.util.retry.Retry`.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[ResponseCache] = None,
+        timeout: Optional[float] = DEFAULT_TIMEOUT,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = 0.1,
+    ):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.cache = cache
+        self.timeout = timeout
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET",),
+            # Give us the last response rather than raising, so that
+            # cached_get can report the status code.
+            raise_on_status=False,
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(max_retries=retry))
+        self.session.mount("http://", HTTPAdapter(max_retries=retry))
+
+    def get(self, url: str, extract: Callable[[Any], Any]) -> Any:
+        """See :func:`cached_get`."""
+        return cached_get(url, extract, self.cache, self.timeout, self.session)
+
+    def submit(self, fn: Callable, *args) -> "Future":
+        """
+        Run ``fn(*args)`` in the background and return a Future for it.
+
+        A daemon thread is used (rather than a ThreadPoolExecutor) so that a
+        hung request can never keep the interpreter alive at exit.
+        """
+        from concurrent.futures import Future
+
+        future: Future = Future()
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(fn(*args))
+            except BaseException as err:
+                future.set_exception(err)
+
+        threading.Thread(target=run, daemon=True).start()
+        return future
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "ApiClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def cached_get(
+    url: str,
+    extract: Callable[[Any], Any],
+    cache: Optional[ResponseCache] = None,
+    timeout: Optional[float] = None,
+    session: Optional["requests.Session"] = None,
+) -> Any:
+    """
+    GET ``url`` and return ``extract(response.json())``, using ``cache``.
+
+    ``timeout`` is passed directly to :func:`requests.get`. If ``session`` is
+    given then the request is made with it, otherwise a one-off connection
+    is used.
+
+    Raises
+    ------
+    NotFoundError
+        If the server responded with 404.
+    WebApiError
+        For any other unexpected status code.
+    """
+    entry = cache.load(url) if cache is not None else None
+    if entry is not None and entry.is_fresh(cache.ttl):
+        return entry.value
+
+    import requests
+
+    headers = {}
+    if entry is not None:
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
+    getter = session.get if session is not None else requests.get
+    resp = getter(url, headers=headers, timeout=timeout)
+
+    if resp.status_code == 304 and entry is not None:
+        entry.fetched_at = time.time()
+        cache.store(url, entry)
+        return entry.value
+
+    if resp.status_code == 404:
+        raise NotFoundError(f"Got 404 for {url}.")
+    if resp.status_code != 200:
+        raise WebApiError(f"Got {resp.status_code} for {url}.")
+
+    value = extract(resp.json())
+
+    if cache is not None:
+        resp_headers = getattr(resp, "headers", {})
+        entry = CacheEntry(
+            value=value,
+            fetched_at=time.time(),
+            etag=resp_headers.get("ETag"),
+            last_modified=resp_headers.get("Last-Modified"),
+        )
+        cache.store(url, entry)
+
+    return value